@@ -0,0 +1,359 @@
+"""
+ReconForge benchmark suite.
+
+Starts local stand-ins (see fakes.py) and times each module and the whole
+engine at several sizes and concurrency levels. Results are written as JSON
+so two versions can be compared:
+
+    python -m benchmarks.bench                        # full suite
+    python -m benchmarks.bench --quick --only ports,web
+    python -m benchmarks.bench --compare benchmarks/results/old.json
+
+With --compare, cases whose median got slower by more than --threshold are
+listed and the exit status is 1.
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import fakes
+from src.cli import HEAVY_LIBRARIES
+from src.engine import ReconEngine
+from src.parallel import ParallelEngine
+from src.models import RunConfig, TargetType
+from src.modules.dns_module import configure_resolver, run_dns_recon, resolve_many
+from src.modules.ports_module import run_port_scan
+from src.modules.subdomains import configure_subdomain_source, run_subdomain_recon
+from src.modules.web_module import run_web_probe
+from src.modules.whois_module import configure_rdap_cache, configure_rdap_server, run_whois_recon
+
+DOMAIN = "bench.test"
+# Scanned port ranges stay below the ephemeral range (Linux 32768+, macOS and
+# Windows 49152+): a loopback connect to a closed ephemeral port can connect
+# to itself and look open
+PORT_BASE = 10000
+# HTTP-like ports an unprivileged process can bind (see HTTP_LIKE_PORTS)
+WEB_PORTS = [8080, 8000, 8008, 8081, 8088, 8888, 9000, 9090, 9200, 3000, 5000, 5601, 5984, 7001, 10000]
+
+# (quick, full) parameter grids
+GRIDS = {
+    "ports": {"size": ([256, 1024], [256, 4096, 16384]), "inflight": ([100, 1000], [100, 1000])},
+    "ports_thread": {"size": ([256], [256, 4096]), "concurrency": ([50], [50, 200])},
+    "dns": {"names": ([10, 100], [10, 100, 1000])},
+    "subdomains": {"entries": ([1000, 10000], [1000, 10000, 100000])},
+    "whois": {"ips": ([64], [64, 512]), "networks": ([1, 64], [1, 64]), "workers": ([16], [1, 16])},
+    "web": {"ports": ([1, 4], [1, 4, 15]), "body": ([4096], [4096, 262144])},
+    "engine_cidr": {"prefix": ([28], [28, 26]), "host_concurrency": ([16], [4, 16])},
+    "engine_domain": {"subdomains": ([16], [16, 128])},
+    "parallel": {"size": ([16384], [65535]), "workers": ([1, 2], [1, 2, 4, 8])},
+}
+
+def _grid(name: str, quick: bool) -> List[Dict[str, Any]]:
+    combos = [{}]
+    for key, (quick_values, full_values) in GRIDS[name].items():
+        combos = [dict(c, **{key: v}) for c in combos for v in (quick_values if quick else full_values)]
+    return combos
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    Runs func `repeat` times (setup before each, untimed) and returns timings
+    plus the last return value under "check".
+    """
+    times = []
+    value = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+    return {"times": [round(t, 6) for t in times], "min": round(min(times), 6), "median": round(statistics.median(times), 6), "check": value}
+
+# --- Module benchmarks ---
+# Each yields (params, ops, measurement); ops is the unit count for ops_per_sec.
+
+def bench_ports(quick: bool, repeat: int):
+    span = max(GRIDS["ports"]["size"][1])
+    listeners = fakes.Listeners("127.0.0.1", range(PORT_BASE, PORT_BASE + span, 512))
+    try:
+        for params in _grid("ports", quick):
+            ports = list(range(PORT_BASE, PORT_BASE + params["size"]))
+            expected = len([p for p in listeners.ports if p < PORT_BASE + params["size"]])
+            m = measure(lambda: len(run_port_scan("127.0.0.1", ports, timeout=1.0, max_inflight=params["inflight"])["open_ports"]), repeat)
+            m["ok"] = m["check"] == expected
+            yield params, params["size"], m
+        for params in _grid("ports_thread", quick):
+            ports = list(range(PORT_BASE, PORT_BASE + params["size"]))
+            expected = len([p for p in listeners.ports if p < PORT_BASE + params["size"]])
+            m = measure(lambda: len(run_port_scan("127.0.0.1", ports, concurrency=params["concurrency"], timeout=1.0, engine="thread")["open_ports"]), repeat)
+            m["ok"] = m["check"] == expected
+            yield dict(params, engine="thread"), params["size"], m
+    finally:
+        listeners.close()
+
+def bench_dns(quick: bool, repeat: int):
+    for params in _grid("dns", quick):
+        names = [f"host{i}.{DOMAIN}" for i in range(params["names"])]
+        # Half the names exist, half are NXDOMAIN
+        zone = {DOMAIN: "127.0.0.1"}
+        zone.update({name: f"127.0.{i // 250}.{i % 250 + 1}" for i, name in enumerate(names[::2])})
+        server = fakes.DNSServer(zone, DOMAIN)
+        reset = lambda: configure_resolver([server.host], port=server.port)
+        try:
+            m = measure(lambda: len(resolve_many(names)), repeat, setup=reset)
+            m["ok"] = m["check"] == len(names[::2])
+            yield dict(params, op="resolve_many", cache="cold"), len(names), m
+
+            m = measure(lambda: len(resolve_many(names)), repeat)
+            yield dict(params, op="resolve_many", cache="warm"), len(names), m
+
+            if params["names"] == GRIDS["dns"]["names"][0][0]:
+                m = measure(lambda: len(run_dns_recon(DOMAIN)), repeat, setup=reset)
+                yield {"op": "run_dns_recon", "cache": "cold"}, 1, m
+        finally:
+            server.close()
+
+def bench_subdomains(quick: bool, repeat: int):
+    for params in _grid("subdomains", quick):
+        server = fakes.crtsh_server(DOMAIN, params["entries"])
+        try:
+            m = measure(lambda: len(run_subdomain_recon(DOMAIN, base_url=server.url)), repeat)
+            m["ok"] = m["check"] == 2 * max(1, params["entries"] // 2)
+            yield params, params["entries"], m
+        finally:
+            server.close()
+
+def bench_whois(quick: bool, repeat: int):
+    server = fakes.rdap_server(prefixlen=24)
+    configure_rdap_server(server.url)
+    try:
+        for params in _grid("whois", quick):
+            # ips spread evenly over `networks` /24s in 10.0.0.0/8
+            ips = [f"10.{(i % params['networks']) // 256}.{(i % params['networks']) % 256}.{i // params['networks'] % 254 + 1}" for i in range(params["ips"])]
+
+            def lookup_all():
+                with concurrent.futures.ThreadPoolExecutor(max_workers=params["workers"]) as executor:
+                    results = list(executor.map(lambda ip: run_whois_recon(ip, TargetType.IP), ips))
+                return sum(1 for r in results if "error" not in r)
+
+            m = measure(lookup_all, repeat, setup=configure_rdap_cache)
+            m["ok"] = m["check"] == len(ips)
+            yield params, len(ips), m
+    finally:
+        configure_rdap_server(None)
+        configure_rdap_cache()
+        server.close()
+
+def bench_web(quick: bool, repeat: int):
+    for params in _grid("web", quick):
+        ports = WEB_PORTS[:params["ports"]]
+        servers = [fakes.web_server("127.0.0.2", port, params["body"]) for port in ports]
+        try:
+            m = measure(lambda: sum(1 for r in run_web_probe("127.0.0.2", timeout=2.0, open_ports=ports).values() if r.get("status_code") == 200), repeat)
+            m["ok"] = m["check"] == len(ports)
+            yield params, len(ports), m
+        finally:
+            for server in servers:
+                server.close()
+
+# --- Whole-engine benchmarks ---
+
+def bench_engine_cidr(quick: bool, repeat: int):
+    rdap = fakes.rdap_server(prefixlen=24)
+    configure_rdap_server(rdap.url)
+    scan_ports = WEB_PORTS[:2] + list(range(PORT_BASE, PORT_BASE + 62))
+    try:
+        for params in _grid("engine_cidr", quick):
+            cidr = f"127.0.1.0/{params['prefix']}"
+            hosts = 2 ** (32 - params["prefix"]) - 2
+            servers = [fakes.web_server(f"127.0.1.{h}", port) for h in range(1, hosts + 1) for port in WEB_PORTS[:2]]
+            cfg = RunConfig(
+                target_input=cidr, target_type=TargetType.CIDR, profile_name="Custom",
+                enabled_modules=["whois", "ports", "web"], ports=scan_ports, connect_timeout=1.0,
+                cidr_limit=hosts, host_concurrency=params["host_concurrency"]
+            )
+            try:
+                m = measure(lambda: ReconEngine().run(cfg).summary.open_ports_total, repeat, setup=configure_rdap_cache)
+                m["ok"] = m["check"] == 2 * hosts
+                yield params, hosts, m
+            finally:
+                for server in servers:
+                    server.close()
+    finally:
+        configure_rdap_server(None)
+        configure_rdap_cache()
+        rdap.close()
+
+def bench_engine_domain(quick: bool, repeat: int):
+    for params in _grid("engine_domain", quick):
+        names = [f"host{i}.{DOMAIN}" for i in range(params["subdomains"])]
+        addresses = [f"127.0.2.{i % 8 + 1}" for i in range(len(names))]
+        zone = dict(zip(names, addresses))
+        zone.update({f"www{i}.{DOMAIN}": ip for i, ip in enumerate(addresses)})
+        zone[DOMAIN] = "127.0.2.1"
+        dns_server = fakes.DNSServer(zone, DOMAIN)
+        crtsh = fakes.crtsh_server(DOMAIN, 2 * params["subdomains"])
+        listeners = [fakes.Listeners(f"127.0.2.{h}", [PORT_BASE]) for h in range(1, 9)]
+        configure_subdomain_source(crtsh.url)
+        cfg = RunConfig(
+            target_input=DOMAIN, target_type=TargetType.DOMAIN, profile_name="Custom",
+            enabled_modules=["dns", "subdomains", "subdomain_scan", "ports"],
+            ports=list(range(PORT_BASE, PORT_BASE + 64)), connect_timeout=1.0
+        )
+        try:
+            m = measure(lambda: ReconEngine().run(cfg).summary.hosts_discovered, repeat,
+                        setup=lambda: configure_resolver([dns_server.host], port=dns_server.port))
+            m["ok"] = m["check"] == 1 + 7 # the domain plus 127.0.2.2-8 (127.0.2.1 is the domain's own IP)
+            yield params, len(names), m
+        finally:
+            configure_subdomain_source()
+            configure_resolver()
+            for l in listeners:
+                l.close()
+            crtsh.close()
+            dns_server.close()
+
+def bench_parallel(quick: bool, repeat: int):
+    """
+    Single-host port range split over worker processes; scales with cores
+    until the connection budget or the loopback stack is the limit.
+    """
+    span = max(GRIDS["parallel"]["size"][1])
+    listeners = fakes.Listeners("127.0.0.1", range(1025, span + 1, 4099))
+    try:
+        for params in _grid("parallel", quick):
+            cfg = RunConfig(
+                target_input="127.0.0.1", target_type=TargetType.IP, profile_name="Custom", enabled_modules=["ports"],
+                ports=list(range(1, params["size"] + 1)), connect_timeout=1.0, max_inflight=4000, workers=params["workers"]
+            )
+            expected = set(p for p in listeners.ports if p <= params["size"])
+            m = measure(lambda: expected <= set(ParallelEngine().run(cfg).summary.open_ports_list), repeat)
+            m["ok"] = m["check"]
+            yield params, params["size"], m
+    finally:
+        listeners.close()
+
+# --- Process startup ---
+
+def bench_startup(quick: bool, repeat: int):
+    """
+    Fresh interpreters: importing the engine, and a complete headless
+    ports-only scan through scan.py. Wall time includes interpreter start.
+    """
+    probe = "import sys, src.engine; print(sum(m in sys.modules for m in %r))" % (HEAVY_LIBRARIES,)
+    m = measure(lambda: int(subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True).stdout), repeat)
+    m["ok"] = m["check"] == 0
+    yield {"op": "import_engine"}, 1, m
+
+    listeners = fakes.Listeners("127.0.0.1", [PORT_BASE])
+    cmd = [sys.executable, os.path.join(ROOT, "scan.py"), "127.0.0.1", "--authorized", "--modules", "ports",
+           "--ports", f"{PORT_BASE}-{PORT_BASE + 99}", "--no-save", "--quiet", "--json"]
+    try:
+        m = measure(lambda: json.loads(subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True).stdout)["summary"]["open_ports_total"], repeat)
+        m["ok"] = m["check"] == len(listeners.ports)
+        yield {"op": "cli_ports_scan", "ports": 100}, 1, m
+    finally:
+        listeners.close()
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "ports": bench_ports,
+    "dns": bench_dns,
+    "subdomains": bench_subdomains,
+    "whois": bench_whois,
+    "web": bench_web,
+    "engine_cidr": bench_engine_cidr,
+    "engine_domain": bench_engine_domain,
+    "parallel": bench_parallel,
+}
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _case_key(case: Dict[str, Any]) -> str:
+    return case["bench"] + " " + json.dumps(case["params"], sort_keys=True)
+
+def compare(current: Dict[str, Any], baseline_path: str, threshold: float) -> List[str]:
+    """
+    Prints median ratios against a baseline file and returns the regressed cases.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_case_key(c): c for c in json.load(f)["cases"]}
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for case in current["cases"]:
+        key = _case_key(case)
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = case["median"] / old["median"] if old["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- slower"
+            regressions.append(key)
+        print(f"  {key}: {old['median']:.4f}s -> {case['median']:.4f}s (x{ratio:.2f}){flag}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ReconForge benchmarks against local stand-in targets")
+    parser.add_argument("--quick", action="store_true", help="smaller grid for a fast check")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (median is reported)")
+    parser.add_argument("--only", help="comma-separated benchmarks: " + ",".join(BENCHMARKS))
+    parser.add_argument("--output", help="result file (default benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("reconforge").setLevel(logging.WARNING)
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "repeat": args.repeat
+        },
+        "cases": []
+    }
+    for name in selected:
+        for params, ops, m in BENCHMARKS[name](args.quick, args.repeat):
+            m.pop("check")
+            case = dict({"bench": name, "params": params, "ops": ops, "ops_per_sec": round(ops / m["median"], 2) if m["median"] else None}, **m)
+            report["cases"].append(case)
+            status = "" if case.get("ok", True) else "  [WRONG RESULT]"
+            print(f"{name:14} {json.dumps(params, sort_keys=True):60} median {m['median']:.4f}s  {case['ops_per_sec']}/s{status}")
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"bench-{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
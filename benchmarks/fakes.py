@@ -0,0 +1,201 @@
+"""
+Local stand-ins for everything ReconForge talks to, so benchmarks run
+offline and repeatably: loopback TCP listeners, an HTTP target, a stub
+DNS server, a fake crt.sh endpoint and a fake RDAP server.
+All servers bind to 127.0.0.0/8 and run on daemon threads.
+"""
+import ipaddress
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+class Listeners:
+    """
+    Plain TCP listeners. The kernel completes the handshake from the accept
+    backlog, so nothing needs to accept for a connect scan to see them open.
+    """
+    def __init__(self, host: str, ports: List[int], backlog: int = 512):
+        self.sockets = []
+        self.ports = []
+        for port in ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((host, port))
+            except OSError:
+                sock.close()
+                continue # Port taken on this address; leave it out
+            sock.listen(backlog)
+            self.sockets.append(sock)
+            self.ports.append(sock.getsockname()[1])
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+
+class _Server:
+    """
+    A ThreadingHTTPServer on its own daemon thread.
+    """
+    def __init__(self, handler, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class _WebHandler(_QuietHandler):
+    body = b""
+
+    def do_GET(self):
+        self.send_body(self.body, "text/html", headers={"Server": "bench-httpd/1.0"})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Server", "bench-httpd/1.0")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+
+def web_server(host: str = "127.0.0.1", port: int = 0, body_bytes: int = 4096) -> _Server:
+    """
+    HTTP target answering every GET with a titled page of about body_bytes.
+    """
+    page = b"<html><head><title>bench</title></head><body>"
+    page += b"x" * max(0, body_bytes - len(page) - 14) + b"</body></html>"
+    handler = type("WebHandler", (_WebHandler,), {"body": page})
+    return _Server(handler, host, port)
+
+def crtsh_server(domain: str, entries: int, wildcards: bool = False) -> _Server:
+    """
+    crt.sh stand-in: ?q=%.<domain>&output=json returns `entries` certificate
+    records, streamed in chunks like the real service. Names repeat every
+    entries/2 records, so deduplication has work to do. With wildcards, the
+    www names come as wildcard certificates (*.www<i>.<domain>).
+    """
+    www = "*.www" if wildcards else "www"
+    distinct = max(1, entries // 2)
+
+    class Handler(_QuietHandler):
+        protocol_version = "HTTP/1.0" # Body ends at close, as crt.sh streams it
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if query.get("q") != [f"%.{domain}"]:
+                self.send_body(b"[]", "application/json")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"[")
+            batch = []
+            for i in range(entries):
+                record = {"id": i, "name_value": f"host{i % distinct}.{domain}\n{www}{i % distinct}.{domain}"}
+                batch.append(("," if i else "") + json.dumps(record))
+                if len(batch) == 1000:
+                    self.wfile.write("".join(batch).encode())
+                    batch = []
+            self.wfile.write("".join(batch).encode() + b"]")
+
+    return _Server(Handler)
+
+def rdap_server(prefixlen: int = 24) -> _Server:
+    """
+    RDAP stand-in: /ip/<addr> describes the enclosing /prefixlen network.
+    """
+    class Handler(_QuietHandler):
+        def do_GET(self):
+            try:
+                addr = ipaddress.ip_address(self.path.rsplit("/", 1)[-1])
+            except ValueError:
+                self.send_body(b"{}", "application/rdap+json", status=400)
+                return
+            net = ipaddress.ip_network(f"{addr}/{prefixlen if addr.version == 4 else 48}", strict=False)
+            body = {
+                "objectClassName": "ip network",
+                "handle": f"NET-{net.network_address}",
+                "name": "BENCH-NET",
+                "country": "ZZ",
+                "startAddress": str(net.network_address),
+                "endAddress": str(net.broadcast_address),
+                "cidr0_cidrs": [{"v4prefix" if net.version == 4 else "v6prefix": str(net.network_address), "length": net.prefixlen}]
+            }
+            self.send_body(json.dumps(body).encode(), "application/rdap+json")
+
+    return _Server(Handler)
+
+class DNSServer:
+    """
+    UDP stub DNS server. Names in `zone` get A (or, for IPv6 addresses, AAAA)
+    answers; other names in the zone's domain get NXDOMAIN with an SOA so
+    negative caching applies; other record types get an empty NOERROR answer.
+    """
+    def __init__(self, zone: Dict[str, str], domain: str, host: str = "127.0.0.1", ttl: int = 300):
+        self.zone = {name.lower().rstrip("."): ip for name, ip in zone.items()}
+        self.domain = domain.lower().rstrip(".")
+        self.ttl = ttl
+        self.queries = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, 0))
+        self.host, self.port = self.sock.getsockname()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(4096)
+            except OSError:
+                return # closed
+            self.queries += 1
+            try:
+                query = dns.message.from_wire(data)
+            except Exception:
+                continue
+            self.sock.sendto(self._answer(query).to_wire(), addr)
+
+    def _answer(self, query):
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text().lower().rstrip(".")
+        ip = self.zone.get(name)
+        if ip is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+            response.authority.append(dns.rrset.from_text(
+                self.domain + ".", self.ttl, "IN", "SOA",
+                f"ns.{self.domain}. admin.{self.domain}. 1 3600 600 86400 {self.ttl}"
+            ))
+        elif question.rdtype == (dns.rdatatype.AAAA if ":" in ip else dns.rdatatype.A):
+            response.answer.append(dns.rrset.from_text(question.name, self.ttl, "IN", "AAAA" if ":" in ip else "A", ip))
+        return response
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,14 @@
+import time
+_STARTED = time.perf_counter() # Startup timing includes every import below
+
+import sys
+import os
+
+# Ensure src is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Headless entry point: does not import Gradio (see src/cli.py for options)
+from src.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main(started=_STARTED))
@@ -0,0 +1,305 @@
+import ipaddress
+import json
+import os
+import re
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import MAX_SUBDOMAIN_HOSTS, DISCOVERY_BUDGET_SHARE
+from .engine import ReconEngine, RunContext, SummaryBuilder, resolve_port_list, logger
+from .metrics import ScanMetrics
+from .ratecontrol import RateLimiter
+from .models import RunConfig, ScanResult, TargetType
+from .modules.discovery_module import iter_live_hosts
+from .storage.writer import ResultWriter, create_run_dir
+from .utils import validate_target, iter_cidr_hosts, cidr_host_count
+
+def read_targets(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Targets from a file or stream: whitespace-separated, blank lines and
+    lines starting with # are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        yield from line.split()
+
+def plan_targets(targets: Iterable[str], cidr_limit: int) -> Tuple[List[Tuple[str, TargetType]], Dict[str, int]]:
+    """
+    Normalizes and deduplicates a mixed target list:
+      - repeated targets are dropped (domains compare case-insensitively)
+      - overlapping or adjacent CIDRs are merged
+      - IPs inside a CIDR of the batch are dropped, if that CIDR is small
+        enough (<= cidr_limit hosts) to be scanned in full
+    Returns (plan, notes); the plan lists CIDRs first, then the other targets
+    in input order.
+    """
+    notes = {"input": 0, "duplicates": 0, "cidrs_merged": 0, "covered_by_cidr": 0}
+    seen = set()
+    networks = {4: [], 6: []}
+    others = []
+    for raw in targets:
+        notes["input"] += 1
+        target, target_type = validate_target(raw)
+        if target_type == TargetType.CIDR:
+            net = ipaddress.ip_network(target, strict=False)
+            networks[net.version].append(net)
+            continue
+        if target_type == TargetType.IP:
+            target = str(ipaddress.ip_address(target))
+        elif target_type == TargetType.DOMAIN:
+            target = target.lower().rstrip(".")
+        if target in seen:
+            notes["duplicates"] += 1
+            continue
+        seen.add(target)
+        others.append((target, target_type))
+
+    collapsed = {v: list(ipaddress.collapse_addresses(nets)) for v, nets in networks.items()}
+    notes["cidrs_merged"] = sum(len(n) for n in networks.values()) - sum(len(n) for n in collapsed.values())
+    # Collapsed networks are sorted and disjoint: bisect on their start addresses
+    starts = {v: [int(n.network_address) for n in nets] for v, nets in collapsed.items()}
+
+    def covered(ip) -> bool:
+        nets = collapsed[ip.version]
+        i = bisect_right(starts[ip.version], int(ip)) - 1
+        return i >= 0 and ip in nets[i] and cidr_host_count(str(nets[i])) <= cidr_limit
+
+    plan = [(str(net), TargetType.CIDR) for v in (4, 6) for net in collapsed[v]]
+    for target, target_type in others:
+        if target_type == TargetType.IP and covered(ipaddress.ip_address(target)):
+            notes["covered_by_cidr"] += 1
+            continue
+        plan.append((target, target_type))
+    notes["planned"] = len(plan)
+    return plan, notes
+
+class _TargetState:
+    """
+    Bookkeeping for one batch target while its hosts are in the shared queue.
+    """
+    def __init__(self, target: str, target_type: TargetType, config: RunConfig, run_dir: Optional[str], metrics, rate):
+        self.target = target
+        self.target_type = target_type
+        self.config = config
+        self.start = datetime.now()
+        self.builder = SummaryBuilder()
+        self.results = {}
+        self.pending = 0        # hosts queued but not collected
+        self.exhausted = False  # every host has been queued
+        self.deferred = False   # waits for the subdomain stage
+        self.cidr_notes = None
+        self.discovery = None
+        self.subdomains = set()
+        self.subdomain_notes = None
+        self.ctx = RunContext(config, resolve_port_list(config))
+        self.ctx.metrics = metrics
+        self.ctx.rate = rate # rate caps hold across the whole batch
+        self.sub_ctx = None
+        self.writer = ResultWriter(run_dir=run_dir) if run_dir else None
+        if self.writer:
+            self.writer.open_stream(config)
+            self.ctx.on_module = self.writer.write_module
+
+class BatchEngine(ReconEngine):
+    """
+    Scans many targets in one process. Hosts of every target (CIDRs expanded
+    lazily) go through one bounded host queue, so a slow target does not hold
+    up the rest. DNS resolver/cache, RDAP range cache and the HTTP session
+    pool are process-wide and shared by the whole batch. Each target gets its
+    own run directory and results.jsonl stream under the batch directory,
+    finalized as soon as its last host completes. Target runs are not
+    checkpointed, so a batch cannot be resumed, and diff mode is not
+    supported.
+    """
+    def run_batch(self, config: RunConfig, targets: Iterable[str], out_dir: Optional[str] = "data/runs",
+                  on_result: Optional[Callable[[ScanResult, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        config is the template for every target (its target_input is ignored).
+        on_result(result, run_dir) is called as each target finishes.
+        Returns the batch summary, also written to <batch dir>/batch.json.
+        """
+        if config.diff_mode:
+            raise ValueError("diff mode is not supported in batch mode")
+        start_time = datetime.now()
+        self._config = config
+        self._on_result = on_result
+        self._batch_dir = create_run_dir(out_dir, "_batch") if out_dir else None
+        self._metrics = ScanMetrics() if config.metrics else None
+        self._rate = RateLimiter.from_config(config)
+        self._scanned_ips = set()
+        self._targets = []
+        self._open = {}
+
+        plan, notes = plan_targets(targets, config.cidr_limit)
+        logger.info(f"Batch: {notes['input']} targets in, {notes['planned']} planned {notes}")
+
+        scan_budget = config.max_inflight
+        discovery_budget = 0
+        if config.host_discovery and any(t == TargetType.CIDR for _, t in plan):
+            discovery_budget = max(1, config.max_inflight // DISCOVERY_BUDGET_SHARE)
+            scan_budget = max(1, config.max_inflight - discovery_budget)
+        workers = max(1, min(config.host_concurrency, scan_budget))
+        self._inflight_budget = max(1, scan_budget // workers)
+
+        state = {"stopped": False}
+        deferred = []
+        scan = self._tracked(self._scan_item)
+        items = self._host_stream(plan, deferred, discovery_budget)
+        for item, res in self._schedule(items, scan, workers, start_time, state, config.runtime_limit):
+            self._collect(item[0], item[1], res)
+
+        # Subdomain stage across all domains at once: one resolve pass through
+        # the shared cache, and an IP shared by several domains is scanned once
+        if deferred and not state["stopped"]:
+            items = self._subdomain_items(deferred)
+            for item, res in self._schedule(items, scan, workers, start_time, state, config.runtime_limit):
+                self._collect(item[0], item[1], res)
+
+        for target_state in list(self._open.values()):
+            self._finish(target_state)
+
+        end_time = datetime.now()
+        summary = {
+            "started": start_time.isoformat(),
+            "finished": end_time.isoformat(),
+            "duration": (end_time - start_time).total_seconds(),
+            "stopped": state["stopped"],
+            "plan": notes,
+            "batch_dir": self._batch_dir,
+            "targets": self._targets
+        }
+        if self._batch_dir:
+            with open(os.path.join(self._batch_dir, "batch.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            if self._metrics:
+                ResultWriter(run_dir=self._batch_dir).save_metrics(self._metrics)
+        if self._metrics:
+            summary["metrics"] = self._metrics.to_dict()
+        return summary
+
+    def _tracked(self, func):
+        if not self._metrics:
+            return func
+        ctx = RunContext(self._config, [])
+        ctx.metrics = self._metrics
+        return ctx.tracked(func)
+
+    def _open_target(self, index: int, target: str, target_type: TargetType) -> _TargetState:
+        config = self._config.copy(update={"target_input": target, "target_type": target_type})
+        run_dir = None
+        if self._batch_dir:
+            run_dir = os.path.join(self._batch_dir, f"{index:05d}_{re.sub(r'[^A-Za-z0-9._-]', '_', target)}")
+        target_state = _TargetState(target, target_type, config, run_dir, self._metrics, self._rate)
+        target_state.ctx.inflight_budget = self._inflight_budget
+        self._open[id(target_state)] = target_state
+        return target_state
+
+    def _host_stream(self, plan, deferred: List[_TargetState], discovery_budget: int) -> Iterator[Tuple[_TargetState, str, Optional[List[str]]]]:
+        config = self._config
+        for index, (target, target_type) in enumerate(plan):
+            target_state = self._open_target(index, target, target_type)
+            hosts = iter([target])
+            if target_type == TargetType.CIDR:
+                total = cidr_host_count(target, config.shard_index, config.shard_count)
+                limit = min(total, config.cidr_limit)
+                hosts = iter_cidr_hosts(target, limit=limit, shard_index=config.shard_index,
+                                        shard_count=config.shard_count, seed=config.shuffle_seed)
+                target_state.cidr_notes = {"cap_applied": True, "limit": config.cidr_limit, "skipped": total - limit}
+                if config.host_discovery:
+                    target_state.discovery = {}
+                    hosts = iter_live_hosts(hosts, target_state.discovery, timeout=config.connect_timeout,
+                                            max_inflight=discovery_budget, metrics=self._metrics)
+            for host in hosts:
+                target_state.pending += 1
+                yield target_state, host, None
+            target_state.exhausted = True
+            if target_type == TargetType.DOMAIN and "subdomain_scan" in config.enabled_modules:
+                target_state.deferred = True
+                deferred.append(target_state)
+            self._maybe_finish(target_state)
+
+    def _subdomain_items(self, deferred: List[_TargetState]) -> List[Tuple[_TargetState, str, List[str]]]:
+        from .modules.dns_module import resolve_many, group_by_address
+        names = sorted(set().union(*(s.subdomains for s in deferred)))
+        resolved = resolve_many(names)
+        items = []
+        for target_state in deferred:
+            by_ip = group_by_address({n: resolved[n] for n in target_state.subdomains if n in resolved})
+            new_ips = [ip for ip in by_ip if ip not in self._scanned_ips]
+            to_scan = new_ips[:MAX_SUBDOMAIN_HOSTS]
+            self._scanned_ips.update(to_scan)
+            target_state.subdomain_notes = {
+                "names": len(target_state.subdomains),
+                "resolved": sum(1 for n in target_state.subdomains if n in resolved),
+                "unique_ips": len(by_ip),
+                "scanned": len(to_scan),
+                "skipped": len(new_ips) - len(to_scan)
+            }
+            target_state.sub_ctx = target_state.ctx.derive(target_state.config.copy(update={
+                "enabled_modules": [m for m in target_state.config.enabled_modules if m in ("ports", "web")]
+            }))
+            target_state.sub_ctx.inflight_budget = self._inflight_budget
+            target_state.pending += len(to_scan)
+            items.extend((target_state, ip, by_ip[ip]) for ip in to_scan)
+        logger.info(f"Batch subdomain stage: {len(resolved)} names resolved, scanning {len(items)} IPs")
+        return items
+
+    def _scan_item(self, item) -> Dict[str, Any]:
+        target_state, host, hostnames = item
+        try:
+            if hostnames:
+                return self._scan_host(host, TargetType.IP, target_state.sub_ctx, hostnames)
+            host_type = TargetType.IP if target_state.target_type == TargetType.CIDR else target_state.target_type
+            return self._scan_host(host, host_type, target_state.ctx)
+        except Exception as e:
+            # Keep the target's host count balanced so it still finishes
+            logger.error(f"Host {host} failed: {e}")
+            return {"error": str(e), "_timings": {}}
+
+    def _collect(self, target_state: _TargetState, host: str, res: Dict[str, Any]):
+        target_state.pending -= 1
+        target_state.builder.add_host(host, res)
+        if target_state.writer:
+            target_state.writer.write_host(host, res.get("_timings", {}))
+        if self._config.retain_results:
+            target_state.results[host] = res
+        if isinstance(res.get("subdomains"), list):
+            target_state.subdomains.update(res["subdomains"])
+        if isinstance(res.get("ports"), dict):
+            self._scanned_ips.add(res["ports"].get("ip"))
+        if target_state.deferred and target_state.sub_ctx is not None:
+            target_state.deferred = target_state.pending > 0
+        self._maybe_finish(target_state)
+
+    def _maybe_finish(self, target_state: _TargetState):
+        if target_state.exhausted and target_state.pending == 0 and not target_state.deferred:
+            self._finish(target_state)
+
+    def _finish(self, target_state: _TargetState):
+        if self._open.pop(id(target_state), None) is None:
+            return
+        summary = target_state.builder.build(target_state.config, target_state.start, datetime.now(), target_state.cidr_notes)
+        summary.discovery = target_state.discovery
+        summary.subdomain_scan = target_state.subdomain_notes
+        result = ScanResult(config=target_state.config, summary=summary, results=target_state.results)
+        run_dir = None
+        if target_state.writer:
+            run_dir = target_state.writer.get_run_dir()
+            target_state.writer.write_summary(summary)
+            target_state.writer.close_stream()
+            if self._config.retain_results:
+                target_state.writer.save(result)
+        self._targets.append({
+            "target": target_state.target,
+            "type": target_state.target_type.value,
+            "run_dir": run_dir,
+            "complete": target_state.exhausted and target_state.pending == 0,
+            "hosts": summary.hosts_discovered,
+            "open_ports_total": summary.open_ports_total,
+            "risk_tags": sorted(summary.risk_tags)
+        })
+        if self._on_result:
+            self._on_result(result, run_dir)
@@ -0,0 +1,252 @@
+import time
+_STARTED = time.perf_counter() # Set before the heavier imports below
+
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from .models import RunConfig
+from .config import PROFILES, PORT_ENGINES, DEFAULT_PORT_ENGINE, DEFAULT_MAX_INFLIGHT, MAX_INFLIGHT, DEFAULT_HOST_CONCURRENCY, MAX_CIDR_HOSTS, RDAP_CACHE_FILE
+from .utils import validate_target, setup_logger
+
+MODULES = ["dns", "whois", "subdomains", "subdomain_scan", "ports", "web"]
+# Imported only when a module that needs them runs (reported by --timing)
+HEAVY_LIBRARIES = ("gradio", "requests", "dns", "whois", "ipwhois")
+
+def parse_ports(spec: str) -> List[int]:
+    """
+    "22,80,8000-8100" -> sorted unique port list.
+    """
+    ports = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            low, high = (int(p) for p in part.split("-", 1))
+            ports.update(range(low, high + 1))
+        else:
+            ports.add(int(part))
+    if not ports or min(ports) < 1 or max(ports) > 65535:
+        raise ValueError(f"invalid port list: {spec}")
+    return sorted(ports)
+
+def parse_shard(spec: str):
+    index, count = (int(p) for p in spec.split("/", 1))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard: {spec}")
+    return index, count
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="reconforge",
+        description="Headless ReconForge scan. Only the libraries the enabled modules need are loaded."
+    )
+    parser.add_argument("target", nargs="?", help="domain, IP, URL or CIDR")
+    parser.add_argument("--authorized", action="store_true", help="confirm you have explicit written authorization to scan the target")
+    parser.add_argument("--profile", choices=list(PROFILES), default="Fast")
+    parser.add_argument("--modules", help="comma-separated, overrides the profile: " + ",".join(MODULES))
+    parser.add_argument("--ports", help="explicit ports, e.g. 22,80,8000-8100 (overrides the profile list)")
+    parser.add_argument("--timeout", type=float, help="connect timeout in seconds")
+    parser.add_argument("--concurrency", type=int, help="thread-engine workers per host")
+    parser.add_argument("--engine", choices=PORT_ENGINES, default=DEFAULT_PORT_ENGINE)
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT, help=f"connects in flight across all hosts (at most {MAX_INFLIGHT})")
+    parser.add_argument("--max-rate", type=float, help="global probes per second (connects and web requests)")
+    parser.add_argument("--host-rate", type=float, help="probes per second per host")
+    parser.add_argument("--rate-control", action="store_true", help="back off per host when timeouts rise, ramp up while answers are clean")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 = one per CPU core)")
+    parser.add_argument("--host-concurrency", type=int, default=DEFAULT_HOST_CONCURRENCY)
+    parser.add_argument("--cidr-limit", type=int, default=MAX_CIDR_HOSTS)
+    parser.add_argument("--shard", help="scan shard I of N CIDR hosts, as I/N")
+    parser.add_argument("--seed", type=int, help="randomize CIDR host order reproducibly")
+    parser.add_argument("--adaptive", action="store_true", help="per-host timeouts from measured RTT")
+    parser.add_argument("--banners", action="store_true", help="identify services from banners read on the scan connection")
+    parser.add_argument("--no-discovery", action="store_true", help="scan every CIDR host without the liveness pre-pass")
+    parser.add_argument("--runtime-limit", type=float, help="seconds after which no new host starts (default: no limit)")
+    parser.add_argument("--diff", action="store_true", help="reuse the previous run of this target and report changes")
+    parser.add_argument("--rdap-cache", nargs="?", const=RDAP_CACHE_FILE, metavar="FILE",
+                        help=f"keep IP WHOIS (RDAP) ranges across runs (default file: {RDAP_CACHE_FILE})")
+    parser.add_argument("--out-dir", default="data/runs", help="run directory root")
+    parser.add_argument("--no-save", action="store_true", help="do not write a run directory")
+    parser.add_argument("--db", help="also index the run into this SQLite result store")
+    parser.add_argument("--resume", metavar="RUN_DIR", help="continue an interrupted run")
+    parser.add_argument("--batch", metavar="FILE", help="scan every target listed in FILE ('-' for stdin) in one shared queue")
+    parser.add_argument("--serve", metavar="[HOST:]PORT", help="coordinate the scan: hand work units to --worker processes")
+    parser.add_argument("--worker", metavar="URL", help="run as a worker for the coordinator at URL (no target needed)")
+    parser.add_argument("--token", default=os.environ.get("RECONFORGE_TOKEN"), help="shared coordinator/worker secret (default: $RECONFORGE_TOKEN)")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    parser.add_argument("--quiet", action="store_true", help="only log warnings")
+    parser.add_argument("--timing", action="store_true", help="print startup timings to stderr")
+    return parser
+
+def build_config(args) -> RunConfig:
+    profile = PROFILES[args.profile]
+    modules = args.modules.split(",") if args.modules else list(profile["modules"])
+    unknown = [m for m in modules if m not in MODULES]
+    if unknown:
+        raise ValueError(f"unknown module(s): {', '.join(unknown)}")
+    if args.serve and args.diff:
+        raise ValueError("--diff is not supported with --serve")
+    if args.batch and args.diff:
+        raise ValueError("--diff is not supported with --batch")
+    if args.adaptive and args.engine == "thread":
+        raise ValueError("--adaptive needs the async engine (--engine async)")
+    shard_index, shard_count = parse_shard(args.shard) if args.shard else (0, 1)
+    target = args.target or "batch" # batch: template config, each target overrides it
+    _, target_type = validate_target(target)
+    return RunConfig(
+        target_input=target,
+        target_type=target_type,
+        profile_name=args.profile,
+        enabled_modules=modules,
+        concurrency=args.concurrency or profile["concurrency"],
+        connect_timeout=args.timeout or profile["timeout"],
+        cidr_limit=args.cidr_limit,
+        ports=parse_ports(args.ports) if args.ports else None,
+        port_engine=args.engine,
+        max_inflight=args.max_inflight,
+        adaptive_timeout=args.adaptive,
+        banners=args.banners,
+        host_concurrency=args.host_concurrency,
+        max_rate=args.max_rate,
+        host_rate=args.host_rate,
+        rate_control=args.rate_control,
+        host_discovery=not args.no_discovery,
+        shard_index=shard_index,
+        shard_count=shard_count,
+        shuffle_seed=args.seed,
+        runtime_limit=args.runtime_limit,
+        rdap_cache_file=args.rdap_cache,
+        workers=args.workers,
+        diff_mode=args.diff
+    )
+
+def format_summary(result) -> str:
+    s = result.summary
+    lines = [
+        f"Target:      {s.target} ({s.type}, {s.ip_class})",
+        f"Duration:    {s.duration_total:.2f}s",
+        f"Hosts:       {s.hosts_discovered}",
+        f"Open ports:  {s.open_ports_total} {s.open_ports_list}",
+        f"Subdomains:  {s.subdomains_found}",
+    ]
+    if s.discovery:
+        lines.append(f"Discovery:   {s.discovery['alive']} up / {s.discovery['probed']} probed")
+    if s.runtime_stop:
+        lines.append(f"Stopped:     runtime limit {s.runtime_stop['limit']}s, {s.runtime_stop['skipped']} hosts not scanned")
+    if s.risk_tags:
+        lines.append(f"Risk tags:   {', '.join(sorted(s.risk_tags))}")
+    if s.changes and s.changes.get("previous_run"):
+        lines.append(f"Changes:     ports {s.changes['ports']}, new risk tags {s.changes['new_risk_tags']}")
+    return "\n".join(lines)
+
+def run_batch(args, config: RunConfig) -> int:
+    from .batch import BatchEngine, read_targets
+    store = None
+    if args.db:
+        from .storage.sqlite_store import SQLiteStore
+        store = SQLiteStore(args.db)
+
+    def on_result(result, run_dir):
+        s = result.summary
+        print(f"{s.target}: {s.hosts_discovered} hosts, {s.open_ports_total} open ports {s.open_ports_list[:20]}"
+              + (f", risk: {', '.join(sorted(s.risk_tags))}" if s.risk_tags else ""), flush=True)
+        if store and run_dir:
+            store.save_run(result, run_dir)
+
+    source = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+    try:
+        with source:
+            summary = BatchEngine().run_batch(config, read_targets(source),
+                                              out_dir=None if args.no_save else args.out_dir, on_result=on_result)
+    except Exception as e:
+        print(f"Error during batch: {e}", file=sys.stderr)
+        return 1
+    summary.pop("metrics", None)
+    plan = summary["plan"]
+    print(f"Batch: {plan['planned']} targets scanned of {plan['input']} listed "
+          f"({plan['duplicates']} duplicates, {plan['covered_by_cidr']} inside a CIDR, {plan['cidrs_merged']} CIDRs merged) "
+          f"in {summary['duration']:.2f}s")
+    if summary["batch_dir"]:
+        print(f"Results: {summary['batch_dir']}")
+    return 0
+
+def main(argv: Optional[List[str]] = None, started: Optional[float] = None) -> int:
+    """
+    CLI entry point. `started` is a perf_counter() taken by the launcher
+    script before any import, for the startup timing.
+    """
+    started = started or _STARTED
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.worker:
+        from .distributed import run_worker
+        if args.quiet:
+            setup_logger().setLevel(logging.WARNING)
+        units = run_worker(args.worker, token=args.token)
+        print(f"Worker finished: {units} work units")
+        return 0
+    if not args.resume and not args.batch and not args.target:
+        parser.error("a target (or --batch FILE / --resume RUN_DIR) is required")
+    if args.resume and args.batch:
+        parser.error("--resume is not supported with --batch: batch runs are not checkpointed")
+    if not args.resume and not args.authorized:
+        parser.error("--authorized is required: only scan targets you have explicit written permission to test")
+    try:
+        config = None if args.resume else build_config(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # The engine loads module libraries on demand; import it only once arguments are valid
+    if args.resume or args.workers != 1:
+        from .parallel import ParallelEngine as ReconEngine # a resumed run keeps its worker count
+    else:
+        from .engine import ReconEngine
+    from .storage.writer import ResultWriter
+    if args.serve:
+        from .distributed import Coordinator
+    if args.quiet:
+        setup_logger().setLevel(logging.WARNING)
+    ready = time.perf_counter()
+
+    if args.batch:
+        return run_batch(args, config)
+
+    try:
+        if args.serve:
+            host, _, port = args.serve.rpartition(":")
+            writer = None if args.no_save else ResultWriter(args.out_dir)
+            result = Coordinator(config, host=host or "127.0.0.1", port=int(port), token=args.token, writer=writer).serve()
+        elif args.resume:
+            writer = ResultWriter(run_dir=args.resume)
+            result = ReconEngine().resume(args.resume)
+        else:
+            writer = None if args.no_save else ResultWriter(args.out_dir)
+            result = ReconEngine().run(config, writer=writer)
+    except Exception as e:
+        print(f"Error during scan: {e}", file=sys.stderr)
+        return 1
+    finished = time.perf_counter()
+
+    if writer:
+        writer.save(result)
+        if args.db:
+            from .storage.sqlite_store import SQLiteStore
+            SQLiteStore(args.db).save_run(result, writer.get_run_dir())
+
+    if args.json:
+        print(result.json(indent=2))
+    else:
+        print(format_summary(result))
+        if writer:
+            print(f"Results:     {writer.get_run_dir()}")
+
+    if args.timing:
+        loaded = sorted(m for m in HEAVY_LIBRARIES if m in sys.modules)
+        print(f"startup {ready - started:.3f}s, scan {finished - ready:.3f}s, libraries loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,8 +11,110 @@ DEFAULT_READ_TIMEOUT = 3.0    # For HTTP/Whois
 DEFAULT_CONCURRENCY = 25
 MAX_CONCURRENCY = 50
 
+# Async port engine ("async" or "thread")
+PORT_ENGINES = ("async", "thread")
+DEFAULT_PORT_ENGINE = "async"
+DEFAULT_MAX_INFLIGHT = 1000   # Sockets in flight for the async engine
+MAX_INFLIGHT = 5000
+FD_RESERVE = 64               # File descriptors kept free for logs, HTTP, DNS
+
+# Adaptive timeouts (async engine): per-host RTO from measured RTT
+ADAPTIVE_MIN_TIMEOUT = 0.05
+ADAPTIVE_MAX_TIMEOUT = MAX_CONNECT_TIMEOUT
+ADAPTIVE_WARMUP_PORTS = 32    # Probed first at the fixed timeout to seed the RTT estimate
+
+# Banner grabbing (RunConfig.banners): read on the port-scan connection itself
+BANNER_WAIT = 0.5         # Seconds to wait for a service that speaks first
+BANNER_PROBE_WAIT = 1.0   # Seconds to wait for the answer to the HTTP probe sent to silent services
+BANNER_MAX_BYTES = 2048   # Bytes read per step
+BANNER_TEXT_MAX = 256     # Banner characters kept in the port details
+
+# Host discovery (CIDR): a SYN-ACK or RST on any sentinel port means the host is up
+DISCOVERY_PORTS = [80, 443, 22, 445, 3389, 8080]
+DISCOVERY_BATCH_SIZE = 256    # Hosts checked per discovery round
+DISCOVERY_BUDGET_SHARE = 4    # 1/N of max_inflight is reserved for discovery
+
+# Host scheduler: hosts scanned at once (CIDR). Shares DEFAULT_MAX_INFLIGHT.
+DEFAULT_HOST_CONCURRENCY = 16
+
+# DNS
+DNS_TIMEOUT = 2.0         # Seconds per query (resolver lifetime)
+DNS_MAX_WORKERS = 32      # Shared lookup threads for the whole process
+DNS_CACHE_SIZE = 10000    # Cached (name, type) answers, LRU evicted
+DNS_NEGATIVE_TTL = 300    # Used when a negative answer carries no SOA
+
+# Certificate transparency (crt.sh), streamed and capped
+CRTSH_URL = "https://crt.sh/"
+CRTSH_MAX_ENTRIES = 100000
+CRTSH_MAX_BYTES = 256 * 1024 * 1024
+CRTSH_CHUNK_SIZE = 64 * 1024
+
+# RDAP range cache (IP WHOIS)
+RDAP_CACHE_TTL = 24 * 3600  # Seconds an RDAP network answer stays valid
+RDAP_TIMEOUT = 5            # Seconds per direct RDAP server query
+RDAP_CACHE_FILE = "data/cache/rdap.json" # Used by --rdap-cache without a path
+RDAP_SAVE_INTERVAL = 30.0   # Seconds between writes of a persistent RDAP cache (and once at exit)
+
+# Web probing
+WEB_POOL_SIZE = 64               # Pooled connections per scheme
+WEB_MAX_WORKERS = 32             # Concurrent HTTP probes for the whole process
+WEB_MAX_BODY_BYTES = 64 * 1024   # Body prefix read per response (title search)
+WEB_CHUNK_SIZE = 8 * 1024
+WEB_HANDSHAKE_TIMEOUT = 3.0      # Seconds for the TLS handshake that picks a port's scheme (at least the connect timeout)
+# Open ports that get a web probe (plus any PORT_KNOWLEDGE service named HTTP*)
+HTTP_LIKE_PORTS = {
+    80, 81, 82, 83, 84, 85, 443, 591, 631, 800, 808, 3000, 4443, 5000, 5601, 5984,
+    7001, 8000, 8008, 8080, 8081, 8088, 8443, 8888, 9000, 9090, 9200, 9443, 10000
+}
+
+# Checkpointing (runs written with a ResultWriter)
+CHECKPOINT_INTERVAL = 5.0     # Seconds between checkpoint.json rewrites
+CHECKPOINT_PORT_CHUNK = 1024  # Ports per recorded slice of a host's port scan
+
+# Indexed result store (queries across runs)
+RESULTS_DB = "data/results.db"
+
+# Metrics
+METRICS_SAMPLE_INTERVAL = 0.1 # Seconds between in-flight samples (doubles when the buffer fills)
+METRICS_MAX_SAMPLES = 2000
+METRICS_MAX_HOSTS = 1024      # Hosts with their own timings/latency histogram; later hosts only count in the totals
+
+# Diff mode
+DIFF_PASSIVE_MAX_AGE = 86400  # Seconds WHOIS/crt.sh/DNS data from a previous run stays reusable
+
+# Multi-process scanning (ParallelEngine)
+PARALLEL_MIN_PORTS = 512   # Shorter single-host port lists are scanned in-process
+PARALLEL_TASK_HOSTS = 4    # Hosts per worker task, per host thread in the worker
+
+# Rate control (src/ratecontrol.py)
+RATE_INITIAL = 500.0       # Per-host probes/s before any feedback (AIMD)
+RATE_MIN = 10.0            # AIMD never backs off below this
+RATE_CEILING = 50000.0     # AIMD upper bound when no per-host cap is set
+RATE_WINDOW = 64           # Minimum outcomes per AIMD decision
+RATE_WINDOW_ANSWERS = 32   # Answers a window should expect; sparse hosts get longer windows
+RATE_WINDOW_MAX = 2048     # Longest window (hosts that barely answer)
+RATE_LOSS_MARGIN = 0.1     # Minimum relative drop in answers that counts as congestion
+RATE_BASELINE_WEIGHT = 0.1 # Moving-average weight of each clean window in a host's answer baseline
+RATE_DECREASE = 0.5        # Multiplicative back-off
+RATE_INCREASE_STEP = 50.0  # Additive increase per clean window, after slow start
+RATE_BURST_SECONDS = 0.05  # Bucket depth, in seconds of the current rate
+RATE_RESERVE_HORIZON = 0.25 # Seconds of tokens that can be reserved ahead; later callers poll
+RATE_HOST_CACHE = 4096     # Per-host controllers kept (least recently used are dropped)
+
+# Coordinator/worker mode (src/distributed.py)
+DISTRIBUTED_PORT = 8765
+DISTRIBUTED_HOSTS_PER_UNIT = 16    # Hosts per work unit
+DISTRIBUTED_PORTS_PER_UNIT = 4096  # Ports per work unit; longer lists split into several units
+DISTRIBUTED_LEASE = 30.0           # Seconds a worker holds a unit without a heartbeat
+DISTRIBUTED_MAX_ATTEMPTS = 3       # Leases per unit before it is given up
+DISTRIBUTED_POLL = 1.0             # Worker wait between lease attempts when nothing is ready
+
+# Gradio UI
+UI_UPDATE_INTERVAL = 0.5  # Seconds between progress updates pushed to the browser
+
 # Limits
 MAX_CIDR_HOSTS = 64
+MAX_SUBDOMAIN_HOSTS = 64 # Unique subdomain IPs sent to ports/web per run
 MAX_RUNTIME_SOFT_LIMIT = 110 # Stop starting tasks if 110s elapsed (limit is 120s)
 
 # --- PORT LISTS (Reference: Nmap top ports) ---
@@ -0,0 +1,119 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .config import DIFF_PASSIVE_MAX_AGE
+from .models import ScanResult, ScanSummary
+from .portmap import PortBitmap
+from .storage.writer import load_run, STREAM_FILE
+
+# Modules whose data comes from third parties rather than the target itself
+PASSIVE_MODULES = ("dns", "whois", "subdomains")
+
+def _same_target(a: str, b: str) -> bool:
+    return a.strip().lower() == b.strip().lower()
+
+def _peek_target(run_dir: str) -> Optional[str]:
+    """
+    Target of a streamed run, read from the first line of results.jsonl.
+    """
+    try:
+        with open(os.path.join(run_dir, STREAM_FILE), "r", encoding="utf-8") as f:
+            return json.loads(f.readline())["config"]["target_input"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+class PreviousRun:
+    """
+    The most recent earlier run of a target. Passive data is reusable while
+    it is younger than max_age; age counts from when it was first fetched,
+    so data carried over run after run still expires.
+    """
+    def __init__(self, run_dir: str, result: ScanResult, max_age: float = DIFF_PASSIVE_MAX_AGE):
+        self.run_dir = run_dir
+        self.result = result
+        self.passive_as_of = (result.summary.changes or {}).get("passive_as_of") or result.summary.start_time
+        age = (datetime.now() - datetime.fromisoformat(self.passive_as_of)).total_seconds()
+        self.fresh = age <= max_age
+
+    def passive_data(self, target: str) -> Dict[str, Any]:
+        """
+        Reusable passive module results for a host (errors are never reused).
+        """
+        if not self.fresh:
+            return {}
+        res = self.result.results.get(target, {})
+        return {
+            mod: res[mod] for mod in PASSIVE_MODULES
+            if mod in res and not (isinstance(res[mod], dict) and "error" in res[mod])
+        }
+
+    def open_ports(self, target: str) -> List[int]:
+        return self.result.results.get(target, {}).get("ports", {}).get("open_ports", [])
+
+def find_previous_run(target_input: str, base_dir: str = "data/runs",
+                      exclude: Optional[str] = None) -> Optional[PreviousRun]:
+    """
+    Newest finished run in base_dir for the same target. Run directories are
+    timestamp-named, so they are walked newest first.
+    """
+    if not os.path.isdir(base_dir):
+        return None
+    for name in sorted(os.listdir(base_dir), reverse=True):
+        run_dir = os.path.join(base_dir, name)
+        if exclude and os.path.abspath(run_dir) == os.path.abspath(exclude):
+            continue
+        peeked = _peek_target(run_dir)
+        if peeked is not None and not _same_target(peeked, target_input):
+            continue
+        result = load_run(run_dir)
+        if result and _same_target(result.config.target_input, target_input):
+            return PreviousRun(run_dir, result)
+    return None
+
+class ChangeTracker:
+    """
+    Compares hosts against the previous run as they complete and builds the
+    change set: new/closed ports per host, new/missing hosts, new subdomains
+    and new/cleared risk tags. Ports and subdomains are only compared when
+    both runs collected them.
+    """
+    def __init__(self, previous: PreviousRun):
+        self.previous = previous
+        self.seen = set()
+        self.new_hosts = []
+        self.ports = {} # host -> {"new": [...], "closed": [...]}
+        self.new_subdomains = set()
+
+    def add_host(self, target: str, res: Dict[str, Any]):
+        self.seen.add(target)
+        old = self.previous.result.results.get(target)
+        if old is None:
+            self.new_hosts.append(target)
+            old = {}
+
+        if "ports" in res and "ports" in old:
+            now = PortBitmap(res["ports"].get("open_ports", []))
+            before = PortBitmap(old["ports"].get("open_ports", []))
+            opened, closed = now - before, before - now
+            if opened or closed:
+                self.ports[target] = {"new": opened.to_list(), "closed": closed.to_list()}
+
+        if isinstance(res.get("subdomains"), list) and isinstance(old.get("subdomains"), list):
+            self.new_subdomains.update(set(res["subdomains"]) - set(old["subdomains"]))
+
+    def build(self, summary: ScanSummary) -> Dict[str, Any]:
+        prev = self.previous.result.summary
+        return {
+            "previous_run": self.previous.run_dir,
+            "previous_start": prev.start_time,
+            "passive_reused": self.previous.fresh,
+            "passive_as_of": self.previous.passive_as_of if self.previous.fresh else summary.start_time,
+            "new_hosts": sorted(self.new_hosts),
+            "missing_hosts": sorted(h for h in self.previous.result.results if h not in self.seen),
+            "ports": self.ports,
+            "new_subdomains": sorted(self.new_subdomains),
+            "new_risk_tags": sorted(set(summary.risk_tags) - set(prev.risk_tags)),
+            "cleared_risk_tags": sorted(set(prev.risk_tags) - set(summary.risk_tags))
+        }
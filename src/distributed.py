@@ -0,0 +1,633 @@
+import hmac
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from .models import RunConfig, ScanResult, TargetType
+from .config import (DISTRIBUTED_PORT, DISTRIBUTED_HOSTS_PER_UNIT, DISTRIBUTED_PORTS_PER_UNIT, DISTRIBUTED_LEASE,
+                     DISTRIBUTED_MAX_ATTEMPTS, DISTRIBUTED_POLL, DISCOVERY_BUDGET_SHARE, MAX_SUBDOMAIN_HOSTS)
+from .engine import ReconEngine, RunContext, SummaryBuilder, resolve_port_list, plan_cidr
+from .metrics import ScanMetrics
+from .ratecontrol import RateLimiter
+from .storage.writer import ResultWriter
+from .utils import validate_target, setup_logger
+
+logger = setup_logger()
+
+TOKEN_HEADER = "X-Recon-Token"
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def merge_host_results(merged: Dict[str, Any], res: Dict[str, Any]):
+    """
+    Folds one work unit's result for a host into the host's merged result.
+    Port slices add up, timings add up; any other module keeps the first result.
+    """
+    for mod, data in res.items():
+        if mod == "_timings":
+            timings = merged.setdefault("_timings", {})
+            for m, d in data.items():
+                timings[m] = timings.get(m, 0) + d
+        elif mod == "ports" and isinstance(merged.get("ports"), dict) and isinstance(data, dict):
+            ports = merged["ports"]
+            ports["open_ports"] = sorted(set(ports.get("open_ports", [])) | set(data.get("open_ports", [])))
+            ports["scanned_count"] = ports.get("scanned_count", 0) + data.get("scanned_count", 0)
+            ports["details"] = sorted(ports.get("details", []) + data.get("details", []), key=lambda d: d["port"])
+        else:
+            merged.setdefault(mod, data)
+
+class _Batch:
+    """
+    One host batch and the units still out for it.
+    """
+    def __init__(self, index: int, hosts: List[List], target_type: TargetType, web_phase: bool):
+        self.index = index
+        self.target_type = target_type
+        self.hosts = hosts         # [[host, hostnames or None]]
+        self.web_phase = web_phase # web runs as its own unit once every port slice is in
+        self.deferred = []         # port-slice units queued once discovery (slice 0) reports the live hosts
+        self.stage = "scan"
+        self.pending = 0
+        self.results = {}          # host -> merged result
+
+class Coordinator:
+    """
+    Splits a run into work units and hands them to workers over HTTP.
+    A unit is a batch of DISTRIBUTED_HOSTS_PER_UNIT hosts x one slice of
+    DISTRIBUTED_PORTS_PER_UNIT ports x the modules for that slice: the
+    first slice carries the passive modules; when the port list spans
+    several slices, web follows as a separate unit for the batch once its
+    open ports are merged. CIDR hosts are batched lazily, and the
+    subdomain stage runs once the main target's units are done. With host
+    discovery, only the first slice runs the liveness pre-pass; the other
+    slices are queued with the live hosts it reports.
+
+    Units are leased for `lease` seconds and workers heartbeat while they
+    work; a unit whose lease runs out (dead or stuck worker) goes back to
+    the front of the queue, up to DISTRIBUTED_MAX_ATTEMPTS leases. The
+    first result for a unit wins. Finished hosts go through SummaryBuilder
+    and the writer exactly as in ReconEngine.run().
+
+    Rate caps (max_rate, host_rate) are split between the workers that have
+    leased so far: each gets max_rate / workers, and host_rate divided by
+    the number of port slices of a host that can run at once. Lease and
+    heartbeat replies carry the current split, so a worker's limiter
+    follows as workers join.
+
+    Protocol (JSON bodies, TOKEN_HEADER when a token is set):
+      POST /lease      {"worker"}                   -> 200 {"unit", "config", "lease", "rate"},
+                                                       204 nothing ready yet, 410 run finished
+      POST /heartbeat  {"worker", "unit"}           -> 200 {"lease", "rate"}, or 409 when the lease was lost
+      POST /result     {"worker", "unit", "results", "discovery", "live", "metrics"} -> 200
+      POST /fail       {"worker", "unit", "error"}  -> 200
+      GET  /status                                  -> progress counters
+    """
+    def __init__(self, config: RunConfig, host: str = "127.0.0.1", port: int = DISTRIBUTED_PORT,
+                 token: Optional[str] = None, writer: Optional[ResultWriter] = None,
+                 hosts_per_unit: int = DISTRIBUTED_HOSTS_PER_UNIT, ports_per_unit: int = DISTRIBUTED_PORTS_PER_UNIT,
+                 lease: float = DISTRIBUTED_LEASE):
+        if config.diff_mode:
+            raise ValueError("diff mode is not supported by the coordinator")
+        self.config = config
+        self.token = token
+        self.writer = writer
+        self.lease_seconds = lease
+        self.hosts_per_unit = hosts_per_unit
+        self.ports_per_unit = ports_per_unit
+        self.stats = {"units": 0, "completed": 0, "redispatched": 0, "failed": 0, "duplicates": 0, "workers": []}
+
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._ready = deque()  # units waiting for a worker
+        self._units = {}       # unit id -> unit, until its result is in
+        self._leased = {}      # unit id -> (worker, lease deadline)
+        self._attempts = {}    # unit id -> leases handed out
+        self._batches = {}     # batch index -> open _Batch
+        self._batch_count = 0
+        self._source = None    # iterator of host batches for the current stage
+        self._spec = None      # (target_type, modules, discovery) of the current stage
+        self._stopped = False
+        self._ports = resolve_port_list(config)
+        self._port_slices = max(1, -(-len(self._ports) // ports_per_unit)) if "ports" in config.enabled_modules else 1
+        self._config_payload = json.loads(config.json())
+
+        self._builder = SummaryBuilder()
+        self._results = {}
+        self._subdomains = set()
+        self._scanned_ips = set()
+        self._discovery = None
+        self._subdomain_notes = None
+        self._cidr_notes = None
+        self.metrics = ScanMetrics() if config.metrics else None
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.coordinator = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # --- Run ---
+
+    def serve(self, linger: float = 2 * DISTRIBUTED_POLL) -> ScanResult:
+        """
+        Serves work units until every unit is done (or given up), then
+        returns the merged ScanResult. Leases keep being answered with 410
+        for `linger` seconds afterwards so idle workers exit cleanly.
+        """
+        config = self.config
+        self._start_time = datetime.now()
+        normalized_target, target_type = validate_target(config.target_input)
+        if target_type == TargetType.CIDR:
+            hosts, _, self._cidr_notes = plan_cidr(config, normalized_target)
+            if config.host_discovery:
+                self._discovery = {"probed": 0, "alive": 0, "dead": 0, "by_reason": {}}
+        else:
+            hosts = iter([normalized_target])
+        if self.writer:
+            self.writer.open_stream(config)
+        self._set_stage(((h, None) for h in hosts), target_type, config.enabled_modules,
+                        target_type == TargetType.CIDR and config.host_discovery)
+
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        logger.info(f"Coordinator for {config.target_input} listening on {self.url}")
+        try:
+            subdomain_stage = False
+            while True:
+                with self._lock:
+                    self._reap()
+                    idle = not (self._ready or self._leased or self._batches) and (self._source is None or self._stopped)
+                if not idle:
+                    time.sleep(0.1)
+                    continue
+                if not subdomain_stage:
+                    subdomain_stage = True
+                    if self._start_subdomain_stage():
+                        continue
+                break
+            result = self._finalize()
+            self._finished.set()
+            time.sleep(linger)
+            return result
+        finally:
+            self._finished.set()
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _set_stage(self, hosts: Iterable[Tuple[str, Optional[List[str]]]], target_type: TargetType,
+                   modules: List[str], discovery: bool):
+        with self._lock:
+            self._source = _chunks(([h, names] for h, names in hosts), self.hosts_per_unit)
+            self._spec = (target_type, modules, discovery)
+
+    def _start_subdomain_stage(self) -> bool:
+        """
+        Resolves the discovered subdomains and queues their new IPs, as the
+        engine's subdomain stage does. Returns False when there is nothing to scan.
+        """
+        if "subdomain_scan" not in self.config.enabled_modules or not self._subdomains or self._stopped:
+            return False
+        from .modules.dns_module import resolve_many, group_by_address
+        resolved = resolve_many(sorted(self._subdomains))
+        by_ip = group_by_address(resolved)
+        new_ips = [ip for ip in by_ip if ip not in self._scanned_ips]
+        to_scan = new_ips[:MAX_SUBDOMAIN_HOSTS]
+        self._subdomain_notes = {
+            "names": len(self._subdomains),
+            "resolved": len(resolved),
+            "unique_ips": len(by_ip),
+            "scanned": len(to_scan),
+            "skipped": len(new_ips) - len(to_scan)
+        }
+        logger.info(f"Subdomain stage: {len(resolved)} names -> {len(by_ip)} unique IPs, scanning {len(to_scan)}")
+        modules = [m for m in self.config.enabled_modules if m in ("ports", "web")]
+        self._set_stage(((ip, by_ip[ip]) for ip in to_scan), TargetType.IP, modules, False)
+        return bool(to_scan)
+
+    def _finalize(self) -> ScanResult:
+        end_time = datetime.now()
+        summary = self._builder.build(self.config, self._start_time, end_time, self._cidr_notes)
+        summary.subdomain_scan = self._subdomain_notes
+        summary.discovery = self._discovery
+        logger.info(f"Distributed run finished: {self.stats['completed']} units from {len(self.stats['workers'])} workers, "
+                    f"{self.stats['redispatched']} re-dispatched, {self.stats['failed']} given up")
+        if self.writer:
+            self.writer.write_summary(summary)
+            self.writer.close_stream()
+            if self.metrics:
+                self.writer.save_metrics(self.metrics)
+        return ScanResult(
+            config=self.config,
+            summary=summary,
+            results=self._results,
+            metrics=self.metrics.to_dict() if self.metrics else None,
+            logs=[]
+        )
+
+    # --- Units (called with self._lock held) ---
+
+    def _fill(self):
+        """
+        Turns the next host batch of the current stage into units.
+        """
+        if self._source is None or self._stopped:
+            return
+        limit = self.config.runtime_limit
+        elapsed = (datetime.now() - self._start_time).total_seconds()
+        if limit is not None and elapsed > limit:
+            logger.warning(f"Soft runtime limit reached ({elapsed}s). Stopping new work units.")
+            self._stopped = True
+            return
+        hosts = next(self._source, None)
+        if hosts is None:
+            self._source = None
+            return
+
+        target_type, modules, discovery = self._spec
+        slices = [self._ports[i:i + self.ports_per_unit] for i in range(0, len(self._ports), self.ports_per_unit)] \
+            if "ports" in modules else [None]
+        batch = _Batch(self._batch_count, hosts, target_type, web_phase="web" in modules and len(slices) > 1)
+        self._batch_count += 1
+        self._batches[batch.index] = batch
+
+        scan_modules = [m for m in modules if m != "subdomain_scan" and not (m == "web" and batch.web_phase)]
+        for i, ports in enumerate(slices):
+            # Later slices only repeat what the port scan needs (a domain's address)
+            mods = scan_modules if i == 0 else [m for m in scan_modules if m == "ports" or (m == "dns" and target_type == TargetType.DOMAIN)]
+            unit = {
+                "kind": "scan", "target_type": target_type.value, "hosts": hosts, "ports": ports,
+                "modules": mods, "discovery": discovery and i == 0
+            }
+            if discovery and i > 0:
+                batch.deferred.append((f"{batch.index}.{i}", unit)) # hosts filled in from slice 0's live list
+            else:
+                self._queue(batch, f"{batch.index}.{i}", unit)
+
+    def _rate_caps(self) -> Optional[Dict[str, Optional[float]]]:
+        """
+        This worker's share of the rate caps, None without rate settings.
+        Workers that stopped leasing still count, so the split errs low.
+        """
+        config = self.config
+        if not (config.max_rate or config.host_rate or config.rate_control):
+            return None
+        workers = max(1, len(self.stats["workers"]))
+        return {
+            "max_rate": config.max_rate / workers if config.max_rate else None,
+            "host_rate": config.host_rate / min(workers, self._port_slices) if config.host_rate else None
+        }
+
+    def _queue(self, batch: _Batch, unit_id: str, unit: Dict[str, Any]):
+        unit.update(id=unit_id, batch=batch.index)
+        batch.pending += 1
+        self._units[unit_id] = unit
+        self._attempts[unit_id] = 0
+        self._ready.append(unit)
+        self.stats["units"] += 1
+
+    def _reap(self):
+        now = time.monotonic()
+        for unit_id, (worker, deadline) in list(self._leased.items()):
+            if deadline < now:
+                del self._leased[unit_id]
+                logger.warning(f"Lease on unit {unit_id} held by {worker} expired")
+                self._retry(self._units[unit_id], "lease expired")
+
+    def _retry(self, unit: Dict[str, Any], error: str):
+        if self._attempts[unit["id"]] >= DISTRIBUTED_MAX_ATTEMPTS:
+            logger.error(f"Giving up on unit {unit['id']} after {self._attempts[unit['id']]} attempts: {error}")
+            self.stats["failed"] += 1
+            del self._units[unit["id"]]
+            self._unit_done(unit, None)
+        else:
+            self.stats["redispatched"] += 1
+            self._ready.appendleft(unit)
+
+    def _unit_done(self, unit: Dict[str, Any], payload: Optional[Dict[str, Any]]):
+        batch = self._batches[unit["batch"]]
+        if payload:
+            for host, res in payload.get("results", {}).items():
+                merge_host_results(batch.results.setdefault(host, {}), res)
+            if payload.get("metrics") and self.metrics:
+                self.metrics.merge(payload["metrics"])
+            if unit["discovery"] and payload.get("discovery") and self._discovery is not None:
+                for key in ("probed", "alive", "dead"):
+                    self._discovery[key] += payload["discovery"].get(key, 0)
+                for reason, n in payload["discovery"].get("by_reason", {}).items():
+                    self._discovery["by_reason"][reason] = self._discovery["by_reason"].get(reason, 0) + n
+        if unit["discovery"] and batch.deferred:
+            deferred, batch.deferred = batch.deferred, []
+            if payload is None:
+                logger.error(f"Batch {batch.index}: discovery unit given up, skipping its other port slices")
+            else:
+                live = set(payload.get("live") or [])
+                batch.hosts = [[h, names] for h, names in batch.hosts if h in live]
+                for unit_id, later in deferred:
+                    if batch.hosts:
+                        self._queue(batch, unit_id, dict(later, hosts=batch.hosts))
+        batch.pending -= 1
+        if batch.pending:
+            return
+
+        if batch.stage == "scan" and batch.web_phase:
+            open_ports = {host: res["ports"]["open_ports"] for host, res in batch.results.items()
+                          if isinstance(res.get("ports"), dict) and res["ports"].get("open_ports")}
+            ips = {host: batch.results[host]["ports"].get("ip", host) for host in open_ports}
+            if open_ports:
+                batch.stage = "web"
+                names = dict((h, n) for h, n in batch.hosts)
+                self._queue(batch, f"{batch.index}.web", {
+                    "kind": "web", "target_type": batch.target_type.value, "hosts": [[h, names.get(h)] for h in open_ports],
+                    "ports": None, "modules": ["web"], "discovery": False, "open_ports": open_ports, "ips": ips
+                })
+                return
+        del self._batches[batch.index]
+        for host, res in batch.results.items():
+            if batch.web_phase:
+                res.setdefault("web", {})
+            self._collect(host, res)
+
+    def _collect(self, target: str, target_res: Dict[str, Any]):
+        target_res.setdefault("_timings", {})
+        self._builder.add_host(target, target_res)
+        if self.writer:
+            for mod, data in target_res.items():
+                if mod != "_timings":
+                    self.writer.write_module(target, mod, data)
+            self.writer.write_host(target, target_res["_timings"])
+        if self.config.retain_results:
+            self._results[target] = target_res
+        if isinstance(target_res.get("subdomains"), list):
+            self._subdomains.update(target_res["subdomains"])
+        if isinstance(target_res.get("ports"), dict):
+            self._scanned_ips.add(target_res["ports"].get("ip"))
+
+    # --- Protocol handlers (called by _Handler) ---
+
+    def lease(self, body: Dict[str, Any]):
+        worker = str(body.get("worker", "?"))
+        with self._lock:
+            if worker not in self.stats["workers"]:
+                self.stats["workers"].append(worker)
+            if self._finished.is_set():
+                return 410, {"finished": True}
+            self._reap()
+            if not self._ready:
+                self._fill()
+            if not self._ready:
+                return 204, None
+            unit = self._ready.popleft()
+            self._attempts[unit["id"]] += 1
+            self._leased[unit["id"]] = (worker, time.monotonic() + self.lease_seconds)
+            return 200, {"unit": unit, "config": self._config_payload, "lease": self.lease_seconds, "rate": self._rate_caps()}
+
+    def heartbeat(self, body: Dict[str, Any]):
+        with self._lock:
+            entry = self._leased.get(body.get("unit"))
+            if entry is None or entry[0] != body.get("worker"):
+                return 409, {"error": "lease lost"}
+            self._leased[body["unit"]] = (entry[0], time.monotonic() + self.lease_seconds)
+            return 200, {"lease": self.lease_seconds, "rate": self._rate_caps()}
+
+    def complete(self, body: Dict[str, Any]):
+        with self._lock:
+            unit = self._units.pop(body.get("unit"), None)
+            if unit is None:
+                self.stats["duplicates"] += 1
+                return 200, {"accepted": False}
+            # A late result from an expired lease still counts if it is the first
+            self._leased.pop(unit["id"], None)
+            if unit in self._ready:
+                self._ready.remove(unit)
+            self.stats["completed"] += 1
+            self._unit_done(unit, body)
+            return 200, {"accepted": True}
+
+    def fail(self, body: Dict[str, Any]):
+        with self._lock:
+            unit = self._units.get(body.get("unit"))
+            if unit is not None and self._leased.pop(unit["id"], None) is not None:
+                logger.warning(f"Unit {unit['id']} failed on {body.get('worker')}: {body.get('error')}")
+                self._retry(unit, str(body.get("error")))
+            return 200, {}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, ready=len(self._ready), leased=len(self._leased), open_batches=len(self._batches),
+                        hosts_done=self._builder.hosts, finished=self._finished.is_set())
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path != "/status":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, self.server.coordinator.status())
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        coordinator = self.server.coordinator
+        routes = {"/lease": coordinator.lease, "/heartbeat": coordinator.heartbeat,
+                  "/result": coordinator.complete, "/fail": coordinator.fail}
+        route = routes.get(self.path)
+        if route is None:
+            return self._reply(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON"})
+        self._reply(*route(body))
+
+    def _authorized(self) -> bool:
+        token = self.server.coordinator.token
+        if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), token):
+            self._reply(403, {"error": "invalid token"})
+            return False
+        return True
+
+    def _reply(self, code: int, payload: Any):
+        data = b"" if code == 204 else json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("coordinator: " + format % args)
+
+# --- Worker ---
+
+def execute_unit(config: RunConfig, unit: Dict[str, Any], rate: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """
+    Runs one work unit with the regular engine code and returns
+    {"results": {host: result}, "discovery": stats or None, "live": hosts that
+    passed discovery or None, "metrics": dict or None}.
+    rate: the worker's limiter, kept across units; without it the unit gets
+    one with the config's full caps.
+    """
+    target_type = TargetType(unit["target_type"])
+    config = config.copy(update={"enabled_modules": unit["modules"], "runtime_limit": None})
+    ctx = RunContext(config, unit["ports"] or resolve_port_list(config))
+    if rate is not None:
+        ctx.rate = rate
+    hostnames = {host: names for host, names in unit["hosts"] if names}
+    hosts = [host for host, _ in unit["hosts"]]
+    discovery = None
+    live = None
+
+    if unit["kind"] == "web":
+        from .modules.web_module import run_web_probe
+
+        def probe(host):
+            start = time.time()
+            ip = unit.get("ips", {}).get(host, host)
+            data = run_web_probe(hostnames[host][0] if host in hostnames else host, timeout=config.connect_timeout,
+                                 open_ports=unit["open_ports"][host], metrics=ctx.metrics,
+                                 rate=ctx.rate.for_host(ip) if ctx.rate else None)
+            duration = time.time() - start
+            if ctx.metrics:
+                ctx.metrics.module(host, "web", duration)
+            return {"web": data, "_timings": {"web": duration}}
+        results = dict(ReconEngine._schedule(hosts, ctx.tracked(probe), max(1, min(config.host_concurrency, len(hosts))),
+                                             datetime.now(), limit=None))
+    else:
+        budget = config.max_inflight
+        if unit["discovery"]:
+            from .modules.discovery_module import iter_live_hosts
+            discovery = {}
+            discovery_budget = max(1, budget // DISCOVERY_BUDGET_SHARE)
+            budget = max(1, budget - discovery_budget)
+            live = []
+            hosts = _recorded(iter_live_hosts(hosts, discovery, timeout=config.connect_timeout,
+                                              max_inflight=discovery_budget, metrics=ctx.metrics), live)
+        workers = max(1, min(config.host_concurrency, len(unit["hosts"]), budget))
+        ctx.inflight_budget = max(1, budget // workers)
+        results = dict(ReconEngine()._scan_hosts(hosts, target_type, ctx, workers, datetime.now(), {}, hostnames or None))
+    return {"results": results, "discovery": discovery, "live": live,
+            "metrics": ctx.metrics.to_dict() if ctx.metrics else None}
+
+def _recorded(items: Iterable, seen: List) -> Iterator:
+    for item in items:
+        seen.append(item)
+        yield item
+
+class _Client:
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def post(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        request = urllib.request.Request(self.url + path, data=json.dumps(body, default=str).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read()
+                return response.status, json.loads(data) if data else {}
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+
+def _update_rate(rate: Optional[RateLimiter], config: RunConfig, caps: Optional[Dict[str, Any]]) -> Optional[RateLimiter]:
+    """
+    Applies the coordinator's current rate split to the worker's limiter,
+    creating it on the first lease.
+    """
+    if caps is None:
+        return rate
+    if rate is None:
+        return RateLimiter(caps["max_rate"], caps["host_rate"], config.rate_control)
+    rate.set_caps(caps["max_rate"], caps["host_rate"])
+    return rate
+
+def _heartbeat(client: _Client, worker: str, unit_id: str, interval: float, stop: threading.Event,
+               rate: Optional[RateLimiter] = None):
+    while not stop.wait(interval):
+        try:
+            status, body = client.post("/heartbeat", {"worker": worker, "unit": unit_id})
+        except OSError:
+            continue
+        if status == 409:
+            logger.warning(f"Lease on unit {unit_id} lost; finishing it anyway")
+            return
+        if rate is not None and body.get("rate"):
+            rate.set_caps(body["rate"]["max_rate"], body["rate"]["host_rate"])
+
+def run_worker(url: str, token: Optional[str] = None, worker_id: Optional[str] = None,
+               poll: float = DISTRIBUTED_POLL, retries: int = 5) -> int:
+    """
+    Leases and runs work units from a coordinator until it reports the run
+    finished (or stays unreachable for `retries` attempts in a row).
+    Returns the number of units completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    client = _Client(url, token)
+    completed = 0
+    failures = 0
+    rate = None # one limiter for the whole run, so AIMD state carries across units
+    logger.info(f"Worker {worker_id} polling {url}")
+    while True:
+        try:
+            status, body = client.post("/lease", {"worker": worker_id})
+        except OSError as e:
+            failures += 1
+            if failures >= retries:
+                logger.error(f"Coordinator unreachable ({e}); worker exiting")
+                return completed
+            time.sleep(poll)
+            continue
+        failures = 0
+        if status == 410:
+            return completed
+        if status == 403:
+            logger.error("Coordinator rejected the worker token")
+            return completed
+        if status != 200:
+            time.sleep(poll)
+            continue
+
+        unit = body["unit"]
+        config = RunConfig.parse_obj(body["config"])
+        rate = _update_rate(rate, config, body.get("rate"))
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(client, worker_id, unit["id"], body["lease"] / 3, stop, rate), daemon=True).start()
+        try:
+            payload = execute_unit(config, unit, rate)
+        except Exception as e:
+            logger.error(f"Unit {unit['id']} failed: {e}")
+            payload = None
+            error = str(e)
+        finally:
+            stop.set()
+        try:
+            if payload is None:
+                client.post("/fail", {"worker": worker_id, "unit": unit["id"], "error": error})
+            else:
+                client.post("/result", dict(payload, worker=worker_id, unit=unit["id"]))
+                completed += 1
+        except OSError as e:
+            # The lease runs out and the unit is handed to another worker
+            logger.error(f"Could not report unit {unit['id']}: {e}")
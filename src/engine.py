@@ -1,264 +1,644 @@
+import os
 import time
 import logging
+import contextlib
 import concurrent.futures
+from functools import partial
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Callable
 
 from .models import RunConfig, ScanResult, ModuleResult, ScanSummary, TargetType
-from .utils import validate_target, expand_cidr, setup_logger
-from .config import MAX_RUNTIME_SOFT_LIMIT, PROFILES
+from .utils import validate_target, iter_cidr_hosts, cidr_host_count, setup_logger
+from .config import MAX_RUNTIME_SOFT_LIMIT, MAX_SUBDOMAIN_HOSTS, DISCOVERY_BUDGET_SHARE, CHECKPOINT_PORT_CHUNK, PROFILES
+from .storage.writer import ResultWriter, read_stream, STREAM_FILE
+from .storage.checkpoint import Checkpoint, ChunkTracker
+from .portmap import PortBitmap, PortMatrix
+from .diff import find_previous_run, ChangeTracker
+from .metrics import ScanMetrics
+from .ratecontrol import RateLimiter
 
 # Modules
-from .modules.dns_module import run_dns_recon
-from .modules.whois_module import run_whois_recon
-from .modules.subdomains import run_subdomain_recon
+# Only the socket-level modules load eagerly. The others pull in dnspython,
+# whois/ipwhois and requests, so they are imported when a run enables them
+# and a ports-only scan starts without those libraries.
 from .modules.ports_module import run_port_scan
-from .modules.web_module import run_web_probe
+from .modules.discovery_module import iter_live_hosts
 
 logger = setup_logger()
 
-class ReconEngine:
+def timed_execution(func, *args):
+    s = time.time()
+    res = func(*args)
+    d = time.time() - s
+    return res, d
+
+def resolve_port_list(config: RunConfig) -> List[int]:
+    if config.ports:
+        return config.ports
+    if config.profile_name == "Custom":
+        # Use Top 100 as safe default for custom active scan
+        return PROFILES["Fast"]["port_list"]
+    return PROFILES.get(config.profile_name, PROFILES["Fast"])["port_list"]
+
+# Risk tag -> ports that raise it when open on any host
+RISK_PORT_RULES = {
+    "ssh_exposed": [22],
+    "web_exposed": [80, 443],
+    "rdp_exposed": [3389],
+    "ftp_exposed": [21],
+    "telnet_exposed": [23],
+    "rpc_exposed": [135],
+    "smb_exposed": [445],
+}
+_RISK_MASKS = {tag: PortBitmap(ports) for tag, ports in RISK_PORT_RULES.items()}
+
+class SummaryBuilder:
+    """
+    Folds per-host results into the run summary as each host completes,
+    so the engine does not need every host's results in memory at the end.
+    Open ports are kept as a union bitmap plus a host x port matrix; port
+    risk tags are evaluated once, bitwise, on the union.
+    """
+    # Ports not flagged by the nonstandard_ports_open heuristic
+    COMMON_ALLOWS = PortBitmap([20, 21, 22, 23, 25, 53, 80, 110, 135, 139, 143, 443, 445, 587, 993, 995, 3306, 3389, 5900, 8000, 8080, 8443])
+
     def __init__(self):
-        pass
+        self.hosts = 0
+        self.open_ports_total = 0
+        self.subdomains = 0
+        self.risk_tags = set()
+        self.module_timings = {}
+        self.port_union = PortBitmap()
+        self.port_matrix = PortMatrix()
 
-    def run(self, config: RunConfig) -> ScanResult:
-        start_time = datetime.now()
-        logger.info(f"Starting scan for {config.target_input} with profile {config.profile_name}")
-        
-        # 1. Validation & Expansion
-        normalized_target, target_type = validate_target(config.target_input)
-        targets_to_scan = [normalized_target]
-        cidr_notes = None
-        
-        if target_type == TargetType.CIDR:
-            expanded, skipped_count = expand_cidr(normalized_target, config.cidr_limit)
-            targets_to_scan = expanded
-            cidr_notes = {"cap_applied": True, "limit": config.cidr_limit, "skipped": skipped_count}
-            logger.info(f"CIDR expansion: scanning {len(targets_to_scan)} hosts, skipped {skipped_count}")
+    def add_host(self, target: str, res: Dict[str, Any]):
+        self.hosts += 1
 
-        # Initialize Results
-        scan_results_data = {}
-        target_summaries = {
-             "open_ports": 0,
-             "subdomains": 0
-        }
-        
-        # 2. Loop through targets (Single or List)
-        # For CIDR, we might want to parallelize HOSTS? 
-        # But we must respect concurrency limits. 
-        # The prompt implies "Single target per run" usually, but CIDR is supported.
-        # For CIDR, we should probably run simpler checks (ping/port) rather than full DNS/Whois per IP?
-        # The PRD says for CIDR: "Input 192.0.2.0/28 -> host reachability ... + controlled port scanning".
-        
-        # We will iterate sequentially over targets to ensure control, or use a small pool.
-        # Given the "2 minute goal", sequential for 64 hosts might be too slow if we do full scans.
-        # But usually CIDR scan implies Port Scan mainly.
-        
-        for target in targets_to_scan:
-            # Check Runtime Guard
-            elapsed = (datetime.now() - start_time).total_seconds()
-            if elapsed > MAX_RUNTIME_SOFT_LIMIT:
-                logger.warning(f"Soft runtime limit reached ({elapsed}s). Stopping new tasks.")
-                break
-                
-            # Per-target results
-            target_res = {}
-            
-            # Decide what to run based on Config + Profile
-            # The config.enabled_modules list governs this.
-            
-            # --- PASSIVE MODULES (Parallel) ---
-            passive_futures = {}
-            # Track start times for passive block
-            # Since they run in parallel, wall clock is shared. 
-            # We'll just time the individual execution inside the future? 
-            # No, `run_dns_recon` returns dict. 
-            # We need to wrap it to get time.
-            
-            def timed_execution(func, *args):
-                s = time.time()
-                res = func(*args)
-                d = time.time() - s
-                return res, d
-
-            module_times = {} # store duration for this target
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                if "dns" in config.enabled_modules and target_type in [TargetType.DOMAIN]:
-                    passive_futures["dns"] = executor.submit(timed_execution, run_dns_recon, target)
-                
-                if "whois" in config.enabled_modules:
-                    passive_futures["whois"] = executor.submit(timed_execution, run_whois_recon, target, target_type)
-                    
-                if "subdomains" in config.enabled_modules and target_type == TargetType.DOMAIN:
-                    passive_futures["subdomains"] = executor.submit(timed_execution, run_subdomain_recon, target)
-
-                # Collect Passive Results
-                for mod, future in passive_futures.items():
-                    try:
-                        data, dur = future.result()
-                        target_res[mod] = data
-                        module_times[mod] = dur
-                        if mod == "subdomains":
-                            target_summaries["subdomains"] += len(data)
-                    except Exception as e:
-                        target_res[mod] = {"error": str(e)}
-
-            # --- ACTIVE MODULES (Sequential to control noise) ---
-            # Ports
-            if "ports" in config.enabled_modules:
-                s_ports = time.time()
-                # Resolve profile ports
-                ports_to_scan = []
-                profile_def = PROFILES.get(config.profile_name, PROFILES["Custom"])
-                if config.profile_name == "Custom":
-                    # For custom, maybe default to Top 100 if not specified? 
-                    # Or Config should have generic lists? 
-                    # Use Top 100 as safe default for custom active scan
-                    ports_to_scan = PROFILES["Fast"]["port_list"]
-                else:
-                    ports_to_scan = profile_def["port_list"]
-                
-                # Check target is valid IP or Domain (resolve domain first?)
-                # Port scanner takes IP usually.
-                scan_ip = target
-                if target_type == TargetType.DOMAIN:
-                    # Quick resolve for port scan
-                    try:
-                        scan_ip = list(target_res.get("dns", {}).get("A", []))[0]
-                    except:
-                        scan_ip = target # Try scanning hostname directly (socket supports it)
-
-                if scan_ip:
-                    port_data = run_port_scan(
-                        scan_ip, 
-                        ports_to_scan, 
-                        concurrency=config.concurrency, 
-                        timeout=config.connect_timeout
-                    )
-                    
-                    # ENRICHMENT: Add Security Details
-                    from .knowledge import PORT_KNOWLEDGE, DEFAULT_UNKNOWN_PORT
-                    enriched_details = []
-                    for p in port_data.get("open_ports", []):
-                        info = PORT_KNOWLEDGE.get(p, DEFAULT_UNKNOWN_PORT).copy()
-                        info["port"] = p # Add port number to the record
-                        enriched_details.append(info)
-                    
-                    port_data["details"] = enriched_details
-                    target_res["ports"] = port_data
-                    target_summaries["open_ports"] += len(port_data.get("open_ports", []))
-                module_times["ports"] = time.time() - s_ports
-
-            # Web
-            if "web" in config.enabled_modules:
-                s_web = time.time()
-                # Use configured timeout
-                web_data = run_web_probe(target, timeout=config.connect_timeout)
-                target_res["web"] = web_data
-                module_times["web"] = time.time() - s_web
-            
-            # Store timings in result for aggregation later (or just aggregate now)
-            target_res["_timings"] = module_times
-            scan_results_data[target] = target_res
+        if isinstance(res.get("subdomains"), list):
+            self.subdomains += len(res["subdomains"])
 
-        # 3. Finalize Summary
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-        
-        # Determine IP Class (check first target if it looks like IP)
+        if "ports" in res:
+            open_ports = PortBitmap(res["ports"].get("open_ports", []))
+            self.open_ports_total += len(open_ports)
+            self.port_union |= open_ports
+            self.port_matrix.add_host(target, open_ports)
+
+        # Check Web
+        # Web results are keyed by URL; flag any Server header carrying a version
+        if "web" in res:
+            for probe in res["web"].values():
+                server = probe.get("server") if isinstance(probe, dict) else None
+                if server and any(ch.isdigit() for ch in server):
+                    self.risk_tags.add("server_version_disclosure")
+
+        for m, d in res.get("_timings", {}).items():
+            self.module_timings[m] = self.module_timings.get(m, 0) + d
+
+    def build(self, config: RunConfig, start_time: datetime, end_time: datetime,
+              cidr_notes: Optional[Dict[str, Any]] = None, duration: Optional[float] = None) -> ScanSummary:
+        # Analyze open ports for risks
+        # (e.g. public RDP is higher risk than private RDP, but tag simpler for now)
+        for tag, mask in _RISK_MASKS.items():
+            if self.port_union.intersects(mask):
+                self.risk_tags.add(tag)
+        # Check for any non-standard/uncommon ports (Simple heuristic)
+        if self.port_union - self.COMMON_ALLOWS:
+            self.risk_tags.add("nonstandard_ports_open")
+
+        normalized_target, target_type = validate_target(config.target_input)
+
+        # Determine IP Class
         # Simplified check for summary
         ip_class = "public"
-        primary_target = targets_to_scan[0] if targets_to_scan else config.target_input
+        primary_target = normalized_target.split("/")[0] if target_type == TargetType.CIDR else normalized_target
         # Naive check, better to use ipaddress module but pure string check is fast/safe for now
         if primary_target.startswith("127."): 
             ip_class = "loopback"
         elif primary_target.startswith("192.168.") or primary_target.startswith("10.") or (primary_target.startswith("172.") and 16 <= int(primary_target.split(".")[1]) <= 31):
             ip_class = "private"
-        
-        # Aggregate Timings
-        module_timings = {}
-        risk_tags = set()
-        
-        # Analyze results for risks relative to IP class
-        # (e.g. public RDP is higher risk than private RDP, but tag simpler for now)
-        
-        for t, res in scan_results_data.items():
-            # ... (risk tag logic same as before) ...
-            if "ports" in res:
-                open_ports = res["ports"].get("open_ports", [])
-                if 22 in open_ports: risk_tags.add("ssh_exposed")
-                if 80 in open_ports: risk_tags.add("web_exposed")
-                if 443 in open_ports: risk_tags.add("web_exposed")
-                if 3389 in open_ports: risk_tags.add("rdp_exposed")
-                if 21 in open_ports: risk_tags.add("ftp_exposed")
-                if 23 in open_ports: risk_tags.add("telnet_exposed")
-                if 135 in open_ports: risk_tags.add("rpc_exposed")
-                if 445 in open_ports: risk_tags.add("smb_exposed")
-                
-                # Check for any non-standard/uncommon ports (Simple heuristic)
-                common_allows = {20, 21, 22, 23, 25, 53, 80, 110, 135, 139, 143, 443, 445, 587, 993, 995, 3306, 3389, 5900, 8000, 8080, 8443}
-                if any(p not in common_allows for p in open_ports):
-                    risk_tags.add("nonstandard_ports_open")
-            
-            # Check Web
-            if "web" in res:
-                web = res["web"]
-                if web.get("server"): risk_tags.add("server_version_disclosure")
-
-            t_times = res.get("_timings", {})
-            for m, d in t_times.items():
-                module_timings[m] = module_timings.get(m, 0) + d
 
         # Determine Port Profile Name for Report
+        port_prof = "n/a"
         if "ports" in config.enabled_modules:
-            # Re-resolve to get accurate count for labeling
-            # Note: The actual scan loop logic mirrors this
-            if config.profile_name == "Custom":
-                 p_list = PROFILES["Fast"]["port_list"] # Fallback used in loop
-            else:
-                 p_list = PROFILES.get(config.profile_name, PROFILES["Fast"])["port_list"]
-            
-            count = len(p_list)
-            if config.profile_name == "Fast": port_prof = f"top_{count}"
+            count = len(resolve_port_list(config))
+            if config.ports: port_prof = f"custom_{count}"
+            elif config.profile_name == "Fast": port_prof = f"top_{count}"
             elif config.profile_name == "Full": port_prof = f"extended_{count}"
             else: port_prof = f"custom_{count}"
 
         # Populate User-Friendly Risk Details
         from .knowledge import RISK_TAG_DESCRIPTIONS
         risk_map = {}
-        for tag in risk_tags:
+        for tag in self.risk_tags:
             risk_map[tag] = RISK_TAG_DESCRIPTIONS.get(tag, "No description available.")
 
-        # Consolidate Open Ports List given we might have scanned multiple targets
-        # For single target, it's just one list.
-        all_open_ports = []
-        for res in scan_results_data.values():
-            if "ports" in res:
-                all_open_ports.extend(res["ports"].get("open_ports", []))
-        all_open_ports = sorted(list(set(all_open_ports)))
-
-        summary = ScanSummary(
+        return ScanSummary(
             target=config.target_input,
             type=config.target_type.value,
             start_time=start_time.isoformat(),
             end_time=end_time.isoformat(),
-            duration_total=duration,
-            hosts_discovered=len(targets_to_scan),
-            open_ports_total=target_summaries["open_ports"],
-            subdomains_found=target_summaries["subdomains"],
+            duration_total=duration if duration is not None else (end_time - start_time).total_seconds(),
+            hosts_discovered=self.hosts,
+            open_ports_total=self.open_ports_total,
+            subdomains_found=self.subdomains,
             cidr_notes=cidr_notes,
-            risk_tags=list(risk_tags),
-            module_timings=module_timings,
+            risk_tags=list(self.risk_tags),
+            module_timings=self.module_timings,
             ip_class=ip_class,
             ports_service_profile=port_prof,
-            open_ports_list=all_open_ports,
+            open_ports_list=self.port_union.to_list(),
+            port_host_counts=self.port_matrix.column_counts(),
             risk_details=risk_map
         )
+
+def plan_cidr(config: RunConfig, cidr: str):
+    """
+    Returns (lazy host iterator, planned host count, cidr_notes) for a CIDR
+    target, applying the host cap, sharding and shuffle from the config.
+    """
+    total = cidr_host_count(cidr, config.shard_index, config.shard_count)
+    planned_hosts = min(total, config.cidr_limit)
+    hosts = iter_cidr_hosts(
+        cidr,
+        limit=config.cidr_limit,
+        shard_index=config.shard_index,
+        shard_count=config.shard_count,
+        seed=config.shuffle_seed
+    )
+    skipped_count = total - planned_hosts
+    cidr_notes = {"cap_applied": True, "limit": config.cidr_limit, "skipped": skipped_count}
+    if config.shard_count > 1:
+        cidr_notes["shard"] = f"{config.shard_index}/{config.shard_count}"
+    if config.shuffle_seed is not None:
+        cidr_notes["shuffle_seed"] = config.shuffle_seed
+    logger.info(f"CIDR expansion: scanning {planned_hosts} hosts, skipped {skipped_count}")
+    return hosts, planned_hosts, cidr_notes
+
+def _port_scan_ip(target: str, target_type: TargetType, target_res: Dict[str, Any]) -> str:
+    # Port scanner takes IP usually; resolve domains from the DNS result
+    if target_type == TargetType.DOMAIN:
+        try:
+            return list(target_res.get("dns", {}).get("A", []))[0]
+        except:
+            return target # Try scanning hostname directly (socket supports it)
+    return target
+
+class ReconEngine:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def _schedule(items, func, workers: int, start_time: datetime, state: Optional[Dict[str, Any]] = None,
+                  limit: Optional[float] = MAX_RUNTIME_SOFT_LIMIT, executor: Optional[concurrent.futures.Executor] = None):
+        """
+        Runs func(item) on a pool of `workers` threads and yields (item, result)
+        as each completes. At most 2 * workers items are queued at any time, and
+        no new item is started once `limit` seconds have elapsed (state["stopped"]
+        is then set). state["started"] counts the items submitted, so callers
+        can report what the limit skipped. limit=None never stops early. An existing executor (e.g. a
+        process pool) can be passed instead; it is left running afterwards.
+        """
+        pending = {}
+        items = iter(items)
+        exhausted = False
+        with (contextlib.nullcontext(executor) if executor else concurrent.futures.ThreadPoolExecutor(max_workers=workers)) as executor:
+            while True:
+                while not exhausted and len(pending) < workers * 2:
+                    elapsed = (datetime.now() - start_time).total_seconds()
+                    if limit is not None and elapsed > limit:
+                        logger.warning(f"Soft runtime limit reached ({elapsed}s). Stopping new tasks.")
+                        if state is not None:
+                            state["stopped"] = True
+                        exhausted = True
+                        break
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(func, item)] = item
+                    if state is not None:
+                        state["started"] = state.get("started", 0) + 1
+
+                if not pending:
+                    return
+
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        yield item, future.result()
+                    except Exception as e:
+                        logger.error(f"Host {item} failed: {e}")
+
+    @staticmethod
+    def _port_order(target: str, ctx: "RunContext") -> List[int]:
+        if not ctx.previous:
+            return ctx.ports
+        # Diff mode: ports open last time go first
+        known = ctx.previous.open_ports(target)
+        known_set = set(known)
+        return known + [p for p in ctx.ports if p not in known_set]
+
+    def _scan_ports(self, target: str, scan_ip: str, ctx: "RunContext") -> Dict[str, Any]:
+        """
+        Port scan for one host. With a checkpoint, every CHECKPOINT_PORT_CHUNK
+        slice of the port list is recorded as soon as the scan has finished
+        it, so a resumed run only scans the slices that are left. The scan
+        itself runs once over all remaining ports.
+        """
+        config = ctx.config
+        scan_kwargs = dict(
+            concurrency=min(config.concurrency, ctx.inflight_budget),
+            timeout=config.connect_timeout,
+            engine=config.port_engine,
+            max_inflight=ctx.inflight_budget,
+            adaptive=config.adaptive_timeout,
+            metrics=ctx.metrics,
+            rate=ctx.rate.for_host(scan_ip) if ctx.rate else None,
+            on_open=(lambda port: ctx.emit("port_open", target, port=port, ip=scan_ip)) if ctx.on_event else None,
+            banners=config.banners
+        )
+        ports = self._port_order(target, ctx)
+        if ctx.checkpoint is None:
+            port_data = run_port_scan(scan_ip, ports, **scan_kwargs)
+        else:
+            tracker = ChunkTracker(ctx.checkpoint, target, ports, CHECKPOINT_PORT_CHUNK)
+            port_data = run_port_scan(scan_ip, tracker.pending, on_done=tracker.port_done, **scan_kwargs)
+            # Chunks finished before a resume contribute open ports, not banners
+            port_data["open_ports"] = (PortBitmap(tracker.resumed_open) | PortBitmap(port_data["open_ports"])).to_list()
+            port_data["scanned_count"] = len(ports)
+
+        port_data["ip"] = scan_ip
+        return port_data
+
+    def _scan_host(self, target: str, target_type: TargetType, ctx: "RunContext",
+                   hostnames: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Runs every enabled module against one host and returns its results.
+        ctx.record_module() reports each module as it finishes.
+        hostnames: names known to resolve to this IP (subdomain stage); the
+        web probe uses the first one so virtual hosts answer correctly.
+        Module results already recorded for this host by an interrupted run
+        (ctx.prior) are reused instead of being fetched again, as is fresh
+        passive data from the previous run in diff mode (ctx.previous).
+        """
+        config = ctx.config
+        prior = ctx.prior.get(target, {})
+        cached = ctx.previous.passive_data(target) if ctx.previous else {}
+        target_res = {}
+        module_times = {} # store duration for this target
+
+        def record(mod, data):
+            target_res[mod] = data
+            ctx.record_module(target, mod, data)
+
+        if hostnames:
+            record("hostnames", hostnames)
+
+        # --- PASSIVE MODULES (Parallel) ---
+        passive = []
+        if "dns" in config.enabled_modules and target_type in [TargetType.DOMAIN]:
+            from .modules.dns_module import run_dns_recon
+            passive.append(("dns", run_dns_recon, (target,)))
+
+        if "whois" in config.enabled_modules:
+            from .modules.whois_module import run_whois_recon
+            passive.append(("whois", run_whois_recon, (target, target_type)))
+
+        if "subdomains" in config.enabled_modules and target_type == TargetType.DOMAIN:
+            from .modules.subdomains import run_subdomain_recon
+            passive.append(("subdomains", partial(run_subdomain_recon, metrics=ctx.metrics), (target,)))
+
+        passive_futures = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            for mod, func, args in passive:
+                if mod in prior:
+                    target_res[mod] = prior[mod] # already in this run's stream
+                elif mod in cached:
+                    record(mod, cached[mod])
+                else:
+                    passive_futures[mod] = executor.submit(timed_execution, func, *args)
+
+            # Collect Passive Results
+            for mod, future in passive_futures.items():
+                try:
+                    data, dur = future.result()
+                    record(mod, data)
+                    module_times[mod] = dur
+                except Exception as e:
+                    record(mod, {"error": str(e)})
+
+        # --- ACTIVE MODULES (Sequential to control noise) ---
+        # Ports
+        if "ports" in config.enabled_modules:
+            s_ports = time.time()
+            scan_ip = _port_scan_ip(target, target_type, target_res)
+            if scan_ip:
+                port_data = self._scan_ports(target, scan_ip, ctx)
+
+                # ENRICHMENT: Add Security Details
+                # Banners (config.banners) name the service actually answering
+                from .knowledge import PORT_KNOWLEDGE, DEFAULT_UNKNOWN_PORT
+                from .modules.banner_module import service_details
+                banners = port_data.pop("banners", {})
+                enriched_details = []
+                for p in port_data.get("open_ports", []):
+                    info = PORT_KNOWLEDGE.get(p, DEFAULT_UNKNOWN_PORT).copy()
+                    if p in banners:
+                        info = service_details(p, banners[p], info)
+                    info["port"] = p # Add port number to the record
+                    enriched_details.append(info)
+
+                port_data["details"] = enriched_details
+                record("ports", port_data)
+            module_times["ports"] = time.time() - s_ports
+
+        # Web
+        if "web" in config.enabled_modules:
+            s_web = time.time()
+            from .modules.web_module import run_web_probe
+            # Use configured timeout
+            # Probe every open HTTP-like port when the port scan ran
+            open_ports = target_res["ports"].get("open_ports") if "ports" in target_res else None
+            web_host = hostnames[0] if hostnames else target
+            scan_ip = target_res["ports"].get("ip", web_host) if "ports" in target_res else web_host
+            web_data = run_web_probe(web_host, timeout=config.connect_timeout, open_ports=open_ports,
+                                     metrics=ctx.metrics, rate=ctx.rate.for_host(scan_ip) if ctx.rate else None)
+            record("web", web_data)
+            module_times["web"] = time.time() - s_web
+
+        # Store timings in result for aggregation later
+        target_res["_timings"] = module_times
+        if ctx.metrics:
+            for mod, dur in module_times.items():
+                ctx.metrics.module(target, mod, dur)
+        return target_res
+
+    def _scan_hosts(self, items, target_type: TargetType, ctx: "RunContext", workers: int, start_time: datetime,
+                    state: Dict[str, Any], hostnames: Optional[Dict[str, List[str]]] = None):
+        """
+        Scans each host in items on `workers` threads and yields (host, result)
+        as each completes. hostnames: ip -> names, for the subdomain stage.
+        """
+        def scan_one(target):
+            ctx.emit("host_started", target)
+            return self._scan_host(target, target_type, ctx, hostnames[target] if hostnames else None)
+        return self._schedule(items, ctx.tracked(scan_one), workers, start_time, state, ctx.config.runtime_limit)
+
+    def resume(self, run_dir: str) -> ScanResult:
+        """
+        Continues an interrupted run (crash, disconnect or runtime limit) from
+        its run directory. Finished hosts are read back from results.jsonl and
+        skipped; partly scanned hosts continue from their checkpointed port
+        chunks. New records are appended to the same run directory.
+        """
+        config, results, summary = read_stream(os.path.join(run_dir, STREAM_FILE))
+        if config is None:
+            raise ValueError(f"No resumable run in {run_dir}")
+        if Checkpoint(run_dir).status == "complete" and summary is not None:
+            return ScanResult(config=config, summary=summary, results=results)
+        logger.info(f"Resuming scan for {config.target_input} from {run_dir}")
+        return self.run(config, writer=ResultWriter(run_dir=run_dir), resume_from=results)
+
+    def run(self, config: RunConfig, writer: Optional[ResultWriter] = None,
+            resume_from: Optional[Dict[str, Dict[str, Any]]] = None,
+            on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> ScanResult:
+        """
+        Runs the scan. With a writer, every module result and finished host is
+        appended to the run's results.jsonl as it arrives and progress is
+        checkpointed, so the run can be continued with resume(). Set
+        config.retain_results=False to also keep host results out of the
+        returned ScanResult.
+        on_event(event) receives progress as the scan runs, from the host
+        threads; each event is a dict with "event", "target" and its fields:
+          scan_started    planned (host count; discovery may drop some)
+          host_started
+          port_open       port, ip
+          module_finished module, data
+          host_finished   result
+          scan_finished   summary (ScanSummary)
+        """
+        start_time = datetime.now()
+        logger.info(f"Starting scan for {config.target_input} with profile {config.profile_name}")
+        
+        if config.rdap_cache_file:
+            from .modules.whois_module import get_rdap_cache, configure_rdap_cache
+            if get_rdap_cache().path != config.rdap_cache_file:
+                configure_rdap_cache(path=config.rdap_cache_file)
+
+        # 1. Validation & Expansion
+        # CIDR hosts are produced lazily, so a /8 costs no more memory than a /28
+        normalized_target, target_type = validate_target(config.target_input)
+        targets_to_scan = iter([normalized_target])
+        planned_hosts = 1
+        cidr_notes = None
+        
+        if target_type == TargetType.CIDR:
+            targets_to_scan, planned_hosts, cidr_notes = plan_cidr(config, normalized_target)
+
+        # Initialize Results
+        scan_results_data = {}
+        summary_builder = SummaryBuilder()
+        ctx = RunContext(config, resolve_port_list(config))
+        ctx.on_event = on_event
+        ctx.emit("scan_started", config.target_input, planned=planned_hosts)
+        if writer:
+            writer.open_stream(config, append=resume_from is not None)
+            ctx.on_module = writer.write_module
+            ctx.checkpoint = Checkpoint(writer.get_run_dir(), fresh=resume_from is None)
+            ctx.checkpoint.start()
+
+        # Diff mode: compare against (and reuse from) the last run of this target
+        tracker = None
+        if config.diff_mode:
+            run_dir = writer.get_run_dir() if writer else None
+            base_dir = os.path.dirname(run_dir) if run_dir else "data/runs"
+            ctx.previous = find_previous_run(config.target_input, base_dir, exclude=run_dir)
+            if ctx.previous:
+                tracker = ChangeTracker(ctx.previous)
+                logger.info(f"Diff mode: comparing with {ctx.previous.run_dir} (passive data {'reused' if ctx.previous.fresh else 'stale'})")
+
+        def collect(target, target_res, write=True):
+            summary_builder.add_host(target, target_res)
+            if tracker:
+                tracker.add_host(target, target_res)
+            if write:
+                ctx.emit("host_finished", target, result=target_res)
+            if writer and write:
+                writer.write_host(target, target_res["_timings"])
+                ctx.checkpoint.mark_host(target)
+            if config.retain_results:
+                scan_results_data[target] = target_res
+
+        # Resume: fold finished hosts back in, keep partial module results for reuse
+        discovered_subdomains = set()
+        scanned_ips = set()
+
+        def note_host(target_res):
+            if isinstance(target_res.get("subdomains"), list):
+                discovered_subdomains.update(target_res["subdomains"])
+            if "ports" in target_res:
+                scanned_ips.add(target_res["ports"].get("ip"))
+
+        completed = set()
+        for target, target_res in (resume_from or {}).items():
+            if "_timings" in target_res:
+                completed.add(target)
+                collect(target, target_res, write=False)
+                note_host(target_res)
+            else:
+                ctx.prior[target] = target_res
+        if completed:
+            targets_to_scan = (t for t in targets_to_scan if t not in completed)
+            logger.info(f"Resume: {len(completed)} hosts already done")
+        
+        # 2. Schedule hosts
+        # Hosts run concurrently on a bounded pool. The connection budget
+        # (config.max_inflight) is split evenly across host workers, so the
+        # number of open sockets stays bounded whatever the host count.
+        scan_budget = config.max_inflight
+
+        # Liveness pre-pass: only hosts that answer on a sentinel port move on.
+        # Discovery runs alongside the host workers on its own share of the budget.
+        discovery_stats = None
+        if target_type == TargetType.CIDR and config.host_discovery:
+            discovery_stats = {}
+            discovery_budget = max(1, config.max_inflight // DISCOVERY_BUDGET_SHARE)
+            scan_budget = max(1, config.max_inflight - discovery_budget)
+            targets_to_scan = iter_live_hosts(
+                targets_to_scan,
+                discovery_stats,
+                timeout=config.connect_timeout,
+                max_inflight=discovery_budget,
+                metrics=ctx.metrics
+            )
+
+        host_workers = max(1, min(config.host_concurrency, planned_hosts, scan_budget))
+        ctx.inflight_budget = max(1, scan_budget // host_workers)
+        schedule_state = {"stopped": False}
+
+        for target, target_res in self._scan_hosts(targets_to_scan, target_type, ctx, host_workers, start_time, schedule_state):
+            collect(target, target_res)
+            note_host(target_res)
+        # Hosts the runtime limit kept from starting (discovery's dead hosts were never due)
+        skipped_hosts = 0
+        if schedule_state["stopped"]:
+            dead = discovery_stats.get("dead", 0) if discovery_stats else 0
+            skipped_hosts = max(0, planned_hosts - len(completed) - schedule_state.get("started", 0) - dead)
+
+        # 2b. Resolve-and-scan discovered subdomains (optional)
+        # Names sharing an address collapse, so each unique IP is scanned once.
+        subdomain_notes = None
+        if "subdomain_scan" in config.enabled_modules and discovered_subdomains:
+            from .modules.dns_module import resolve_many, group_by_address
+            resolved = resolve_many(sorted(discovered_subdomains))
+            by_ip = group_by_address(resolved)
+            new_ips = [ip for ip in by_ip if ip not in scanned_ips]
+            to_scan = new_ips[:MAX_SUBDOMAIN_HOSTS]
+            subdomain_notes = {
+                "names": len(discovered_subdomains),
+                "resolved": len(resolved),
+                "unique_ips": len(by_ip),
+                "scanned": len(to_scan),
+                "skipped": len(new_ips) - len(to_scan)
+            }
+            logger.info(f"Subdomain stage: {len(resolved)} names -> {len(by_ip)} unique IPs, scanning {len(to_scan)}")
+
+            sub_ctx = ctx.derive(config.copy(update={
+                "enabled_modules": [m for m in config.enabled_modules if m in ("ports", "web")]
+            }))
+            sub_workers = max(1, min(config.host_concurrency, len(to_scan), config.max_inflight))
+            sub_ctx.inflight_budget = max(1, config.max_inflight // sub_workers)
+
+            started = schedule_state.get("started", 0)
+            for target, target_res in self._scan_hosts(to_scan, TargetType.IP, sub_ctx, sub_workers, start_time, schedule_state, by_ip):
+                collect(target, target_res)
+            if schedule_state["stopped"]:
+                skipped_hosts += len(to_scan) - (schedule_state.get("started", 0) - started)
+
+        # 3. Finalize Summary
+        end_time = datetime.now()
+        window = (end_time - start_time).total_seconds()
+        if ctx.checkpoint:
+            ctx.checkpoint.finish("interrupted" if schedule_state["stopped"] else "complete", window)
+            start_time = datetime.fromisoformat(ctx.checkpoint.started)
+            window = ctx.checkpoint.elapsed
+        summary = summary_builder.build(config, start_time, end_time, cidr_notes, duration=window)
+        summary.subdomain_scan = subdomain_notes
+        summary.discovery = discovery_stats
+        if schedule_state["stopped"]:
+            summary.runtime_stop = {"limit": config.runtime_limit, "started": schedule_state.get("started", 0), "skipped": skipped_hosts}
+            logger.warning(f"Runtime limit: {skipped_hosts} hosts were not scanned")
+        if tracker:
+            summary.changes = tracker.build(summary)
+        elif config.diff_mode:
+            # First run of this target: it becomes the baseline
+            summary.changes = {"previous_run": None, "passive_as_of": summary.start_time}
+        if writer:
+            writer.write_summary(summary)
+            writer.close_stream()
+            if ctx.metrics:
+                writer.save_metrics(ctx.metrics)
+        ctx.emit("scan_finished", config.target_input, summary=summary)
         
         return ScanResult(
             config=config,
             summary=summary,
             results=scan_results_data,
+            metrics=ctx.metrics.to_dict() if ctx.metrics else None,
             logs=[] # Logs handled separately or via UI capture
         )
+
+class RunContext:
+    """
+    Per-run settings shared by every host task.
+    """
+    def __init__(self, config: RunConfig, ports: List[int]):
+        self.config = config
+        self.ports = ports
+        self.inflight_budget = config.max_inflight
+        self.on_module = None  # callable(target, module, data)
+        self.on_event = None   # callable(event dict), see ReconEngine.run
+        self.checkpoint = None # Checkpoint when the run is written to disk
+        self.prior = {}        # target -> module results from an interrupted run
+        self.previous = None   # PreviousRun in diff mode
+        self.metrics = ScanMetrics() if config.metrics else None
+        self.rate = RateLimiter.from_config(config) # None without rate settings
+
+    def emit(self, event: str, target: str, **fields):
+        if self.on_event:
+            self.on_event(dict(event=event, target=target, **fields))
+
+    def record_module(self, target: str, module: str, data: Any):
+        """
+        Reports a finished module result to the writer and the event stream.
+        """
+        if self.on_module:
+            self.on_module(target, module, data)
+        self.emit("module_finished", target, module=module, data=data)
+
+    def tracked(self, func: Callable) -> Callable:
+        """
+        Wraps a per-host task so the "hosts" in-flight gauge follows it.
+        """
+        if not self.metrics:
+            return func
+        def run(item):
+            self.metrics.track("hosts", 1)
+            try:
+                return func(item)
+            finally:
+                self.metrics.track("hosts", -1)
+        return run
+
+    def derive(self, config: RunConfig) -> "RunContext":
+        ctx = RunContext(config, self.ports)
+        ctx.on_module = self.on_module
+        ctx.on_event = self.on_event
+        ctx.checkpoint = self.checkpoint
+        ctx.prior = self.prior
+        ctx.previous = self.previous
+        ctx.metrics = self.metrics
+        ctx.rate = self.rate
+        return ctx
@@ -0,0 +1,247 @@
+import bisect
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from .config import METRICS_SAMPLE_INTERVAL, METRICS_MAX_SAMPLES, METRICS_MAX_HOSTS
+
+class Histogram:
+    """
+    Latency histogram over fixed, roughly log-spaced buckets (seconds).
+    Counts are per bucket; the Prometheus export makes them cumulative.
+    """
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1) # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate by linear interpolation inside the bucket holding the q-th value.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.BUCKETS[i - 1] if i else 0.0
+                upper = self.BUCKETS[i] if i < len(self.BUCKETS) else self.BUCKETS[-1]
+                return round(lower + (upper - lower) * (rank - seen) / n, 6)
+            seen += n
+        return self.BUCKETS[-1]
+
+    def merge(self, data: Dict[str, Any]):
+        """
+        Adds the counts of another histogram's to_dict() output.
+        """
+        index = {str(le): i for i, le in enumerate(self.BUCKETS + ("+Inf",))}
+        for le, n in data["buckets"].items():
+            self.counts[index[le]] += n
+        self.count += data["count"]
+        self.sum += data["sum"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {str(le): n for le, n in zip(self.BUCKETS + ("+Inf",), self.counts) if n}
+        }
+
+class ScanMetrics:
+    """
+    Instrumentation for one run, shared by every host task (thread-safe).
+    Records:
+      - module durations per module (histogram) and per host
+      - connect outcomes and latency per phase ("ports", "discovery"), plus a
+        connect-latency histogram per host for the port scan
+      - per-host entries for the first METRICS_MAX_HOSTS hosts only, so memory
+        stays bounded on large runs; records of later hosts are only counted
+        (host_records_dropped) and still add to every run-wide figure
+      - request latency and bytes transferred (web bodies, crt.sh stream)
+      - in-flight counts ("hosts", "connects", "discovery", "web") sampled over
+        time, at most every METRICS_SAMPLE_INTERVAL; when METRICS_MAX_SAMPLES
+        is reached every other sample is dropped and the interval doubles
+    """
+    def __init__(self):
+        self.started = time.time()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.modules = {}    # module -> Histogram of per-host durations
+        self.hosts = {}      # host -> {"modules": {module: secs}, "connect": Histogram}
+        self.host_records_dropped = 0 # per-host records of hosts beyond METRICS_MAX_HOSTS
+        self.connects = {}   # phase -> {outcome: count}
+        self.connect_latency = {} # phase -> Histogram
+        self.requests = {}   # kind -> Histogram (e.g. "web")
+        self.bytes = {}      # source -> bytes
+        self.inflight = {}   # kind -> current
+        self.peak = {}       # kind -> max seen
+        self.samples = []    # [seconds since start, {kind: value}]
+        self._interval = METRICS_SAMPLE_INTERVAL
+        self._last_sample = None
+
+    def _host(self, host: str) -> Optional[Dict[str, Any]]:
+        """
+        The host's entry, or None once METRICS_MAX_HOSTS hosts have one.
+        """
+        entry = self.hosts.get(host)
+        if entry is None:
+            if len(self.hosts) >= METRICS_MAX_HOSTS:
+                self.host_records_dropped += 1
+                return None
+            entry = self.hosts[host] = {"modules": {}, "connect": Histogram()}
+        return entry
+
+    def module(self, host: str, module: str, seconds: float):
+        with self._lock:
+            self.modules.setdefault(module, Histogram()).observe(seconds)
+            entry = self._host(host)
+            if entry is not None:
+                entry["modules"][module] = seconds
+
+    def connect(self, host: str, outcome: str, seconds: float, phase: str = "ports"):
+        with self._lock:
+            counts = self.connects.setdefault(phase, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+            self.connect_latency.setdefault(phase, Histogram()).observe(seconds)
+            entry = self._host(host) if phase == "ports" else None
+            if entry is not None:
+                entry["connect"].observe(seconds)
+
+    def request(self, kind: str, seconds: float, nbytes: int = 0):
+        with self._lock:
+            self.requests.setdefault(kind, Histogram()).observe(seconds)
+            self.bytes[kind] = self.bytes.get(kind, 0) + nbytes
+
+    def add_bytes(self, source: str, nbytes: int):
+        with self._lock:
+            self.bytes[source] = self.bytes.get(source, 0) + nbytes
+
+    def count_bytes(self, source: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Passes a chunk stream through, counting its bytes.
+        """
+        for chunk in chunks:
+            self.add_bytes(source, len(chunk))
+            yield chunk
+
+    def track(self, kind: str, delta: int):
+        """
+        Adjusts an in-flight gauge (+1 when work starts, -1 when it ends).
+        """
+        with self._lock:
+            value = self.inflight.get(kind, 0) + delta
+            self.inflight[kind] = value
+            if value > self.peak.get(kind, 0):
+                self.peak[kind] = value
+            now = time.monotonic() - self._start
+            if self._last_sample is None or now - self._last_sample >= self._interval:
+                self._last_sample = now
+                self.samples.append([round(now, 3), dict(self.inflight)])
+                if len(self.samples) >= METRICS_MAX_SAMPLES:
+                    self.samples = self.samples[::2]
+                    self._interval *= 2
+
+    def merge(self, data: Dict[str, Any]):
+        """
+        Folds in the to_dict() output of metrics recorded in another process.
+        Counts, histograms and bytes add up; in-flight peaks keep the highest
+        value seen and samples are not merged, since the timelines differ.
+        """
+        with self._lock:
+            for module, h in data["modules"].items():
+                self.modules.setdefault(module, Histogram()).merge(h)
+            for phase, counts in data["connects"].items():
+                mine = self.connects.setdefault(phase, {})
+                for outcome, n in counts.items():
+                    mine[outcome] = mine.get(outcome, 0) + n
+            for phase, h in data["connect_latency"].items():
+                self.connect_latency.setdefault(phase, Histogram()).merge(h)
+            for kind, h in data["requests"].items():
+                self.requests.setdefault(kind, Histogram()).merge(h)
+            for source, n in data["bytes"].items():
+                self.bytes[source] = self.bytes.get(source, 0) + n
+            for kind, n in data["inflight"]["peak"].items():
+                self.peak[kind] = max(self.peak.get(kind, 0), n)
+            for host, e in data["hosts"].items():
+                entry = self._host(host)
+                if entry is not None:
+                    entry["modules"].update(e["modules"])
+                    entry["connect"].merge(e["connect"])
+            self.host_records_dropped += data.get("host_records_dropped", 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "duration": round(time.monotonic() - self._start, 6),
+                "modules": {m: h.to_dict() for m, h in self.modules.items()},
+                "connects": {p: dict(c) for p, c in self.connects.items()},
+                "connect_latency": {p: h.to_dict() for p, h in self.connect_latency.items()},
+                "requests": {k: h.to_dict() for k, h in self.requests.items()},
+                "bytes": dict(self.bytes),
+                "inflight": {"peak": dict(self.peak), "interval": self._interval, "samples": list(self.samples)},
+                "hosts": {
+                    host: {"modules": dict(e["modules"]), "connect": e["connect"].to_dict()}
+                    for host, e in self.hosts.items()
+                },
+                "host_records_dropped": self.host_records_dropped
+            }
+
+    def to_prometheus(self, per_host: bool = False) -> str:
+        """
+        Prometheus text exposition format. Per-host series are opt-in since
+        large CIDR runs would create one series set per address.
+        """
+        lines = []
+
+        def histogram(name: str, help_text: str, series: Dict[str, Histogram], label: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                cumulative = 0
+                for le, n in zip(Histogram.BUCKETS + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label}="{_escape(key)}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}="{_escape(key)}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{{label}="{_escape(key)}"}} {h.count}')
+
+        with self._lock:
+            histogram("reconforge_module_duration_seconds", "Per-host module duration.", self.modules, "module")
+            histogram("reconforge_connect_duration_seconds", "TCP connect latency.", self.connect_latency, "phase")
+            histogram("reconforge_request_duration_seconds", "Application request latency.", self.requests, "kind")
+            if per_host:
+                histogram("reconforge_host_connect_duration_seconds", "Port-scan connect latency per host.",
+                          {h: e["connect"] for h, e in self.hosts.items()}, "host")
+
+            lines.append("# HELP reconforge_connects_total Connect attempts by outcome.")
+            lines.append("# TYPE reconforge_connects_total counter")
+            for phase, counts in self.connects.items():
+                for outcome, n in counts.items():
+                    lines.append(f'reconforge_connects_total{{phase="{phase}",outcome="{outcome}"}} {n}')
+
+            lines.append("# HELP reconforge_bytes_total Bytes received.")
+            lines.append("# TYPE reconforge_bytes_total counter")
+            for source, n in self.bytes.items():
+                lines.append(f'reconforge_bytes_total{{source="{source}"}} {n}')
+
+            lines.append("# HELP reconforge_inflight_peak Highest concurrent work items.")
+            lines.append("# TYPE reconforge_inflight_peak gauge")
+            for kind, n in self.peak.items():
+                lines.append(f'reconforge_inflight_peak{{kind="{kind}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Any, Optional
 from enum import Enum
 from datetime import datetime
+from .config import MAX_RUNTIME_SOFT_LIMIT, PORT_ENGINES, DEFAULT_PORT_ENGINE, DEFAULT_MAX_INFLIGHT, MAX_INFLIGHT
 
 class TargetType(str, Enum):
     DOMAIN = "domain"
@@ -17,6 +18,35 @@ class RunConfig(BaseModel):
     concurrency: int = 25
     connect_timeout: float = 0.5
     cidr_limit: int = 64
+    ports: Optional[List[int]] = None # Explicit port list, overrides the profile's
+    port_engine: str = DEFAULT_PORT_ENGINE # async, thread
+    max_inflight: int = DEFAULT_MAX_INFLIGHT # Global connect budget, shared by all hosts (clamped to MAX_INFLIGHT)
+    adaptive_timeout: bool = False # Per-host timeouts from measured RTT (async engine)
+    banners: bool = False # Read each open port's banner on the scan connection (service identification)
+    host_concurrency: int = 16 # Hosts scanned at once
+    max_rate: Optional[float] = None # Global probes/s cap (connects and web requests); None = no cap
+    host_rate: Optional[float] = None # Per-host probes/s cap
+    rate_control: bool = False # AIMD per host: back off when timeouts rise above the host's baseline
+    host_discovery: bool = True # CIDR: skip hosts that do not answer on sentinel ports
+    shard_index: int = 0 # CIDR sharding: scan host shard_index, then every shard_count-th
+    shard_count: int = 1
+    shuffle_seed: Optional[int] = None # Reproducible randomized host order
+    rdap_cache_file: Optional[str] = None # Persist RDAP ranges across runs (e.g. data/cache/rdap.json)
+    runtime_limit: Optional[float] = MAX_RUNTIME_SOFT_LIMIT # Seconds after which no new host starts; None = no limit
+    retain_results: bool = True # False: host results only go to the writer's results.jsonl
+    metrics: bool = True # Collect latency histograms, connect outcomes and in-flight samples
+    workers: int = 1 # Processes for ParallelEngine; 0 = one per CPU core
+    diff_mode: bool = False # Reuse fresh passive data from the last run of this target and report changes
+
+    @validator("port_engine")
+    def _known_engine(cls, value):
+        if value not in PORT_ENGINES:
+            raise ValueError(f"port_engine must be one of {', '.join(PORT_ENGINES)}")
+        return value
+
+    @validator("max_inflight")
+    def _clamp_inflight(cls, value):
+        return max(1, min(value, MAX_INFLIGHT))
 
 class ModuleResult(BaseModel):
     module: str
@@ -40,10 +70,16 @@ class ScanSummary(BaseModel):
     ip_class: str = "public" # public, private, loopback
     ports_service_profile: str = "n/a" # e.g. "top_100", "top_1000", "custom"
     open_ports_list: List[int] = []
+    port_host_counts: Dict[int, int] = {} # port -> number of hosts with it open
     risk_details: Dict[str, str] = {}
+    discovery: Optional[Dict[str, Any]] = None # e.g. { "probed": 254, "alive": 12, "dead": 242 }
+    subdomain_scan: Optional[Dict[str, Any]] = None # e.g. { "resolved": 480, "unique_ips": 3, "scanned": 3 }
+    runtime_stop: Optional[Dict[str, Any]] = None # runtime limit hit, e.g. { "limit": 300, "started": 40, "skipped": 24 }
+    changes: Optional[Dict[str, Any]] = None # diff mode, e.g. { "ports": {"1.2.3.4": {"new": [8080], "closed": []}}, "new_risk_tags": [...] }
 
 class ScanResult(BaseModel):
     config: RunConfig
     summary: ScanSummary
     results: Dict[str, Any] = Field(default_factory=dict) # Keyed by normalized target (IP or Domain)
+    metrics: Optional[Dict[str, Any]] = None # ScanMetrics.to_dict() when config.metrics is set
     logs: List[str] = []
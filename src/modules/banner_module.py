@@ -0,0 +1,111 @@
+import asyncio
+import re
+import socket
+from typing import Dict, Any, Optional
+
+from ..config import BANNER_WAIT, BANNER_PROBE_WAIT, BANNER_MAX_BYTES, BANNER_TEXT_MAX
+
+# Sent only when a service stays silent after connect. Most plaintext
+# services answer an HTTP request with something recognizable (an HTTP
+# response, a protocol error, a TLS alert), so one probe covers them.
+HTTP_PROBE = b"GET / HTTP/1.0\r\n\r\n"
+
+# (service, port whose PORT_KNOWLEDGE entry describes it, pattern); the
+# pattern's first group, when it has one, is the version. First match wins.
+SIGNATURES = [
+    ("SSH", 22, re.compile(rb"^SSH-[\d.]+-([^\r\n ]+)")),
+    ("SMTP", 25, re.compile(rb"^220[ -][^\r\n]*?(?:E?SMTP|Postfix|Exim|Sendmail)", re.I)),
+    ("FTP", 21, re.compile(rb"^220[ -][^\r\n]*?(?:FTP|FileZilla)", re.I)),
+    ("POP3", 110, re.compile(rb"^\+OK")),
+    ("IMAP", 143, re.compile(rb"^\* (?:OK|PREAUTH)")),
+    ("MySQL", 3306, re.compile(rb"^.{3}\x00\x0a(\d[^\x00]*)\x00", re.S)),
+    ("MySQL", 3306, re.compile(rb"^.{3}\x00\xff.{2}Host '[^']*' is not allowed", re.S)),
+    ("PostgreSQL", 5432, re.compile(rb"^E.{4}S(?:FATAL|ERROR)", re.S)),
+    ("Redis", 6379, re.compile(rb"^-(?:ERR|NOAUTH|DENIED|WRONGPASS) ")),
+    ("VNC", 5900, re.compile(rb"^RFB (\d{3}\.\d{3})")),
+    ("Telnet", 23, re.compile(rb"^\xff[\xfb-\xfe]")),
+    ("MongoDB", 27017, re.compile(rb"trying to access MongoDB over HTTP")),
+    ("Elasticsearch", 9200, re.compile(rb"\"tagline\" : \"You Know, for Search\"")),
+    ("HTTPS", 443, re.compile(rb"^HTTP/\d(?:\.\d)? 400.*plain HTTP request was sent to HTTPS", re.S)),
+    ("HTTP", 80, re.compile(rb"^HTTP/\d(?:\.\d)? \d{3}")),
+    ("TLS", 443, re.compile(rb"^[\x15\x16]\x03[\x00-\x04]")),
+]
+
+_SERVER_HEADER = re.compile(rb"\r\nServer: *([^\r\n]+)", re.I)
+
+def identify(data: bytes, probe: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Matches a banner against SIGNATURES. Returns a record with the printable
+    banner text, plus service, known_port and version when a signature matches.
+    """
+    text = "".join(c if c.isprintable() or c == "\n" else "." for c in data.decode("latin-1").replace("\r\n", "\n"))
+    record = {"banner": text.strip()[:BANNER_TEXT_MAX], "probe": probe or "none"}
+    for service, known_port, pattern in SIGNATURES:
+        match = pattern.search(data)
+        if not match:
+            continue
+        record["service"] = service
+        record["known_port"] = known_port
+        version = match.group(1) if pattern.groups else None
+        if version is None and service.startswith("HTTP"):
+            server = _SERVER_HEADER.search(data)
+            version = server.group(1) if server else None
+        if version is not None:
+            record["version"] = version.decode("latin-1").strip()
+        break
+    return record
+
+async def grab_banner_async(loop, sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """
+    Reads what a freshly connected (non-blocking) socket says within
+    BANNER_WAIT; if nothing, sends HTTP_PROBE and reads for BANNER_PROBE_WAIT.
+    One read of at most BANNER_MAX_BYTES per step. None when the service
+    never answers or closes the connection.
+    """
+    probe = None
+    try:
+        try:
+            data = await asyncio.wait_for(loop.sock_recv(sock, BANNER_MAX_BYTES), BANNER_WAIT)
+        except asyncio.TimeoutError:
+            probe = "http"
+            await asyncio.wait_for(loop.sock_sendall(sock, HTTP_PROBE), BANNER_PROBE_WAIT)
+            data = await asyncio.wait_for(loop.sock_recv(sock, BANNER_MAX_BYTES), BANNER_PROBE_WAIT)
+    except (asyncio.TimeoutError, OSError):
+        return None
+    return identify(data, probe) if data else None
+
+def grab_banner_blocking(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """
+    Same as grab_banner_async for a connected blocking socket.
+    """
+    probe = None
+    try:
+        sock.settimeout(BANNER_WAIT)
+        try:
+            data = sock.recv(BANNER_MAX_BYTES)
+        except socket.timeout:
+            probe = "http"
+            sock.settimeout(BANNER_PROBE_WAIT)
+            sock.sendall(HTTP_PROBE)
+            data = sock.recv(BANNER_MAX_BYTES)
+    except OSError: # socket.timeout included
+        return None
+    return identify(data, probe) if data else None
+
+def service_details(port: int, banner: Dict[str, Any], known: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A port's `details` record from its PORT_KNOWLEDGE entry (`known`) and
+    banner. The banner's service replaces the port-number guess; on an
+    unmapped port the identified service's entry supplies risk and notes.
+    """
+    from ..knowledge import PORT_KNOWLEDGE
+    info = known.copy()
+    if "service" in banner:
+        if port not in PORT_KNOWLEDGE and banner["known_port"] in PORT_KNOWLEDGE:
+            info = PORT_KNOWLEDGE[banner["known_port"]].copy()
+        info["service"] = banner["service"]
+        info["identified_by"] = "banner"
+    if "version" in banner:
+        info["version"] = banner["version"]
+    info["banner"] = banner["banner"]
+    return info
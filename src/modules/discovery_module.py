@@ -0,0 +1,93 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from ..config import DISCOVERY_PORTS, DISCOVERY_BATCH_SIZE, DEFAULT_MAX_INFLIGHT
+from .ports_module import probe_connect, resolve_target, fd_budget, _in_event_loop
+
+async def _probe_host(loop, host: str, ports: List[int], timeout: float, slots: asyncio.Semaphore, metrics=None) -> Optional[str]:
+    """
+    Connects to the sentinel ports at once. The first SYN-ACK ("syn-ack") or
+    RST ("rst") proves the host is up; the remaining probes are cancelled.
+    Returns None when every probe timed out or failed.
+    """
+    resolved = resolve_target(host)
+    if resolved is None:
+        return None
+    family, addr = resolved
+
+    async def probe(port):
+        async with slots:
+            if metrics:
+                metrics.track("discovery", 1)
+            try:
+                outcome, elapsed = await probe_connect(loop, family, addr, port, timeout)
+            finally:
+                if metrics:
+                    metrics.track("discovery", -1)
+            if metrics:
+                metrics.connect(host, outcome, elapsed, phase="discovery")
+            return outcome
+
+    tasks = [asyncio.ensure_future(probe(port)) for port in ports]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            outcome = await next_done
+            if outcome == "open":
+                return "syn-ack"
+            if outcome == "closed":
+                return "rst"
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def discover_hosts_async(hosts: List[str], ports: List[int] = DISCOVERY_PORTS, timeout: float = 0.5,
+                               max_inflight: int = DEFAULT_MAX_INFLIGHT, metrics=None) -> Dict[str, Optional[str]]:
+    """
+    Returns {host: verdict} where verdict is "syn-ack", "rst" or None (no reply).
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(fd_budget(max_inflight))
+    verdicts = await asyncio.gather(*(_probe_host(loop, h, ports, timeout, slots, metrics) for h in hosts))
+    return dict(zip(hosts, verdicts))
+
+def run_host_discovery(hosts: List[str], ports: List[int] = DISCOVERY_PORTS, timeout: float = 0.5,
+                       max_inflight: int = DEFAULT_MAX_INFLIGHT, metrics=None) -> Dict[str, Optional[str]]:
+    """
+    TCP liveness check for a batch of hosts. Called from inside a running
+    event loop (e.g. an embedding application), the probes get their own
+    loop on a helper thread.
+    """
+    if not hosts:
+        return {}
+    coro = discover_hosts_async(hosts, ports, timeout, max_inflight, metrics)
+    if _in_event_loop():
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="discovery") as pool:
+            return pool.submit(asyncio.run, coro).result()
+    return asyncio.run(coro)
+
+def iter_live_hosts(hosts: Iterable[str], stats: Dict[str, Any], ports: List[int] = DISCOVERY_PORTS,
+                    timeout: float = 0.5, max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                    batch_size: int = DISCOVERY_BATCH_SIZE, metrics=None) -> Iterator[str]:
+    """
+    Lazily filters a host stream down to hosts that answer, checking
+    batch_size hosts at a time. Verdict counts accumulate in `stats`.
+    """
+    stats.update({"sentinel_ports": list(ports), "probed": 0, "alive": 0, "dead": 0, "by_reason": {}})
+    hosts = iter(hosts)
+    while True:
+        batch = [h for _, h in zip(range(batch_size), hosts)]
+        if not batch:
+            return
+        verdicts = run_host_discovery(batch, ports, timeout, max_inflight, metrics)
+        for host in batch:
+            verdict = verdicts.get(host)
+            stats["probed"] += 1
+            if verdict is None:
+                stats["dead"] += 1
+                continue
+            stats["alive"] += 1
+            stats["by_reason"][verdict] = stats["by_reason"].get(verdict, 0) + 1
+            yield host
@@ -1,24 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import dns.rdatatype
 import dns.resolver
-from typing import Dict, Any, List
+
+from ..config import DNS_TIMEOUT, DNS_CACHE_SIZE, DNS_NEGATIVE_TTL, DNS_MAX_WORKERS
+
+RECORD_TYPES = ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'CNAME']
+
+class DNSCache:
+    """
+    Thread-safe LRU answer cache. Entries expire with the record TTL;
+    negative answers (NXDOMAIN/NoAnswer) are stored empty. Answers are kept
+    as tuples and handed out as fresh lists, so callers cannot alter them.
+    """
+    def __init__(self, max_size: int = DNS_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # (name, rtype) -> (expires_at, values)
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: Tuple[str, str], values: List[str], ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, tuple(values))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+_cache = DNSCache()
+_resolver = None
+_resolver_lock = threading.Lock()
+# Shared by every lookup in the process, so concurrent hosts cannot pile up threads
+_executor = ThreadPoolExecutor(max_workers=DNS_MAX_WORKERS, thread_name_prefix="dns")
+
+def configure_resolver(nameservers: Optional[List[str]] = None, port: int = 53, timeout: float = DNS_TIMEOUT):
+    """
+    Replaces the shared resolver (e.g. to point at a local stub server) and clears the cache.
+    """
+    global _resolver
+    resolver = dns.resolver.Resolver(configure=nameservers is None)
+    if nameservers is not None:
+        resolver.nameservers = list(nameservers)
+    resolver.port = port
+    resolver.timeout = timeout
+    resolver.lifetime = timeout
+    with _resolver_lock:
+        _resolver = resolver
+    _cache.clear()
+
+def get_resolver() -> dns.resolver.Resolver:
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = dns.resolver.Resolver()
+            _resolver.timeout = DNS_TIMEOUT
+            _resolver.lifetime = DNS_TIMEOUT
+        return _resolver
+
+def get_cache() -> DNSCache:
+    return _cache
+
+def _negative_ttl(exc: Exception) -> float:
+    """
+    TTL for a negative answer: min(SOA TTL, SOA minimum) from the authority section (RFC 2308).
+    """
+    try:
+        response = exc.response() if isinstance(exc, dns.resolver.NoAnswer) else exc.response(exc.qnames()[0])
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return min(rrset.ttl, rrset[0].minimum)
+    except Exception:
+        pass
+    return DNS_NEGATIVE_TTL
+
+def resolve(name: str, rtype: str = "A") -> List[str]:
+    """
+    Cached lookup of one record type. Raises on errors other than NXDOMAIN/NoAnswer.
+    """
+    key = (name.lower().rstrip("."), rtype)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        answers = get_resolver().resolve(name, rtype)
+    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN) as e:
+        _cache.put(key, [], _negative_ttl(e))
+        return []
+
+    values = [str(r) for r in answers]
+    _cache.put(key, values, answers.expiration - time.time())
+    return values
+
+def _resolve_record(target: str, rtype: str) -> List[str]:
+    try:
+        return resolve(target, rtype)
+    except Exception as e:
+        return [f"Error: {str(e)}"]
 
 def run_dns_recon(target: str) -> Dict[str, Any]:
     """
     Resolves common DNS records for a given domain.
+    All record types are queried concurrently through the shared resolver.
     """
-    record_types = ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'CNAME']
-    results = {}
-    
-    resolver = dns.resolver.Resolver()
-    resolver.timeout = 2.0
-    resolver.lifetime = 2.0
+    futures = {rtype: _executor.submit(_resolve_record, target, rtype) for rtype in RECORD_TYPES}
+    return {rtype: future.result() for rtype, future in futures.items()}
 
-    for rtype in record_types:
+def resolve_many(names: List[str], rtypes: Iterable[str] = ("A", "AAAA")) -> Dict[str, List[str]]:
+    """
+    Resolves many names concurrently on the shared lookup pool, every record
+    type in rtypes (IPv4 and IPv6 addresses by default). Wildcard names
+    (*.example.com) cannot be resolved and are skipped. Names that fail or
+    have no records are left out.
+    """
+    futures = [(name, _executor.submit(resolve, name, rtype))
+               for name in names if not name.startswith("*") for rtype in rtypes]
+    resolved = {}
+    for name, future in futures:
         try:
-            answers = resolver.resolve(target, rtype)
-            results[rtype] = [str(r) for r in answers]
-        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
-            results[rtype] = []
-        except Exception as e:
-            results[rtype] = [f"Error: {str(e)}"]
-
-    return results
+            values = future.result()
+        except Exception:
+            continue
+        if values:
+            resolved.setdefault(name, []).extend(values)
+    return resolved
+
+def group_by_address(resolved: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Inverts {name: [ip, ...]} into {ip: [name, ...]} so names sharing an address collapse.
+    """
+    by_ip = {}
+    for name in sorted(resolved):
+        for ip in resolved[name]:
+            by_ip.setdefault(ip, []).append(name)
+    return by_ip
@@ -1,39 +1,325 @@
+import asyncio
+import errno
 import socket
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Optional
 
-def check_port(ip: str, port: int, timeout: float) -> int:
+from ..config import DEFAULT_MAX_INFLIGHT, FD_RESERVE, ADAPTIVE_MIN_TIMEOUT, ADAPTIVE_MAX_TIMEOUT, ADAPTIVE_WARMUP_PORTS
+from ..portmap import PortBitmap
+from ..utils import setup_logger
+from .banner_module import grab_banner_async, grab_banner_blocking
+
+try:
+    import resource  # POSIX only, used to respect the open-file limit
+except ImportError:
+    resource = None
+
+logger = setup_logger()
+
+_TIMEOUT_ERRNOS = {errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT, errno.EINPROGRESS}
+_warned = set() # one-time warnings, e.g. settings the chosen engine ignores
+
+def _probe_blocking(ip: str, port: int, timeout: float,
+                    banners: Optional[Dict[int, Dict[str, Any]]] = None) -> Tuple[str, float]:
     """
-    Returns port if open, 0 if closed/timeout.
+    Blocking connect. Returns (outcome, seconds) like probe_connect, and
+    grabs the banner of an open port into `banners` the same way.
     """
+    start = time.monotonic()
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        with socket.socket(socket.AF_INET6 if ":" in ip else socket.AF_INET, socket.SOCK_STREAM) as s:
             s.settimeout(timeout)
             result = s.connect_ex((ip, port))
-            if result == 0:
-                return port
-    except:
-        pass
-    return 0
+            elapsed = time.monotonic() - start
+            if result == 0 and banners is not None:
+                banner = grab_banner_blocking(s)
+                if banner:
+                    banners[port] = banner
+    except socket.timeout:
+        return "timeout", time.monotonic() - start
+    except OSError:
+        return "error", time.monotonic() - start
+    if result == 0:
+        outcome = "open"
+    elif result == errno.ECONNREFUSED:
+        outcome = "closed"
+    elif result in _TIMEOUT_ERRNOS:
+        outcome = "timeout"
+    else:
+        outcome = "error"
+    return outcome, elapsed
 
-def run_port_scan(target_ip: str, ports: List[int], concurrency: int = 20, timeout: float = 0.5) -> Dict[str, Any]:
+def check_port(ip: str, port: int, timeout: float) -> int:
     """
-    Scans a list of ports on a target IP.
+    Returns port if open, 0 if closed/timeout.
+    """
+    return port if _probe_blocking(ip, port, timeout)[0] == "open" else 0
+
+def _thread_scan(target_ip: str, ports: List[int], concurrency: int, timeout: float, metrics=None, rate=None,
+                 on_open=None, banners: Optional[Dict[int, Dict[str, Any]]] = None, on_done=None) -> PortBitmap:
+    """
+    Legacy engine: one blocking connect_ex per worker thread.
     """
-    open_ports = []
-    
+    open_ports = PortBitmap()
+
+    def probe(port):
+        if rate:
+            rate.wait_blocking()
+        if metrics:
+            metrics.track("connects", 1)
+        try:
+            outcome = _probe_blocking(target_ip, port, timeout, banners)
+        finally:
+            if metrics:
+                metrics.track("connects", -1)
+        if rate:
+            rate.record(outcome[0])
+        return outcome
+
     with ThreadPoolExecutor(max_workers=concurrency) as executor:
-        future_to_port = {executor.submit(check_port, target_ip, port, timeout): port for port in ports}
+        future_to_port = {executor.submit(probe, port): port for port in ports}
         for future in as_completed(future_to_port):
-            port = future_to_port[future]
             try:
-                result = future.result()
-                if result != 0:
-                    open_ports.append(result)
+                outcome, elapsed = future.result()
             except Exception:
-                pass
-                
-    return {
-        "open_ports": sorted(open_ports),
+                continue
+            if outcome == "open":
+                open_ports.add(future_to_port[future])
+                if on_open:
+                    on_open(future_to_port[future])
+            if on_done:
+                on_done(future_to_port[future], outcome == "open")
+            if metrics:
+                metrics.connect(target_ip, outcome, elapsed)
+    return open_ports
+
+def resolve_target(target: str) -> Optional[Tuple[int, str]]:
+    """
+    Returns (address_family, address) for the target, preferring IPv4.
+    """
+    try:
+        infos = socket.getaddrinfo(target, None, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return None
+    infos.sort(key=lambda i: i[0] != socket.AF_INET)
+    for family, _, _, _, sockaddr in infos:
+        return family, sockaddr[0]
+    return None
+
+def fd_budget(requested: int) -> int:
+    """
+    Caps the number of sockets in flight below the process open-file limit.
+    """
+    if resource is None:
+        return requested
+    try:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ValueError, OSError):
+        return requested
+    if soft == resource.RLIM_INFINITY:
+        return requested
+    return max(1, min(requested, soft - FD_RESERVE))
+
+class RTTEstimator:
+    """
+    Smoothed round-trip estimate for one host (RFC 6298 style).
+    timeout = SRTT + 4 * RTTVAR, clamped to [min_timeout, max_timeout];
+    until the first sample it is the initial timeout.
+    """
+    ALPHA = 0.125
+    BETA = 0.25
+
+    def __init__(self, initial: float, min_timeout: float, max_timeout: float):
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+
+    @property
+    def timeout(self) -> float:
+        if self.srtt is None:
+            return self.initial
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+async def probe_connect(loop, family: int, addr: str, port: int, timeout: float,
+                        banners: Optional[Dict[int, Dict[str, Any]]] = None) -> Tuple[str, float]:
+    """
+    Returns (outcome, seconds): "open" (SYN-ACK), "closed" (RST), "timeout" or "error".
+    With `banners`, an open port's socket stays up for a bounded banner read
+    (banner_module) and the result is stored under the port; seconds is
+    still the connect time.
+    """
+    start = time.monotonic()
+    sock = None
+    try:
+        # Inside the try: running out of descriptors (EMFILE/ENFILE) is an "error" outcome
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        await asyncio.wait_for(loop.sock_connect(sock, (addr, port)), timeout)
+        elapsed = time.monotonic() - start
+        if banners is not None:
+            banner = await grab_banner_async(loop, sock)
+            if banner:
+                banners[port] = banner
+        return "open", elapsed
+    except asyncio.TimeoutError:
+        return "timeout", time.monotonic() - start
+    except ConnectionRefusedError:
+        return "closed", time.monotonic() - start
+    except OSError:
+        return "error", time.monotonic() - start
+    finally:
+        if sock is not None:
+            sock.close()
+
+async def scan_ports_async(target_ip: str, ports: List[int], max_inflight: int = DEFAULT_MAX_INFLIGHT, timeout: float = 0.5,
+                           adaptive: bool = False, stats: Optional[Dict[str, Any]] = None, metrics=None,
+                           rate=None, on_open=None, banners: Optional[Dict[int, Dict[str, Any]]] = None,
+                           on_done=None) -> PortBitmap:
+    """
+    Non-blocking connect scan. A fixed pool of worker coroutines pulls ports
+    from a shared iterator, so at most `max_inflight` sockets are open at once.
+
+    adaptive=True: a warm-up wave of ADAPTIVE_WARMUP_PORTS ports is sent at
+    `timeout` to measure the host's RTT from SYN-ACK/RST replies. The rest use
+    the smoothed RTT timeout. Ports that time out on a host that did answer
+    are retried once at twice that timeout. Estimator figures go into `stats`.
+    Connect outcomes and latencies are recorded in `metrics` (ScanMetrics).
+    rate (ratecontrol.HostRate) paces connect starts and gets every outcome.
+    on_open(port) is called as each open port is found.
+    banners: dict receiving port -> banner record for open ports (see probe_connect).
+    on_done(port, is_open) is called once per port when its final outcome is
+    known; with adaptive timeouts that is after any retry.
+    """
+    resolved = resolve_target(target_ip)
+    open_ports = PortBitmap()
+    if resolved is None or not ports:
+        return open_ports
+    family, addr = resolved
+    loop = asyncio.get_running_loop()
+    workers = fd_budget(max_inflight)
+    estimator = RTTEstimator(timeout, ADAPTIVE_MIN_TIMEOUT, max(timeout, ADAPTIVE_MAX_TIMEOUT)) if adaptive else None
+    timed_out = [] # (port, timeout used)
+
+    async def probe(port, probe_timeout=None, retry=False):
+        if probe_timeout is None:
+            probe_timeout = estimator.timeout if estimator else timeout
+        if rate:
+            await rate.wait()
+        if metrics:
+            metrics.track("connects", 1)
+        try:
+            outcome, elapsed = await probe_connect(loop, family, addr, port, probe_timeout, banners)
+        finally:
+            if metrics:
+                metrics.track("connects", -1)
+        if metrics:
+            metrics.connect(target_ip, outcome, elapsed)
+        if rate:
+            rate.record(outcome)
+        if outcome == "open":
+            open_ports.add(port)
+            if on_open:
+                on_open(port)
+        if estimator and outcome in ("open", "closed"):
+            estimator.sample(elapsed)
+        if estimator and outcome == "timeout" and not retry:
+            timed_out.append((port, probe_timeout)) # decided after the sweep
+        elif on_done:
+            on_done(port, outcome == "open")
+
+    async def sweep(port_list, probe_timeout=None, retry=False):
+        pending = iter(port_list)
+
+        async def worker():
+            for port in pending:
+                await probe(port, probe_timeout, retry)
+
+        await asyncio.gather(*(worker() for _ in range(min(workers, len(port_list)))))
+
+    if not estimator:
+        await sweep(ports)
+        return open_ports
+
+    warmup = ports[:ADAPTIVE_WARMUP_PORTS]
+    await sweep(warmup)
+    await sweep(ports[len(warmup):])
+
+    # Retry only ambiguous ports: timeouts on a host that proved it answers,
+    # where a longer wait is still possible
+    retry_timeout = min(estimator.max_timeout, 2 * estimator.timeout)
+    ambiguous = [p for p, used in timed_out if estimator.samples and used < retry_timeout]
+    if on_done:
+        retried = set(ambiguous)
+        for port, _ in timed_out:
+            if port not in retried:
+                on_done(port, False)
+    if ambiguous:
+        await sweep(ambiguous, retry_timeout, retry=True)
+    if stats is not None:
+        stats.update({
+            "srtt": round(estimator.srtt, 6) if estimator.srtt is not None else None,
+            "timeout": round(estimator.timeout, 6),
+            "samples": estimator.samples,
+            "retried": len(ambiguous)
+        })
+    return open_ports
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def run_port_scan(target_ip: str, ports: List[int], concurrency: int = 20, timeout: float = 0.5,
+                  engine: str = "async", max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                  adaptive: bool = False, metrics=None, rate=None, on_open=None, banners: bool = False,
+                  on_done=None) -> Dict[str, Any]:
+    """
+    Scans a list of ports on a target IP.
+    engine="async" uses non-blocking sockets with up to `max_inflight` connects in flight;
+    engine="thread" uses the blocking thread pool capped at `concurrency` workers.
+    adaptive=True (async engine only) derives per-probe timeouts from the host's measured RTT.
+    metrics: optional ScanMetrics receiving connect outcomes, latencies and in-flight counts.
+    rate: optional ratecontrol.HostRate pacing connects (global/per-host caps, AIMD).
+    on_open: optional callable(port), called as each open port is found.
+    banners=True reads each open port's banner on the scan connection itself
+    (port -> record in port_data["banners"]).
+    on_done: optional callable(port, is_open), called once per port when its
+    final outcome is known (e.g. to checkpoint progress during the scan).
+    """
+    rtt_stats = {}
+    banner_data = {} if banners else None
+    # asyncio.run() cannot nest: from inside a running event loop, use threads
+    if engine == "async" and not _in_event_loop():
+        open_ports = asyncio.run(scan_ports_async(target_ip, ports, max_inflight, timeout, adaptive, rtt_stats, metrics, rate, on_open, banner_data, on_done))
+    else:
+        if adaptive and "adaptive" not in _warned:
+            _warned.add("adaptive")
+            logger.warning("Adaptive timeouts need the async engine; the thread engine uses the fixed connect timeout")
+        open_ports = _thread_scan(target_ip, ports, concurrency, timeout, metrics, rate, on_open, banner_data, on_done)
+
+    port_data = {
+        "open_ports": open_ports.to_list(), # Bitmap iterates in ascending order
         "scanned_count": len(ports)
     }
+    if rtt_stats:
+        port_data["rtt"] = rtt_stats
+    if rate and rate.controller:
+        port_data["rate"] = rate.stats()
+    if banners:
+        port_data["banners"] = banner_data
+    return port_data
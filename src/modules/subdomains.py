@@ -1,33 +1,131 @@
+import codecs
+import json
 import requests
-from typing import List
+from typing import Any, Iterable, Iterator, List, Optional
 
-def run_subdomain_recon(domain: str) -> List[str]:
+from ..config import CRTSH_URL, CRTSH_MAX_ENTRIES, CRTSH_MAX_BYTES, CRTSH_CHUNK_SIZE
+from ..utils import setup_logger
+
+logger = setup_logger()
+
+class StreamLimitReached(Exception):
+    pass
+
+def iter_json_array(chunks: Iterable[bytes], max_bytes: Optional[int] = None) -> Iterator[Any]:
     """
-    Queries crt.sh for subdomains.
+    Yields the elements of a top-level JSON array as soon as each one has
+    fully arrived, so only the current element is ever held in memory.
+    Raises StreamLimitReached after max_bytes of input, once the elements
+    complete within those bytes have been yielded.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf = ""
+    pos = 0
+    received = 0
+    started = False
+    finished = False
+    over = False
+    chunks = iter(chunks)
+
+    while not finished:
+        chunk = next(chunks, None)
+        eof = chunk is None
+        if not eof:
+            received += len(chunk)
+            if max_bytes is not None and received > max_bytes:
+                chunk = chunk[:len(chunk) - (received - max_bytes)]
+                over = True
+            buf = buf[pos:] + utf8.decode(chunk)
+        else:
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+        pos = 0
+
+        while True:
+            # Skip whitespace and separators
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                finished = True
+                break
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                break # Element still incomplete, read more
+            if end == len(buf) and not eof:
+                break # A number could continue in the next chunk
+            pos = end
+            yield value
+
+        if over and not finished:
+            raise StreamLimitReached(f"response exceeded {max_bytes} bytes")
+        if eof:
+            break
+
+_crtsh_url = CRTSH_URL
+
+def configure_subdomain_source(base_url: str = CRTSH_URL):
+    """
+    Points subdomain lookups at another crt.sh-compatible endpoint (e.g. a local stand-in).
+    """
+    global _crtsh_url
+    _crtsh_url = base_url
+
+def run_subdomain_recon(domain: str, base_url: Optional[str] = None, max_entries: int = CRTSH_MAX_ENTRIES,
+                        max_bytes: int = CRTSH_MAX_BYTES, metrics=None) -> List[str]:
+    """
+    Queries crt.sh (or base_url / the configured source) for subdomains.
+    The response is streamed and parsed entry by entry; reading stops after
+    max_entries certificates or max_bytes of body. Streamed bytes are counted
+    in `metrics` (ScanMetrics) as "crtsh".
     """
     subdomains = set()
-    
+    base_url = base_url or _crtsh_url
+
     # Clean domain just in case
     domain = domain.lower()
-    
+
     # 1. crt.sh
-    url = f"https://crt.sh/?q=%.{domain}&output=json"
+    params = {"q": f"%.{domain}", "output": "json"}
+    entries = 0
     try:
-        resp = requests.get(url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            for entry in data:
-                name_value = entry.get('name_value')
-                if name_value:
-                    # Split multiline entries
-                    for sub in name_value.split('\n'):
-                        if sub.endswith(domain) and sub != domain:
-                             subdomains.add(sub.lower())
+        with requests.get(base_url, params=params, timeout=5, stream=True) as resp:
+            if resp.status_code == 200:
+                chunks = resp.iter_content(CRTSH_CHUNK_SIZE)
+                if metrics:
+                    chunks = metrics.count_bytes("crtsh", chunks)
+                for entry in iter_json_array(chunks, max_bytes):
+                    name_value = entry.get('name_value') if isinstance(entry, dict) else None
+                    if name_value:
+                        # Split multiline entries
+                        for sub in name_value.split('\n'):
+                            # Wildcard certificates: *.dev.example.com names dev.example.com
+                            sub = sub.lower().strip()
+                            while sub.startswith("*."):
+                                sub = sub[2:]
+                            if sub.endswith(domain) and sub != domain:
+                                subdomains.add(sub)
+                    entries += 1
+                    if entries >= max_entries:
+                        logger.warning(f"crt.sh entry cap reached ({max_entries}), keeping partial results")
+                        break
+    except StreamLimitReached as e:
+        logger.warning(f"crt.sh {e}, keeping partial results")
     except Exception as e:
         # Fallback or just log error?
         # User requested graceful failure + caching (simplifying caching to just memory for this run)
-        print(f"crt.sh failed: {e}")
-        
+        logger.warning(f"crt.sh failed: {e}")
+
     # TODO: Add HackerTarget fallback if crt.sh fails
-    
+
     return sorted(list(subdomains))
@@ -1,33 +1,195 @@
+import html
+import re
+import socket
+import ssl
+import threading
+import time
 import requests
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional
 
-def run_web_probe(target: str, timeout: float = 3.0) -> Dict[str, Any]:
+from ..config import WEB_POOL_SIZE, WEB_MAX_WORKERS, WEB_MAX_BODY_BYTES, WEB_CHUNK_SIZE, HTTP_LIKE_PORTS, WEB_HANDSHAKE_TIMEOUT
+from ..knowledge import PORT_KNOWLEDGE
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title", re.IGNORECASE | re.DOTALL)
+
+_session = None
+_session_lock = threading.Lock()
+# Shared by every probe in the process; bounds concurrent requests across hosts
+_executor = ThreadPoolExecutor(max_workers=WEB_MAX_WORKERS, thread_name_prefix="web")
+
+def get_session() -> requests.Session:
     """
-    Probes HTTP/HTTPS endpoints for headers, status, and redirects.
+    Process-wide session so connections are pooled and reused between probes.
     """
-    results = {}
-    protocols = ["http", "https"]
-    
-    # If target is already a URL, parse it
-    # If it's a domain/IP, try both http and https
-    
-    targets_to_probe = []
-    if target.startswith("http"):
-        targets_to_probe.append(target)
-    else:
-        targets_to_probe.append(f"http://{target}")
-        targets_to_probe.append(f"https://{target}")
-        
-    for url in targets_to_probe:
-        try:
-            resp = requests.get(url, timeout=timeout, allow_redirects=True, verify=False)
-            results[url] = {
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=WEB_POOL_SIZE, pool_maxsize=WEB_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+def _read_prefix(resp: requests.Response, limit: int) -> bytes:
+    body = b""
+    for chunk in resp.iter_content(WEB_CHUNK_SIZE):
+        body += chunk
+        if len(body) >= limit:
+            break
+    return body[:limit]
+
+def extract_title(body: bytes, encoding: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the text of the first <title> element in an HTML prefix, if any.
+    """
+    match = _TITLE_RE.search(body)
+    if not match:
+        return None
+    try:
+        text = match.group(1).decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        text = match.group(1).decode("utf-8", errors="replace")
+    return " ".join(html.unescape(text).split())[:200]
+
+def probe_url(url: str, timeout: float = 3.0, max_body: int = WEB_MAX_BODY_BYTES, metrics=None, rate=None) -> Dict[str, Any]:
+    """
+    GETs one URL, reading at most max_body bytes of the response body.
+    Request latency and body bytes are recorded in `metrics` (ScanMetrics) as "web".
+    rate (ratecontrol.HostRate) paces the request; timeouts and connection
+    failures count as loss.
+    """
+    if rate:
+        rate.wait_blocking()
+    if metrics:
+        metrics.track("web", 1)
+    start = time.monotonic()
+    try:
+        with get_session().get(url, timeout=timeout, allow_redirects=True, verify=False, stream=True) as resp:
+            body = _read_prefix(resp, max_body)
+            if metrics:
+                metrics.request("web", time.monotonic() - start, len(body))
+            if rate:
+                rate.record("ok")
+            return {
                 "status_code": resp.status_code,
                 "server": resp.headers.get("Server", "Unknown"),
-                "title": "TODO: extract title", # simplified for speed
-                "redirects": [r.url for r in resp.history]
+                "title": extract_title(body, resp.encoding),
+                "redirects": [r.url for r in resp.history],
+                "bytes_read": len(body)
             }
-        except requests.exceptions.RequestException as e:
-            results[url] = {"error": str(e)}
-            
+    except requests.exceptions.RequestException as e:
+        if metrics:
+            metrics.request("web", time.monotonic() - start)
+        if rate:
+            lost = isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+            rate.record("timeout" if lost else "ok")
+        return {"error": str(e)}
+    finally:
+        if metrics:
+            metrics.track("web", -1)
+
+def is_http_like(port: int) -> bool:
+    """
+    True for ports that commonly speak HTTP(S), from config or the knowledge base.
+    """
+    if port in HTTP_LIKE_PORTS:
+        return True
+    service = PORT_KNOWLEDGE.get(port, {}).get("service", "")
+    return "HTTP" in service.upper()
+
+def detect_scheme(host: str, port: int, timeout: float = 3.0,
+                  handshake_timeout: float = WEB_HANDSHAKE_TIMEOUT) -> Optional[str]:
+    """
+    Attempts a TLS handshake: "https" if it completes, "http" if the peer
+    answers in plaintext, "unknown" if the handshake timed out or failed
+    without telling either way, None if the port cannot be reached.
+    timeout covers the connect; the handshake gets at least handshake_timeout,
+    since a slow TLS endpoint is not a plaintext one.
+    """
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    try:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    except OSError:
+        return None
+    try:
+        sock.settimeout(max(timeout, handshake_timeout))
+        server_name = None if _is_ip(host) else host
+        with context.wrap_socket(sock, server_hostname=server_name):
+            return "https"
+    except (ssl.SSLError, ConnectionResetError):
+        # A plaintext answer to the ClientHello (e.g. "400 Bad Request")
+        return "http"
+    except OSError:
+        # Handshake timed out: a slow TLS server, or plaintext waiting for a request
+        return "unknown"
+    finally:
+        sock.close()
+
+def _is_ip(host: str) -> bool:
+    try:
+        socket.inet_pton(socket.AF_INET6 if ":" in host else socket.AF_INET, host)
+        return True
+    except OSError:
+        return False
+
+def build_url(scheme: str, host: str, port: int) -> str:
+    if ":" in host:
+        host = f"[{host}]" # IPv6 literal
+    if (scheme, port) in (("http", 80), ("https", 443)):
+        return f"{scheme}://{host}"
+    return f"{scheme}://{host}:{port}"
+
+def _probe_port(host: str, port: int, timeout: float, metrics=None, rate=None) -> List[tuple]:
+    """
+    [(url, result)] for one open port. When the scheme is unknown, https is
+    tried first and http only if https gets no answer; both results are
+    kept when neither answers.
+    """
+    if rate:
+        rate.wait_blocking()
+    scheme = detect_scheme(host, port, timeout)
+    if rate:
+        rate.record("timeout" if scheme is None else "ok")
+    if scheme is None:
+        return []
+    probed = []
+    for candidate in (("https", "http") if scheme == "unknown" else (scheme,)):
+        url = build_url(candidate, host, port)
+        data = probe_url(url, timeout, metrics=metrics, rate=rate)
+        if "error" not in data:
+            return [(url, data)]
+        probed.append((url, data))
+    return probed
+
+def run_web_probe(target: str, timeout: float = 3.0, open_ports: Optional[List[int]] = None, metrics=None,
+                  rate=None) -> Dict[str, Any]:
+    """
+    Probes HTTP/HTTPS endpoints for headers, status, title and redirects.
+    Without open_ports, http:// and https:// on the default ports are probed.
+    With the port-scan output, every open HTTP-like port is probed instead,
+    its scheme chosen by a TLS handshake attempt (both schemes are tried when
+    the handshake is inconclusive). All probes run concurrently
+    on the shared probe pool. rate (ratecontrol.HostRate) paces every
+    connection the probe makes.
+    """
+    # If target is already a URL, probe it as-is
+    if target.startswith("http"):
+        return {target: probe_url(target, timeout, metrics=metrics, rate=rate)}
+
+    if open_ports is None:
+        # No port data: try both http and https on default ports
+        targets_to_probe = [f"http://{target}", f"https://{target}"]
+        futures = {url: _executor.submit(probe_url, url, timeout, metrics=metrics, rate=rate) for url in targets_to_probe}
+        return {url: future.result() for url, future in futures.items()}
+
+    results = {}
+    futures = [_executor.submit(_probe_port, target, port, timeout, metrics, rate) for port in open_ports if is_http_like(port)]
+    for future in futures:
+        for url, data in future.result():
+            results[url] = data
     return results
@@ -1,14 +1,274 @@
+import atexit
+import ipaddress
+import json
+import os
+import tempfile
+import threading
+import time
+import requests
 import whois
 from ipwhois import IPWhois
 from ..models import TargetType
-from typing import Dict, Any
+from ..config import RDAP_CACHE_TTL, RDAP_TIMEOUT, RDAP_SAVE_INTERVAL
+from typing import Dict, Any, List, Optional
+
+class RDAPCache:
+    """
+    RDAP results indexed by the network range they describe.
+    Ranges are stored as CIDR blocks in one hash table per prefix length;
+    a lookup walks the lengths from most to least specific (longest-prefix match).
+    With a path, the cache is written at most every RDAP_SAVE_INTERVAL
+    seconds and once more at exit.
+    """
+    # Neighbourhood sharing one network fetch at a time (see claim)
+    FLIGHT_PREFIX = {4: 24, 6: 48}
+
+    def __init__(self, ttl: float = RDAP_CACHE_TTL, path: Optional[str] = None):
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._tables = {} # (version, prefixlen) -> {network_int: (expires_at, cidr, result)}
+        self._lock = threading.Lock()
+        self._inflight = {} # flight key -> Event set when its fetch is done
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if path:
+            self.load(path)
+            atexit.register(self.flush)
+
+    def get(self, ip: str) -> Optional[Dict[str, Any]]:
+        addr = ipaddress.ip_address(ip)
+        bits = addr.max_prefixlen
+        now = time.time()
+        with self._lock:
+            for version, prefixlen in sorted(self._tables, key=lambda k: -k[1]):
+                if version != addr.version:
+                    continue
+                key = int(addr) >> (bits - prefixlen)
+                entry = self._tables[(version, prefixlen)].get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._tables[(version, prefixlen)][key]
+                    continue
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        return None
+
+    def put(self, result: Dict[str, Any], expires_at: Optional[float] = None, ip: Optional[str] = None) -> bool:
+        """
+        Indexes result under its network blocks. An answer without usable
+        blocks is kept for `ip` alone, if given, so it is not fetched again.
+        Returns False when the result had no blocks.
+        """
+        blocks = _network_blocks(result.get("network") or {})
+        indexed = bool(blocks)
+        if not blocks and ip:
+            blocks = [ipaddress.ip_network(ip)]
+        if not blocks:
+            return False
+        expires_at = expires_at or time.time() + self.ttl
+        with self._lock:
+            for net in blocks:
+                table = self._tables.setdefault((net.version, net.prefixlen), {})
+                table[int(net.network_address) >> (net.max_prefixlen - net.prefixlen)] = (expires_at, str(net), result)
+            self._dirty = True
+        if self.path and time.monotonic() - self._last_save >= RDAP_SAVE_INTERVAL:
+            self.flush()
+        return indexed
+
+    def claim(self, ip: str) -> Optional[threading.Event]:
+        """
+        Single-flight for network fetches, per FLIGHT_PREFIX neighbourhood of
+        ip. Returns None when the caller should fetch; it must then call
+        release(ip). Otherwise returns the Event of the fetch already running
+        nearby: its answer usually covers ip too, so the caller waits for it
+        and checks the cache again. Unrelated addresses fetch concurrently.
+        """
+        key = self._flight_key(ip)
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+            return event
+
+    def release(self, ip: str):
+        with self._lock:
+            event = self._inflight.pop(self._flight_key(ip), None)
+        if event is not None:
+            event.set()
+
+    def _flight_key(self, ip: str):
+        addr = ipaddress.ip_address(ip)
+        return addr.version, int(addr) >> (addr.max_prefixlen - self.FLIGHT_PREFIX[addr.version])
+
+    def __len__(self):
+        return sum(len(t) for t in self._tables.values())
+
+    def load(self, path: str):
+        """
+        Reads a saved cache. Expired and malformed records are skipped.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(records, list):
+            return
+        now = time.time()
+        with self._lock:
+            for rec in records:
+                try:
+                    if rec["expires"] <= now:
+                        continue
+                    net = ipaddress.ip_network(rec["cidr"])
+                    entry = (rec["expires"], rec["cidr"], rec["result"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                table = self._tables.setdefault((net.version, net.prefixlen), {})
+                table[int(net.network_address) >> (net.max_prefixlen - net.prefixlen)] = entry
+
+    def flush(self):
+        """
+        Saves to the cache path if anything changed since the last save.
+        """
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = False
+            self._last_save = time.monotonic()
+        if dirty and self.path:
+            try:
+                self.save(self.path)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+
+    def save(self, path: str):
+        now = time.time()
+        with self._lock:
+            records = [
+                {"cidr": cidr, "expires": expires, "result": result}
+                for table in self._tables.values()
+                for expires, cidr, result in table.values()
+                if expires > now
+            ]
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Unique temp name: other processes may be saving the same cache
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(records, f, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def _network_blocks(network: Dict[str, Any]) -> List:
+    """
+    CIDR blocks covered by an RDAP network object (start/end range or cidr list).
+    """
+    try:
+        if network.get("start_address") and network.get("end_address"):
+            return list(ipaddress.summarize_address_range(
+                ipaddress.ip_address(network["start_address"]),
+                ipaddress.ip_address(network["end_address"])
+            ))
+        if network.get("cidr"):
+            return [ipaddress.ip_network(c.strip(), strict=False) for c in network["cidr"].split(",")]
+    except ValueError:
+        pass
+    return []
+
+_rdap_cache = RDAPCache()
+
+def configure_rdap_cache(ttl: float = RDAP_CACHE_TTL, path: Optional[str] = None) -> RDAPCache:
+    """
+    Replaces the shared RDAP cache. With a path, entries persist across runs until they expire.
+    """
+    global _rdap_cache
+    _rdap_cache = RDAPCache(ttl=ttl, path=path)
+    return _rdap_cache
+
+def get_rdap_cache() -> RDAPCache:
+    return _rdap_cache
+
+_rdap_server = None
+
+def configure_rdap_server(base_url: Optional[str] = None):
+    """
+    Sends IP lookups straight to one RDAP server (e.g. a mirror or a local
+    stand-in) instead of ipwhois' registry bootstrap. None restores the default.
+    """
+    global _rdap_server
+    _rdap_server = base_url.rstrip("/") if base_url else None
+
+def _fetch_rdap(ip: str) -> Dict[str, Any]:
+    """
+    Minimal RDAP ip query against the configured server, shaped like ipwhois output.
+    """
+    resp = requests.get(f"{_rdap_server}/ip/{ip}", timeout=RDAP_TIMEOUT)
+    resp.raise_for_status()
+    data = resp.json()
+    cidrs = [f"{c['v4prefix' if 'v4prefix' in c else 'v6prefix']}/{c['length']}" for c in data.get("cidr0_cidrs", [])]
+    return {
+        "asn": None,
+        "asn_description": None,
+        "network": {
+            "handle": data.get("handle"),
+            "name": data.get("name"),
+            "country": data.get("country"),
+            "start_address": data.get("startAddress"),
+            "end_address": data.get("endAddress"),
+            "cidr": ", ".join(cidrs) or None
+        },
+        "objects": {}
+    }
+
+def _lookup_rdap(ip: str) -> Dict[str, Any]:
+    cache = _rdap_cache
+    cached = cache.get(ip)
+    if cached is not None:
+        return cached
+    running = cache.claim(ip)
+    if running is not None:
+        # A neighbour's fetch is under way; its range likely covers this address
+        running.wait()
+        cached = cache.get(ip)
+        if cached is not None:
+            return cached
+    try:
+        if running is None:
+            # The previous fetch may have finished between get() and claim()
+            cached = cache.get(ip)
+            if cached is not None:
+                return cached
+        if _rdap_server:
+            results = _fetch_rdap(ip)
+        else:
+            rdap = IPWhois(ip).lookup_rdap()
+            results = {
+                "asn": rdap.get("asn"),
+                "asn_description": rdap.get("asn_description"),
+                "network": rdap.get("network"),
+                "objects": rdap.get("objects")
+            }
+        cache.put(results, ip=ip)
+        return results
+    finally:
+        if running is None:
+            cache.release(ip)
 
 def run_whois_recon(target: str, target_type: TargetType) -> Dict[str, Any]:
     """
     Performs WHOIS for domains or RDAP for IPs.
+    IP lookups are answered from the RDAP range cache when a covering network is known.
     """
     results = {}
-    
+
     if target_type == TargetType.DOMAIN:
         try:
             # python-whois
@@ -23,20 +283,13 @@ def run_whois_recon(target: str, target_type: TargetType) -> Dict[str, Any]:
             }
         except Exception as e:
             results = {"error": str(e)}
-            
+
     elif target_type in [TargetType.IP, TargetType.CIDR]:
         # For CIDR, we just use the network address or the first IP provided
         # Actually target passed here is likely an IP.
         try:
-            obj = IPWhois(target.split('/')[0])
-            rdap = obj.lookup_rdap()
-            results = {
-                "asn": rdap.get("asn"),
-                "asn_description": rdap.get("asn_description"),
-                "network": rdap.get("network"),
-                "objects": rdap.get("objects")
-            }
+            results = _lookup_rdap(target.split('/')[0])
         except Exception as e:
             results = {"error": str(e)}
-            
+
     return results
@@ -0,0 +1,209 @@
+import os
+import math
+import concurrent.futures
+from functools import partial
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from .models import RunConfig, ScanResult, TargetType
+from .config import CHECKPOINT_PORT_CHUNK, PARALLEL_MIN_PORTS, PARALLEL_TASK_HOSTS
+from .engine import ReconEngine, RunContext
+from .metrics import ScanMetrics
+from .ratecontrol import RateLimiter
+from .portmap import PortBitmap
+from .storage.writer import ResultWriter
+from .modules.ports_module import run_port_scan
+from .utils import setup_logger
+
+logger = setup_logger()
+
+# --- Worker process side ---
+
+# Run-wide state of a worker process, set once by the pool initializer
+_worker = {}
+
+def _init_worker(config: RunConfig, ports: List[int], prior: Dict[str, Any], previous, processes: int):
+    # The parent enforces the runtime limit between tasks
+    _worker["config"] = config.copy(update={"runtime_limit": None})
+    # The global cap is split between the workers. Each CIDR host is scanned by
+    # one worker, so the per-host cap is only split for port slices (_scan_port_task)
+    _worker["rate"] = RateLimiter.from_config(config, share=processes)
+    _worker["ports"] = ports
+    _worker["prior"] = prior
+    _worker["previous"] = previous
+
+def _scan_host_task(target_type: TargetType, modules: List[str], budget: int, threads: int,
+                    items: List[Tuple[str, Optional[List[str]]]]):
+    """
+    Scans a batch of (host, hostnames) on `threads` host threads.
+    Returns ([(host, result)], metrics dict or None).
+    """
+    config = _worker["config"]
+    if modules != config.enabled_modules:
+        config = config.copy(update={"enabled_modules": modules})
+    ctx = RunContext(config, _worker["ports"])
+    ctx.prior = _worker["prior"]
+    ctx.previous = _worker["previous"]
+    ctx.inflight_budget = budget
+    ctx.rate = _worker["rate"]
+    hostnames = {host: names for host, names in items if names}
+    results = list(ReconEngine()._scan_hosts([host for host, _ in items], target_type, ctx, threads,
+                                             datetime.now(), {}, hostnames or None))
+    return results, ctx.metrics.to_dict() if ctx.metrics else None
+
+def _scan_port_task(scan_ip: str, scan_kwargs: Dict[str, Any], with_metrics: bool, host_share: int, ports: List[int]):
+    """
+    Scans one slice of a host's ports. host_share: workers scanning slices
+    of this host at once, which split its per-host rate cap.
+    """
+    metrics = ScanMetrics() if with_metrics else None
+    rate = _worker["rate"].for_host(scan_ip, share=host_share) if _worker["rate"] else None
+    port_data = run_port_scan(scan_ip, ports, metrics=metrics, rate=rate, **scan_kwargs)
+    return port_data, metrics.to_dict() if metrics else None
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# --- Parent side ---
+
+class ParallelEngine(ReconEngine):
+    """
+    ReconEngine that spreads the connect work over config.workers processes,
+    so a large scan is no longer held to one core by the GIL:
+      - CIDR hosts and the subdomain stage go to the workers in batches of
+        PARALLEL_TASK_HOSTS per host thread; each worker scans its batch on
+        its own threads and event loops
+      - a single host's port list (PARALLEL_MIN_PORTS or more) is split into
+        slices that the workers scan side by side
+    Discovery, passive modules of single targets, the writer, checkpoints,
+    diff mode and the summary stay in this process, so results merge into
+    one ScanResult exactly as with ReconEngine. The connection budget
+    (config.max_inflight) stays the total across all workers.
+    Workers inherit module configuration (resolver, RDAP/crt.sh servers)
+    only where processes are forked.
+    """
+    def __init__(self):
+        super().__init__()
+        self._pool = None
+        self._pool_size = 1
+
+    def run(self, config: RunConfig, writer: Optional[ResultWriter] = None,
+            resume_from: Optional[Dict[str, Dict[str, Any]]] = None,
+            on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> ScanResult:
+        self._pool_size = config.workers or os.cpu_count() or 1
+        try:
+            return super().run(config, writer, resume_from, on_event)
+        finally:
+            if self._pool:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def _get_pool(self, ctx: RunContext) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            logger.info(f"Starting {self._pool_size} worker processes")
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._pool_size,
+                initializer=_init_worker,
+                initargs=(ctx.config, ctx.ports, ctx.prior, ctx.previous, self._pool_size)
+            )
+        return self._pool
+
+    def _scan_hosts(self, items, target_type: TargetType, ctx: RunContext, workers: int, start_time: datetime,
+                    state: Dict[str, Any], hostnames: Optional[Dict[str, List[str]]] = None):
+        # A single domain/IP target runs here; its port scan is what gets split
+        if self._pool_size <= 1 or (target_type != TargetType.CIDR and not hostnames):
+            yield from super()._scan_hosts(items, target_type, ctx, workers, start_time, state, hostnames)
+            return
+
+        threads = max(1, math.ceil(workers / self._pool_size)) # host threads per worker
+        tasks = _chunks(((host, hostnames.get(host) if hostnames else None) for host in items),
+                        threads * PARALLEL_TASK_HOSTS)
+        func = partial(_scan_host_task, target_type, ctx.config.enabled_modules, ctx.inflight_budget, threads)
+        for _, (results, metrics) in self._schedule(tasks, func, self._pool_size, start_time, state,
+                                                    ctx.config.runtime_limit, executor=self._get_pool(ctx)):
+            if metrics and ctx.metrics:
+                ctx.metrics.merge(metrics)
+            for host, res in results:
+                if ctx.on_module or ctx.on_event:
+                    # Replay the module records and events the worker could not stream
+                    ctx.emit("host_started", host)
+                    prior = ctx.prior.get(host, {})
+                    for mod, data in res.items():
+                        if mod != "_timings" and mod not in prior:
+                            if mod == "ports":
+                                for port in data.get("open_ports", []):
+                                    ctx.emit("port_open", host, port=port, ip=data.get("ip"))
+                            ctx.record_module(host, mod, data)
+                yield host, res
+
+    def _scan_ports(self, target: str, scan_ip: str, ctx: RunContext) -> Dict[str, Any]:
+        """
+        Splits one host's port list into slices scanned by the workers. With a
+        checkpoint the slices are the CHECKPOINT_PORT_CHUNK chunks, so resume
+        works the same as with ReconEngine.
+        """
+        ports = self._port_order(target, ctx)
+        if self._pool_size <= 1 or len(ports) < PARALLEL_MIN_PORTS:
+            return super()._scan_ports(target, scan_ip, ctx)
+
+        config = ctx.config
+        budget = max(1, ctx.inflight_budget // self._pool_size)
+        scan_kwargs = dict(
+            concurrency=min(config.concurrency, budget),
+            timeout=config.connect_timeout,
+            engine=config.port_engine,
+            max_inflight=budget,
+            adaptive=config.adaptive_timeout,
+            banners=config.banners
+        )
+        if ctx.checkpoint is None:
+            size = min(CHECKPOINT_PORT_CHUNK, math.ceil(len(ports) / self._pool_size))
+            done = set()
+            open_ports = PortBitmap()
+        else:
+            size = CHECKPOINT_PORT_CHUNK
+            done = ctx.checkpoint.done_chunks(target)
+            open_ports = PortBitmap(ctx.checkpoint.partial_open_ports(target))
+
+        pool = self._get_pool(ctx)
+        slices = [(index, offset) for index, offset in enumerate(range(0, len(ports), size)) if index not in done]
+        host_share = max(1, min(self._pool_size, len(slices)))
+        futures = {
+            pool.submit(_scan_port_task, scan_ip, scan_kwargs, ctx.metrics is not None, host_share, ports[offset:offset + size]): index
+            for index, offset in slices
+        }
+        rtt = []
+        rate = None
+        banners = {}
+        for future in concurrent.futures.as_completed(futures):
+            port_data, metrics = future.result()
+            if metrics and ctx.metrics:
+                ctx.metrics.merge(metrics)
+            if ctx.checkpoint:
+                ctx.checkpoint.mark_chunk(target, futures[future], port_data["open_ports"])
+            open_ports |= PortBitmap(port_data["open_ports"])
+            for port in port_data["open_ports"]:
+                ctx.emit("port_open", target, port=port, ip=scan_ip)
+            if "rtt" in port_data:
+                rtt.append(port_data["rtt"])
+            if "rate" in port_data:
+                rate = port_data["rate"]
+            banners.update(port_data.get("banners", {}))
+
+        port_data = {"open_ports": open_ports.to_list(), "scanned_count": len(ports)}
+        if rtt:
+            # Estimates of the slice with the most samples; retries add up
+            port_data["rtt"] = dict(max(rtt, key=lambda r: r["samples"]), retried=sum(r["retried"] for r in rtt))
+        if rate:
+            port_data["rate"] = rate # the workers' controllers are shared per process; the last report is current
+        if config.banners:
+            port_data["banners"] = banners
+        port_data["ip"] = scan_ip
+        return port_data
@@ -0,0 +1,138 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+PORT_SPACE = 65536
+_WORDS = PORT_SPACE // 64
+_NBYTES = PORT_SPACE // 8
+
+class PortBitmap:
+    """
+    Set of TCP ports as a 65536-bit bitmap (1024 x 64-bit words, 8 KB).
+    Set algebra runs on the whole bitmap at once as a Python int.
+    Iteration yields ports in ascending order.
+    """
+    __slots__ = ("_words",)
+
+    def __init__(self, ports: Iterable[int] = ()):
+        self._words = array("Q", bytes(_NBYTES))
+        for port in ports:
+            self.add(port)
+
+    @classmethod
+    def from_int(cls, value: int) -> "PortBitmap":
+        bitmap = cls()
+        bitmap._words = array("Q")
+        bitmap._words.frombytes(value.to_bytes(_NBYTES, "little"))
+        return bitmap
+
+    def to_int(self) -> int:
+        return int.from_bytes(self._words.tobytes(), "little")
+
+    def add(self, port: int):
+        self._words[port >> 6] |= 1 << (port & 63)
+
+    def discard(self, port: int):
+        self._words[port >> 6] &= ~(1 << (port & 63)) & 0xFFFFFFFFFFFFFFFF
+
+    def __contains__(self, port: int) -> bool:
+        return 0 <= port < PORT_SPACE and bool(self._words[port >> 6] >> (port & 63) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        for index, word in enumerate(self._words):
+            while word:
+                low = word & -word
+                yield (index << 6) + low.bit_length() - 1
+                word ^= low
+
+    def __len__(self) -> int:
+        # One C-level popcount; a Python loop over the 1024 words is slower
+        return self.to_int().bit_count()
+
+    def __bool__(self) -> bool:
+        return any(self._words)
+
+    def __or__(self, other: "PortBitmap") -> "PortBitmap":
+        return PortBitmap.from_int(self.to_int() | other.to_int())
+
+    def __and__(self, other: "PortBitmap") -> "PortBitmap":
+        return PortBitmap.from_int(self.to_int() & other.to_int())
+
+    def __sub__(self, other: "PortBitmap") -> "PortBitmap":
+        return PortBitmap.from_int(self.to_int() & ~other.to_int())
+
+    def __ior__(self, other: "PortBitmap") -> "PortBitmap":
+        words = array("Q")
+        words.frombytes((self.to_int() | other.to_int()).to_bytes(_NBYTES, "little"))
+        self._words = words
+        return self
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PortBitmap) and self._words == other._words
+
+    __hash__ = None # Mutable
+
+    def intersects(self, other: "PortBitmap") -> bool:
+        return bool(self.to_int() & other.to_int())
+
+    def to_list(self) -> List[int]:
+        return list(self)
+
+class PortMatrix:
+    """
+    Host x port matrix for multi-host scans. Each row is an int bitset over
+    a shared column index (columns are assigned as ports are first seen), so
+    a row costs bits per distinct open port rather than a full 8 KB bitmap.
+    Hosts with no open ports take no space.
+    """
+    def __init__(self):
+        self.columns = {} # port -> column index
+        self.ports = []   # column index -> port
+        self.rows = {}    # host -> int bitset
+
+    def add_host(self, host: str, ports: Iterable[int]):
+        row = self.rows.get(host, 0)
+        for port in ports:
+            column = self.columns.get(port)
+            if column is None:
+                column = self.columns[port] = len(self.ports)
+                self.ports.append(port)
+            row |= 1 << column
+        if row:
+            self.rows[host] = row
+
+    def row(self, host: str) -> PortBitmap:
+        return PortBitmap(self._row_ports(self.rows.get(host, 0)))
+
+    def hosts_with(self, port: int) -> List[str]:
+        column = self.columns.get(port)
+        if column is None:
+            return []
+        mask = 1 << column
+        return [host for host, row in self.rows.items() if row & mask]
+
+    def column_counts(self) -> Dict[int, int]:
+        """
+        Number of hosts with each port open, keyed by port.
+        """
+        counts = [0] * len(self.ports)
+        for row in self.rows.values():
+            while row:
+                low = row & -row
+                counts[low.bit_length() - 1] += 1
+                row ^= low
+        return {self.ports[c]: n for c, n in sorted(enumerate(counts), key=lambda cn: self.ports[cn[0]]) if n}
+
+    def union(self) -> PortBitmap:
+        combined = 0
+        for row in self.rows.values():
+            combined |= row
+        return PortBitmap(self._row_ports(combined))
+
+    def _row_ports(self, row: int) -> Iterator[int]:
+        while row:
+            low = row & -row
+            yield self.ports[low.bit_length() - 1]
+            row ^= low
+
+    def __len__(self):
+        return len(self.rows)
@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator
+
+from .config import UI_UPDATE_INTERVAL
+
+class ScanProgress:
+    """
+    Folds the engine's progress events into what the UI shows while a scan
+    runs: host counts, open ports as they are found and the partial results.
+    """
+    def __init__(self, target):
+        self.target = target
+        self.started_at = time.monotonic()
+        self.planned = None
+        self.hosts_started = 0
+        self.hosts_finished = 0
+        self.open_ports = {} # host -> ports found so far
+        self.results = {}    # host -> module -> data
+        self.last = None
+        self.result = None   # what the scan returned, once it has
+
+    def add(self, event):
+        kind, host = event["event"], event["target"]
+        if kind == "scan_started":
+            self.planned = event["planned"]
+        elif kind == "host_started":
+            self.hosts_started += 1
+            self.results.setdefault(host, {})
+        elif kind == "port_open":
+            self.open_ports.setdefault(host, []).append(event["port"])
+            self.last = f"port {event['port']} open on `{host}`"
+        elif kind == "module_finished":
+            self.results.setdefault(host, {})[event["module"]] = event["data"]
+            self.last = f"{event['module']} finished on `{host}`"
+        elif kind == "host_finished":
+            self.hosts_finished += 1
+            self.results[host] = event["result"]
+            self.last = f"`{host}` done"
+
+    def text(self):
+        elapsed = time.monotonic() - self.started_at
+        planned = f" of {self.planned} planned" if self.planned else ""
+        text = f"## ⏳ Scanning {self.target} ({elapsed:.0f}s)\n"
+        text += f"- **Hosts**: {self.hosts_finished} done, {self.hosts_started - self.hosts_finished} in progress{planned}\n"
+        text += f"- **Open Ports**: {sum(len(p) for p in self.open_ports.values())}\n"
+        for host, ports in list(self.open_ports.items())[:20]:
+            text += f"  - `{host}`: {sorted(ports)}\n"
+        if self.last:
+            text += f"- **Latest**: {self.last}\n"
+        return text
+
+    def partial(self):
+        return {"in_progress": True, "results": self.results}
+
+def watch_scan(run: Callable[[Callable[[Dict[str, Any]], None]], Any], progress: ScanProgress,
+               interval: float = UI_UPDATE_INTERVAL) -> Iterator[ScanProgress]:
+    """
+    Calls run(on_event) (e.g. ReconEngine.run with on_event) on its own
+    thread and folds its events into progress, yielding progress at most
+    every `interval` seconds while events keep arriving. When run returns,
+    its value is in progress.result; if it raises, the error is re-raised here.
+    """
+    events = queue.Queue()
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = run(events.put)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            events.put(None)
+
+    threading.Thread(target=target, daemon=True).start()
+    changed = False
+    next_update = 0.0
+    while True:
+        try:
+            event = events.get(timeout=interval)
+        except queue.Empty:
+            event = {}
+        if event is None:
+            break
+        if event:
+            progress.add(event)
+            changed = True
+        if changed and time.monotonic() >= next_update:
+            yield progress
+            changed = False
+            next_update = time.monotonic() + interval
+    if "error" in outcome:
+        raise outcome["error"]
+    progress.result = outcome["result"]
@@ -0,0 +1,229 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from .config import (RATE_INITIAL, RATE_MIN, RATE_CEILING, RATE_WINDOW, RATE_WINDOW_ANSWERS, RATE_WINDOW_MAX,
+                     RATE_LOSS_MARGIN, RATE_BASELINE_WEIGHT, RATE_DECREASE, RATE_INCREASE_STEP, RATE_BURST_SECONDS, RATE_RESERVE_HORIZON, RATE_HOST_CACHE)
+
+# Probe outcomes that count as loss: no answer, or the local stack refusing more
+LOSS_OUTCOMES = {"timeout", "error"}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes a token and returns how long
+    the caller must wait for it, so the same bucket paces threads
+    (time.sleep) and coroutines (asyncio.sleep). Tokens are reserved at
+    most RATE_RESERVE_HORIZON ahead, so a rate change reaches the waiters
+    quickly; beyond that reserve() returns None and the caller retries.
+    """
+    def __init__(self, rate: float):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = max(1.0, rate * RATE_BURST_SECONDS)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.burst = max(1.0, rate * RATE_BURST_SECONDS)
+            self.tokens = min(self.tokens, self.burst)
+
+    def reserve(self) -> Optional[float]:
+        with self._lock:
+            self._refill()
+            if self.tokens - 1 < -self.rate * RATE_RESERVE_HORIZON:
+                return None
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class RateController:
+    """
+    Token bucket whose rate follows probe outcomes (AIMD), per host.
+    Each window compares the share of probes that got an answer with the
+    host's baseline share: a drop beyond both 3 standard deviations and
+    RATE_LOSS_MARGIN means congestion and the rate is multiplied by
+    RATE_DECREASE; otherwise it doubles (slow start, until the first
+    back-off) or grows by RATE_INCREASE_STEP, up to `ceiling`.
+    The baseline is what the host answers anyway (filtered ports never do,
+    at any rate): it starts from the first window and follows clean
+    windows as a moving average (weight RATE_BASELINE_WEIGHT, the same in
+    both directions, so noise does not push it up). Windows last until
+    RATE_WINDOW_ANSWERS answers are expected (the first one, until that
+    many arrive), so sparse hosts are judged on as much evidence as busy
+    ones. adaptive=False keeps a fixed rate.
+    """
+    def __init__(self, rate: float, ceiling: float, adaptive: bool = True):
+        self._lock = threading.Lock()
+        self.bucket = TokenBucket(rate)
+        self.ceiling = ceiling
+        self.adaptive = adaptive
+        self.slow_start = True
+        self.baseline = None # share of probes answered
+        self.backoffs = 0
+        self.peak = rate
+        self._total = 0
+        self._answered = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def record(self, loss: bool):
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._total += 1
+            self._answered += not loss
+            n = self._total
+            expected = self._answered if self.baseline is None else n * self.baseline
+            if n < RATE_WINDOW or (n < RATE_WINDOW_MAX and expected < RATE_WINDOW_ANSWERS):
+                return
+            answered = self._answered
+            self._total = self._answered = 0
+
+            share = answered / n
+            if self.baseline is None:
+                self.baseline = share
+                return
+            rate = self.bucket.rate
+            expected = n * self.baseline
+            deviation = math.sqrt(expected * (1 - self.baseline))
+            if answered < expected - max(3 * deviation, RATE_LOSS_MARGIN * expected) and rate > RATE_MIN:
+                self.slow_start = False
+                self.backoffs += 1
+                rate = max(RATE_MIN, rate * RATE_DECREASE)
+            else:
+                if rate <= RATE_MIN:
+                    self.baseline = share # losses that persist at the minimum rate are the host's normal
+                else:
+                    self.baseline += (share - self.baseline) * RATE_BASELINE_WEIGHT
+                rate = min(self.ceiling, rate * 2 if self.slow_start else rate + RATE_INCREASE_STEP)
+            self.peak = max(self.peak, rate)
+            self.bucket.set_rate(rate)
+
+class HostRate:
+    """
+    What a scan of one host uses: waits for its own bucket and the global
+    one, and feeds outcomes back to its controller.
+    """
+    def __init__(self, controller: Optional[RateController], global_bucket: Optional[TokenBucket]):
+        self.controller = controller
+        self.global_bucket = global_bucket
+
+    def _buckets(self):
+        if self.controller:
+            yield self.controller.bucket
+        if self.global_bucket:
+            yield self.global_bucket
+
+    async def wait(self):
+        for bucket in self._buckets():
+            delay = bucket.reserve()
+            while delay is None:
+                await asyncio.sleep(RATE_RESERVE_HORIZON * (1 + random.random()))
+                delay = bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def wait_blocking(self):
+        for bucket in self._buckets():
+            delay = bucket.reserve()
+            while delay is None:
+                time.sleep(RATE_RESERVE_HORIZON * (1 + random.random()))
+                delay = bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+
+    def record(self, outcome: str):
+        if self.controller:
+            self.controller.record(outcome in LOSS_OUTCOMES)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.controller:
+            return {}
+        c = self.controller
+        return {
+            "rate": round(c.rate, 1),
+            "peak": round(c.peak, 1),
+            "backoffs": c.backoffs,
+            "baseline_answered": round(c.baseline, 3) if c.baseline is not None else None
+        }
+
+class RateLimiter:
+    """
+    Rate limits for one run: a global cap (max_rate, probes/s across every
+    host) and a controller per host, capped at host_rate and adjusted by
+    AIMD when adaptive is set. Per-host controllers are kept for the
+    RATE_HOST_CACHE most recently used hosts, so ports and web share one.
+    """
+    def __init__(self, max_rate: Optional[float] = None, host_rate: Optional[float] = None, adaptive: bool = False):
+        self.max_rate = max_rate
+        self.host_rate = host_rate
+        self.adaptive = adaptive
+        self.global_bucket = TokenBucket(max_rate) if max_rate else None
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, share: int = 1) -> Optional["RateLimiter"]:
+        """
+        None when the config sets no rate control. share > 1 divides the
+        global cap between that many processes; the per-host cap is only
+        divided where one host is spread over several (see for_host).
+        """
+        if not (config.max_rate or config.host_rate or config.rate_control):
+            return None
+        return cls(
+            config.max_rate / share if config.max_rate else None,
+            config.host_rate,
+            config.rate_control
+        )
+
+    def set_caps(self, max_rate: Optional[float], host_rate: Optional[float]):
+        """
+        Changes the global and per-host caps of a running limiter (e.g. when
+        more workers join). Existing controllers keep their AIMD state; a
+        rate above the new ceiling is lowered to it.
+        """
+        with self._lock:
+            if not max_rate:
+                self.global_bucket = None
+            elif self.global_bucket:
+                self.global_bucket.set_rate(max_rate)
+            else:
+                self.global_bucket = TokenBucket(max_rate)
+            self.max_rate = max_rate
+            self.host_rate = host_rate
+            ceiling = host_rate or RATE_CEILING
+            for controller in self._hosts.values():
+                controller.ceiling = ceiling
+                if controller.rate > ceiling or not controller.adaptive:
+                    controller.bucket.set_rate(ceiling)
+
+    def for_host(self, host: str, share: int = 1) -> HostRate:
+        """
+        share > 1 divides the per-host cap when that many processes scan
+        the same host at once. It applies when the host's controller is created.
+        """
+        with self._lock:
+            controller = self._hosts.get(host)
+            if controller is not None:
+                self._hosts.move_to_end(host)
+            elif self.adaptive or self.host_rate:
+                ceiling = self.host_rate / share if self.host_rate else RATE_CEILING
+                controller = RateController(min(RATE_INITIAL, ceiling) if self.adaptive else ceiling, ceiling, self.adaptive)
+                self._hosts[host] = controller
+                if len(self._hosts) > RATE_HOST_CACHE:
+                    self._hosts.popitem(last=False)
+        return HostRate(controller, self.global_bucket)
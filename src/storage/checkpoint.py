@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Set
+
+from ..config import CHECKPOINT_INTERVAL
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+class Checkpoint:
+    """
+    Scan progress for one run directory, saved atomically to checkpoint.json.
+    Finished hosts and module results live in the run's results.jsonl; the
+    checkpoint adds what the stream cannot express: which port chunks of
+    in-progress hosts are done (with their open ports), the run status, and
+    the accumulated active scan time.
+    """
+    def __init__(self, run_dir: str, fresh: bool = False):
+        self.path = os.path.join(run_dir, CHECKPOINT_FILE)
+        self.status = "new"
+        self.started = None
+        self.elapsed = 0.0
+        self.hosts_done = 0
+        self.partial = {} # host -> {"chunks": [i, ...], "open_ports": [...]}
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        if not fresh:
+            self.load()
+
+    @classmethod
+    def exists(cls, run_dir: str) -> bool:
+        return os.path.exists(os.path.join(run_dir, CHECKPOINT_FILE))
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.status = data.get("status", "new")
+        self.started = data.get("started")
+        self.elapsed = data.get("elapsed", 0.0)
+        self.hosts_done = data.get("hosts_done", 0)
+        self.partial = data.get("partial", {})
+
+    def start(self):
+        with self._lock:
+            if self.started is None:
+                self.started = datetime.now().isoformat()
+            self.status = "running"
+        self.save(force=True)
+
+    def done_chunks(self, host: str) -> Set[int]:
+        with self._lock:
+            return set(self.partial.get(host, {}).get("chunks", []))
+
+    def partial_open_ports(self, host: str) -> List[int]:
+        with self._lock:
+            return list(self.partial.get(host, {}).get("open_ports", []))
+
+    def mark_chunk(self, host: str, chunk: int, open_ports: List[int]):
+        with self._lock:
+            state = self.partial.setdefault(host, {"chunks": [], "open_ports": []})
+            state["chunks"].append(chunk)
+            state["open_ports"].extend(open_ports)
+        self.save()
+
+    def mark_host(self, host: str):
+        with self._lock:
+            self.partial.pop(host, None)
+            self.hosts_done += 1
+        self.save()
+
+    def finish(self, status: str, elapsed: float):
+        with self._lock:
+            self.status = status
+            self.elapsed += elapsed
+        self.save(force=True)
+
+    def save(self, force: bool = False):
+        """
+        Writes the checkpoint at most every CHECKPOINT_INTERVAL seconds unless forced.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_save < CHECKPOINT_INTERVAL:
+                return
+            self._last_save = now
+            data = {
+                "status": self.status,
+                "started": self.started,
+                "updated": datetime.now().isoformat(),
+                "elapsed": self.elapsed,
+                "hosts_done": self.hosts_done,
+                "partial": self.partial
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+class ChunkTracker:
+    """
+    Checkpoints one host's port scan in fixed-size chunks while a single
+    scan runs over every port still to do. port_done() is the scan's
+    on_done callback; a chunk is marked in the checkpoint as soon as each
+    of its ports has a final outcome. Chunks done by an interrupted run are
+    left out of `pending`; their open ports are in `resumed_open`.
+    """
+    def __init__(self, checkpoint: Checkpoint, host: str, ports: List[int], size: int):
+        self.checkpoint = checkpoint
+        self.host = host
+        self.resumed_open = checkpoint.partial_open_ports(host)
+        self.pending = [] # ports to scan, in scan order
+        self._chunk_of = {} # port -> chunk index, until the port is done
+        self._remaining = {} # chunk index -> ports not done yet
+        self._open = {} # chunk index -> open ports found so far
+        self._lock = threading.Lock()
+        done = checkpoint.done_chunks(host)
+        for index, offset in enumerate(range(0, len(ports), size)):
+            if index in done:
+                continue
+            for port in ports[offset:offset + size]:
+                if port in self._chunk_of:
+                    continue
+                self._chunk_of[port] = index
+                self._remaining[index] = self._remaining.get(index, 0) + 1
+                self.pending.append(port)
+            self._open[index] = []
+
+    def port_done(self, port: int, is_open: bool):
+        with self._lock:
+            index = self._chunk_of.pop(port, None)
+            if index is None:
+                return
+            if is_open:
+                self._open[index].append(port)
+            self._remaining[index] -= 1
+            if self._remaining[index]:
+                return
+            del self._remaining[index]
+            open_ports = self._open.pop(index)
+        self.checkpoint.mark_chunk(self.host, index, open_ports)
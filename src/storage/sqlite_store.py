@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from ..config import RESULTS_DB
+from ..models import ScanResult
+from ..utils import setup_logger
+from .writer import load_run, load_stream
+
+logger = setup_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_dir TEXT UNIQUE,
+    target TEXT NOT NULL,
+    type TEXT,
+    profile TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    duration REAL,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    host TEXT NOT NULL,
+    ip TEXT
+);
+CREATE TABLE IF NOT EXISTS ports (
+    host_id INTEGER NOT NULL REFERENCES hosts(id) ON DELETE CASCADE,
+    port INTEGER NOT NULL,
+    service TEXT COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS subdomains (
+    host_id INTEGER NOT NULL REFERENCES hosts(id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS risk_tags (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_target ON runs(target, start_time);
+CREATE INDEX IF NOT EXISTS idx_runs_start ON runs(start_time);
+CREATE INDEX IF NOT EXISTS idx_hosts_host ON hosts(host);
+CREATE INDEX IF NOT EXISTS idx_hosts_ip ON hosts(ip);
+CREATE INDEX IF NOT EXISTS idx_hosts_run ON hosts(run_id);
+CREATE INDEX IF NOT EXISTS idx_ports_port ON ports(port, host_id);
+CREATE INDEX IF NOT EXISTS idx_ports_host ON ports(host_id);
+CREATE INDEX IF NOT EXISTS idx_ports_service ON ports(service, host_id);
+CREATE INDEX IF NOT EXISTS idx_subdomains_name ON subdomains(name);
+CREATE INDEX IF NOT EXISTS idx_subdomains_host ON subdomains(host_id);
+CREATE INDEX IF NOT EXISTS idx_risk_tags_tag ON risk_tags(tag, run_id);
+"""
+
+Timestamp = Union[str, datetime, None]
+
+def _ts(value: Timestamp) -> Optional[str]:
+    # Run times are stored as ISO strings, which sort chronologically
+    return value.isoformat() if isinstance(value, datetime) else value
+
+class SQLiteStore:
+    """
+    Normalized, indexed store of scan runs (runs, hosts, ports, subdomains,
+    risk tags) for queries across runs. Each run is written with batched
+    inserts in a single transaction. Connections are opened per call, so
+    one store can be shared across threads.
+    """
+    def __init__(self, path: str = RESULTS_DB):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            # Databases created before ports.service existed get the column first
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(ports)")}
+            if columns and "service" not in columns:
+                conn.execute("ALTER TABLE ports ADD COLUMN service TEXT COLLATE NOCASE")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    # --- Writing ---
+
+    def save_run(self, result: ScanResult, run_dir: Optional[str] = None) -> int:
+        """
+        Stores one run and returns its id. Saving the same run_dir again
+        replaces the earlier copy. A run made with retain_results=False has
+        its host results read back from run_dir's results.jsonl; without a
+        readable stream only the run itself is indexed.
+        """
+        summary = result.summary
+        results = result.results
+        if not result.config.retain_results:
+            try:
+                results = load_stream(run_dir).results if run_dir else {}
+            except (OSError, ValueError):
+                results = {}
+            if not results:
+                logger.warning(f"Run of {summary.target} kept no host results and has no readable stream; indexing it without hosts")
+        with closing(self._connect()) as conn, conn:
+            if run_dir:
+                conn.execute("DELETE FROM runs WHERE run_dir = ?", (run_dir,))
+            run_id = conn.execute(
+                "INSERT INTO runs (run_dir, target, type, profile, start_time, end_time, duration, summary) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_dir, summary.target, summary.type, result.config.profile_name, summary.start_time,
+                 summary.end_time, summary.duration_total, summary.json())
+            ).lastrowid
+
+            conn.executemany(
+                "INSERT INTO hosts (run_id, host, ip) VALUES (?, ?, ?)",
+                [(run_id, host, (res.get("ports") or {}).get("ip")) for host, res in results.items()]
+            )
+            host_ids = {row["host"]: row["id"] for row in conn.execute("SELECT id, host FROM hosts WHERE run_id = ?", (run_id,))}
+
+            ports = []
+            subdomains = []
+            for host, res in results.items():
+                if isinstance(res.get("ports"), dict):
+                    services = {d.get("port"): d.get("service") for d in res["ports"].get("details", [])}
+                    ports.extend((host_ids[host], p, services.get(p)) for p in res["ports"].get("open_ports", []))
+                if isinstance(res.get("subdomains"), list):
+                    subdomains.extend((host_ids[host], name) for name in res["subdomains"])
+            conn.executemany("INSERT INTO ports (host_id, port, service) VALUES (?, ?, ?)", ports)
+            conn.executemany("INSERT INTO subdomains (host_id, name) VALUES (?, ?)", subdomains)
+            conn.executemany("INSERT INTO risk_tags (run_id, tag) VALUES (?, ?)", [(run_id, t) for t in summary.risk_tags])
+        return run_id
+
+    def import_runs(self, base_dir: str = "data/runs") -> int:
+        """
+        Backfills every finished run under base_dir. Returns the number imported.
+        """
+        count = 0
+        if not os.path.isdir(base_dir):
+            return count
+        for name in sorted(os.listdir(base_dir)):
+            run_dir = os.path.join(base_dir, name)
+            result = load_run(run_dir)
+            if result is not None:
+                self.save_run(result, run_dir)
+                count += 1
+        return count
+
+    # --- Queries ---
+    # since/until filter on run start time (ISO string or datetime, inclusive)
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def list_runs(self, target: Optional[str] = None, since: Timestamp = None, until: Timestamp = None) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT id, run_dir, target, type, profile, start_time, end_time, duration FROM runs "
+            "WHERE (? IS NULL OR target = ?) AND (? IS NULL OR start_time >= ?) AND (? IS NULL OR start_time <= ?) "
+            "ORDER BY start_time DESC",
+            (target, target, _ts(since), _ts(since), _ts(until), _ts(until))
+        )
+
+    def hosts_with_port(self, port: int, since: Timestamp = None, until: Timestamp = None) -> List[Dict[str, Any]]:
+        """
+        Every (host, run) where `port` was open, newest first.
+        """
+        return self._query(
+            "SELECT h.host, h.ip, r.id AS run_id, r.target, r.start_time FROM ports p "
+            "JOIN hosts h ON h.id = p.host_id JOIN runs r ON r.id = h.run_id "
+            "WHERE p.port = ? AND (? IS NULL OR r.start_time >= ?) AND (? IS NULL OR r.start_time <= ?) "
+            "ORDER BY r.start_time DESC",
+            (port, _ts(since), _ts(since), _ts(until), _ts(until))
+        )
+
+    def hosts_with_service(self, service: str, since: Timestamp = None, until: Timestamp = None) -> List[Dict[str, Any]]:
+        """
+        Every (host, port, run) where a port of `service` (e.g. "SSH", any
+        case) was open, newest first. The service is the banner's when one
+        was read, else the port's usual service.
+        """
+        return self._query(
+            "SELECT h.host, h.ip, p.port, p.service, r.id AS run_id, r.target, r.start_time FROM ports p "
+            "JOIN hosts h ON h.id = p.host_id JOIN runs r ON r.id = h.run_id "
+            "WHERE p.service = ? AND (? IS NULL OR r.start_time >= ?) AND (? IS NULL OR r.start_time <= ?) "
+            "ORDER BY r.start_time DESC, p.port",
+            (service, _ts(since), _ts(since), _ts(until), _ts(until))
+        )
+
+    def runs_with_tag(self, tag: str, since: Timestamp = None, until: Timestamp = None) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT r.id AS run_id, r.target, r.start_time FROM risk_tags t JOIN runs r ON r.id = t.run_id "
+            "WHERE t.tag = ? AND (? IS NULL OR r.start_time >= ?) AND (? IS NULL OR r.start_time <= ?) "
+            "ORDER BY r.start_time DESC",
+            (tag, _ts(since), _ts(since), _ts(until), _ts(until))
+        )
+
+    def port_history(self, host: str) -> List[Dict[str, Any]]:
+        """
+        Open ports of a host (name or IP) in each run that scanned it, newest first.
+        """
+        rows = self._query(
+            "SELECT r.id AS run_id, r.start_time, p.port FROM hosts h JOIN runs r ON r.id = h.run_id "
+            "LEFT JOIN ports p ON p.host_id = h.id WHERE h.host = ? OR h.ip = ? "
+            "ORDER BY r.start_time DESC, p.port",
+            (host, host)
+        )
+        history = {}
+        for row in rows:
+            entry = history.setdefault(row["run_id"], {"run_id": row["run_id"], "start_time": row["start_time"], "open_ports": []})
+            if row["port"] is not None:
+                entry["open_ports"].append(row["port"])
+        return list(history.values())
+
+    def find_subdomain(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Runs in which a subdomain was seen (exact name, or a LIKE pattern with %).
+        """
+        op = "LIKE" if "%" in name else "=" # exact names use the index
+        return self._query(
+            "SELECT s.name, h.host AS domain, r.id AS run_id, r.start_time FROM subdomains s "
+            "JOIN hosts h ON h.id = s.host_id JOIN runs r ON r.id = h.run_id "
+            f"WHERE s.name {op} ? ORDER BY r.start_time DESC",
+            (name,)
+        )
+
+    def get_summary(self, run_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT summary FROM runs WHERE id = ?", (run_id,))
+        return json.loads(rows[0]["summary"]) if rows else None
@@ -1,14 +1,41 @@
 import json
 import os
+import threading
 from datetime import datetime
-from ..models import ScanResult
+from typing import Any, Dict, Optional, Tuple
+from ..models import RunConfig, ScanResult, ScanSummary
+
+STREAM_FILE = "results.jsonl"
+
+def create_run_dir(base_dir: str, suffix: str = "") -> str:
+    """
+    Creates a new run directory under base_dir, named by the second it was
+    created. Runs started within the same second get -01, -02, ... so two
+    runs never share a directory.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    attempt = 0
+    while True:
+        path = os.path.join(base_dir, stamp + (f"-{attempt:02d}" if attempt else "") + suffix)
+        try:
+            os.makedirs(path, exist_ok=False)
+            return path
+        except FileExistsError:
+            attempt += 1
 
 class ResultWriter:
-    def __init__(self, base_dir="data/runs"):
-        self.timestamp = datetime.now().strftime("%Y-%m-%d_%H%M")
-        self.run_dir = os.path.join(base_dir, self.timestamp)
-        os.makedirs(self.run_dir, exist_ok=True)
-        
+    def __init__(self, base_dir="data/runs", run_dir=None):
+        # run_dir reopens an existing run (e.g. to resume it)
+        if run_dir:
+            os.makedirs(run_dir, exist_ok=True)
+            self.run_dir = run_dir
+        else:
+            self.run_dir = create_run_dir(base_dir)
+        self.timestamp = os.path.basename(os.path.normpath(self.run_dir))
+        self._stream = None
+        self._lock = threading.Lock()
+
     def save(self, scan_result: ScanResult):
         file_path = os.path.join(self.run_dir, "results.json")
         try:
@@ -21,3 +48,108 @@ class ResultWriter:
 
     def get_run_dir(self):
         return self.run_dir
+
+    def save_metrics(self, metrics):
+        """
+        Writes a ScanMetrics as metrics.json and Prometheus text (metrics.prom).
+        """
+        try:
+            with open(os.path.join(self.run_dir, "metrics.json"), "w", encoding="utf-8") as f:
+                json.dump(metrics.to_dict(), f, indent=2)
+            with open(os.path.join(self.run_dir, "metrics.prom"), "w", encoding="utf-8") as f:
+                f.write(metrics.to_prometheus())
+        except Exception as e:
+            print(f"Error saving metrics: {e}")
+
+    # --- Streaming (JSONL) mode ---
+    # One record per line, flushed as results arrive:
+    #   {"type": "config", "config": {...}}
+    #   {"type": "module", "target": t, "module": m, "data": {...}}
+    #   {"type": "host", "target": t, "timings": {...}}    (host finished)
+    #   {"type": "summary", "summary": {...}}                (run finished)
+
+    def get_stream_path(self):
+        return os.path.join(self.run_dir, STREAM_FILE)
+
+    def open_stream(self, config: RunConfig, append: bool = False):
+        """
+        Starts the run's results.jsonl. append=True continues an existing
+        stream (resume); otherwise any earlier content is replaced.
+        """
+        with self._lock:
+            if self._stream is None:
+                self._stream = open(self.get_stream_path(), "a" if append else "w", encoding="utf-8")
+        self._append({"type": "config", "config": json.loads(config.json())})
+
+    def write_module(self, target: str, module: str, data: Any):
+        self._append({"type": "module", "target": target, "module": module, "data": data})
+
+    def write_host(self, target: str, timings: Dict[str, float]):
+        self._append({"type": "host", "target": target, "timings": timings})
+
+    def write_summary(self, summary: ScanSummary):
+        self._append({"type": "summary", "summary": json.loads(summary.json())})
+
+    def close_stream(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def _append(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+def read_stream(path: str) -> Tuple[Optional[RunConfig], Dict[str, Any], Optional[ScanSummary]]:
+    """
+    Reads a results.jsonl stream back into (config, results, summary).
+    Summary is None if the run never finished. A torn final line is ignored.
+    """
+    config = None
+    summary = None
+    results = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.get("type")
+            if kind == "config":
+                config = RunConfig.parse_obj(record["config"])
+            elif kind == "module":
+                results.setdefault(record["target"], {})[record["module"]] = record["data"]
+            elif kind == "host":
+                results.setdefault(record["target"], {})["_timings"] = record["timings"]
+            elif kind == "summary":
+                summary = ScanSummary.parse_obj(record["summary"])
+    return config, results, summary
+
+def load_stream(path: str) -> ScanResult:
+    """
+    Rebuilds the full ScanResult of a finished run from its results.jsonl.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, STREAM_FILE)
+    config, results, summary = read_stream(path)
+    if config is None or summary is None:
+        raise ValueError(f"Incomplete result stream: {path}")
+    return ScanResult(config=config, summary=summary, results=results)
+
+def load_run(run_dir: str) -> Optional[ScanResult]:
+    """
+    Loads a finished run from results.json, or from results.jsonl when the
+    run was only streamed. Returns None for missing or incomplete runs.
+    """
+    json_path = os.path.join(run_dir, "results.json")
+    try:
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                return ScanResult.parse_raw(f.read())
+        return load_stream(run_dir)
+    except (OSError, ValueError):
+        return None
@@ -1,10 +1,13 @@
 import gradio as gr
 import json
 import os
+import sqlite3
 from .models import RunConfig, TargetType
 from .engine import ReconEngine
 from .config import PROFILES, DEFAULT_CONCURRENCY, DEFAULT_CONNECT_TIMEOUT, TOP_100_PORTS
+from .progress import ScanProgress, watch_scan
 from .storage.writer import ResultWriter
+from .storage.sqlite_store import SQLiteStore
 
 def get_profile_defaults(profile_name):
     p = PROFILES.get(profile_name, PROFILES["Custom"])
@@ -14,7 +17,7 @@ def get_profile_defaults(profile_name):
         p["timeout"]
     )
 
-def execute_scan(target, auth_checked, profile, modules, concurrency, timeout):
+def execute_scan(target, auth_checked, profile, modules, concurrency, timeout, diff_mode=False, banners=False):
     if not auth_checked:
         return "⚠️ ERROR: You must acknowledge authorization to scan this target.", None, None
 
@@ -46,7 +49,9 @@ def execute_scan(target, auth_checked, profile, modules, concurrency, timeout):
         profile_name=profile,
         enabled_modules=modules,
         concurrency=int(concurrency),
-        connect_timeout=float(timeout)
+        connect_timeout=float(timeout),
+        diff_mode=bool(diff_mode),
+        banners=bool(banners)
     )
     
     engine = ReconEngine()
@@ -56,11 +61,21 @@ def execute_scan(target, auth_checked, profile, modules, concurrency, timeout):
     yield status_msg, None, None
     
     try:
-        result = engine.run(cfg)
+        # Host results are also streamed to results.jsonl as they complete.
+        # The engine runs on its own thread; its progress events are shown
+        # at most every UI_UPDATE_INTERVAL seconds until it returns.
+        writer = ResultWriter()
+        progress = ScanProgress(target)
+        for _ in watch_scan(lambda on_event: engine.run(cfg, writer=writer, on_event=on_event), progress):
+            yield progress.text(), progress.partial(), None
+        result = progress.result
         
         # Save
-        writer = ResultWriter()
         saved_path = writer.save(result)
+        try:
+            SQLiteStore().save_run(result, writer.get_run_dir())
+        except sqlite3.Error as e:
+            print(f"Error indexing results: {e}")
         
         # Format Summary
         sum_text = f"## ✅ Scan Complete\n"
@@ -71,7 +86,38 @@ def execute_scan(target, auth_checked, profile, modules, concurrency, timeout):
         sum_text += f"- **Subdomains**: {result.summary.subdomains_found}\n"
         if result.summary.cidr_notes:
             sum_text += f"- **CIDR Info**: {result.summary.cidr_notes}\n"
+        if result.summary.discovery:
+            sum_text += f"- **Host Discovery**: {result.summary.discovery['alive']} up / {result.summary.discovery['probed']} probed\n"
+        if result.summary.runtime_stop:
+            sum_text += f"- **Stopped at Runtime Limit**: {result.summary.runtime_stop['skipped']} hosts not scanned\n"
+        if result.summary.subdomain_scan:
+            sum_text += f"- **Subdomain Scan**: {result.summary.subdomain_scan}\n"
+
+        # Changes since the previous run (diff mode)
+        changes = result.summary.changes
+        if changes is not None:
+            if changes["previous_run"] is None:
+                sum_text += f"\n### 🔁 Changes\nNo previous run of this target; this run is the baseline.\n"
+            else:
+                sum_text += f"\n### 🔁 Changes since {changes['previous_start']}\n"
+                for host, diff in changes["ports"].items():
+                    sum_text += f"- `{host}`: opened {diff['new']}, closed {diff['closed']}\n"
+                if changes["new_hosts"]:
+                    sum_text += f"- **New hosts**: {changes['new_hosts']}\n"
+                if changes["missing_hosts"]:
+                    sum_text += f"- **Missing hosts**: {changes['missing_hosts']}\n"
+                if changes["new_subdomains"]:
+                    sum_text += f"- **New subdomains**: {len(changes['new_subdomains'])}\n"
+                if changes["new_risk_tags"]:
+                    sum_text += f"- **New risk tags**: {changes['new_risk_tags']}\n"
+                if changes["cleared_risk_tags"]:
+                    sum_text += f"- **Cleared risk tags**: {changes['cleared_risk_tags']}\n"
         
+        if result.metrics and "ports" in result.metrics["connects"]:
+            outcomes = result.metrics["connects"]["ports"]
+            latency = result.metrics["connect_latency"]["ports"]
+            sum_text += f"- **Connects**: {outcomes.get('open', 0)} open / {outcomes.get('closed', 0)} refused / {outcomes.get('timeout', 0)} timeout (p50 {latency['p50']}s, p99 {latency['p99']}s, peak in flight {result.metrics['inflight']['peak'].get('connects', 0)})\n"
+
         # Risk Tags
         if result.summary.risk_tags:
             sum_text += f"\n### ⚠️ Risk Findings\n"
@@ -115,7 +161,7 @@ def build_ui():
             with gr.Column(scale=1):
                 gr.Markdown("### Advanced Settings")
                 with gr.Accordion("Configuration", open=True):
-                    module_options = ["dns", "whois", "subdomains", "ports", "web"]
+                    module_options = ["dns", "whois", "subdomains", "subdomain_scan", "ports", "web"]
                     modules_chk = gr.CheckboxGroup(
                         choices=module_options,
                         value=PROFILES["Fast"]["modules"],
@@ -123,6 +169,8 @@ def build_ui():
                     )
                     concurrency_slider = gr.Slider(1, 50, value=25, step=1, label="Concurrency")
                     timeout_slider = gr.Slider(0.1, 5.0, value=0.5, step=0.1, label="Timeout (s)")
+                    diff_checkbox = gr.Checkbox(label="Diff against previous run", value=False)
+                    banner_checkbox = gr.Checkbox(label="Identify services from banners", value=False)
 
         # Output Area
         with gr.Tabs():
@@ -145,7 +193,7 @@ def build_ui():
         
         run_btn.click(
             fn=execute_scan,
-            inputs=[target_input, auth_checkbox, profile_radio, modules_chk, concurrency_slider, timeout_slider],
+            inputs=[target_input, auth_checkbox, profile_radio, modules_chk, concurrency_slider, timeout_slider, diff_checkbox, banner_checkbox],
             outputs=[status_output, json_output, download_file]
         )
         
@@ -1,6 +1,7 @@
 import logging
+import random
 import ipaddress
-import tldextract
+from typing import Iterator, Optional
 from urllib.parse import urlparse
 from .models import TargetType
 from .config import MAX_CIDR_HOSTS
@@ -41,25 +42,101 @@ def validate_target(input_str: str) -> tuple[str, TargetType]:
         return input_str, TargetType.URL
     
     # 4. Assume Domain
-    # Use tldextract to check validity broadly, or just return as domain
     # We strip 'www.' if just a domain? Maybe not, keep input true.
     # But usually for domain scan we want base domain + subdomains.
     # For now, return as is.
     return input_str, TargetType.DOMAIN
 
-def expand_cidr(cidr_str: str, limit: int = MAX_CIDR_HOSTS) -> tuple[list[str], int]:
+class _IndexPermutation:
     """
-    Returns (list_of_ips, count_skipped)
+    Seeded bijection over range(n): a small Feistel network over the next
+    even power of two, cycle-walked back into range. O(1) memory.
     """
+    _MIX = 0x9E3779B97F4A7C15
+    _MASK64 = (1 << 64) - 1
+
+    def __init__(self, n: int, seed: int):
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        bits += bits & 1
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(64) for _ in range(4)]
+
+    def _round(self, value: int, key: int) -> int:
+        x = ((value ^ key) * self._MIX) & self._MASK64
+        x ^= x >> 29
+        return x & self.mask
+
+    def __call__(self, index: int) -> int:
+        while True:
+            left, right = index >> self.half, index & self.mask
+            for key in self.keys:
+                left, right = right, left ^ self._round(right, key)
+            index = (left << self.half) | right
+            if index < self.n:
+                return index
+
+def _check_shard(shard_index: int, shard_count: int):
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index}/{shard_count}")
+
+def _host_span(net) -> tuple[int, int]:
+    """
+    Returns (first_host_as_int, host_count) with the same rules as net.hosts().
+    """
+    first = int(net.network_address)
+    total = net.num_addresses
+    if net.version == 4 and net.prefixlen < 31:
+        return first + 1, total - 2 # Skip network and broadcast
+    if net.version == 6 and net.prefixlen < 127:
+        return first + 1, total - 1 # Skip Subnet-Router anycast
+    return first, total
+
+def cidr_host_count(cidr_str: str, shard_index: int = 0, shard_count: int = 1) -> int:
+    """
+    Number of hosts in the CIDR (or in one shard of it), without expanding it.
+    """
+    _check_shard(shard_index, shard_count)
     try:
         net = ipaddress.ip_network(cidr_str, strict=False)
-        all_hosts = list(net.hosts())
-        # If /32 or single host
-        if not all_hosts: 
-            return [str(net.network_address)], 0
-        
-        if len(all_hosts) > limit:
-            return [str(ip) for ip in all_hosts[:limit]], len(all_hosts) - limit
-        return [str(ip) for ip in all_hosts], 0
-    except Exception:
-         return [], 0
+    except ValueError:
+        return 0
+    _, total = _host_span(net)
+    if shard_index >= total:
+        return 0
+    return (total - shard_index + shard_count - 1) // shard_count
+
+def iter_cidr_hosts(cidr_str: str, limit: Optional[int] = None, shard_index: int = 0,
+                    shard_count: int = 1, seed: Optional[int] = None) -> Iterator[str]:
+    """
+    Lazily yields host IPs of a CIDR as strings.
+    shard_index/shard_count select every shard_count-th host starting at
+    shard_index (offset/stride), so N shards partition the range exactly.
+    With a seed, hosts come out in a shuffled but reproducible order; shards
+    sharing a seed still partition the range.
+    """
+    _check_shard(shard_index, shard_count)
+    try:
+        net = ipaddress.ip_network(cidr_str, strict=False)
+    except ValueError:
+        return
+    first, total = _host_span(net)
+    addr_cls = ipaddress.IPv4Address if net.version == 4 else ipaddress.IPv6Address
+    permute = _IndexPermutation(total, seed) if seed is not None and total > 1 else None
+
+    position = shard_index
+    emitted = 0
+    while position < total and (limit is None or emitted < limit):
+        index = permute(position) if permute else position
+        yield str(addr_cls(first + index))
+        position += shard_count
+        emitted += 1
+
+def expand_cidr(cidr_str: str, limit: int = MAX_CIDR_HOSTS) -> tuple[list[str], int]:
+    """
+    Returns (list_of_ips, count_skipped)
+    """
+    hosts = list(iter_cidr_hosts(cidr_str, limit))
+    return hosts, max(0, cidr_host_count(cidr_str) - len(hosts))
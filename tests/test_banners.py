@@ -0,0 +1,65 @@
+import socket
+import threading
+
+import pytest
+
+from src.modules.banner_module import identify
+from src.modules.ports_module import run_port_scan
+
+def _server(greeting=None):
+    """
+    Loopback service: sends `greeting` on connect, or waits for a request
+    and answers it like an HTTP server.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+
+    def handle(conn):
+        with conn:
+            try:
+                if greeting:
+                    conn.sendall(greeting)
+                else:
+                    conn.recv(1024)
+                    conn.sendall(b"HTTP/1.0 200 OK\r\nServer: stub-httpd/2.4\r\n\r\n")
+                conn.recv(1024)
+            except OSError:
+                pass
+
+    def loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=loop, daemon=True).start()
+    return server
+
+@pytest.fixture
+def services():
+    ssh = _server(b"SSH-2.0-OpenSSH_9.6\r\n")
+    http = _server()
+    yield ssh.getsockname()[1], http.getsockname()[1]
+    ssh.close()
+    http.close()
+
+@pytest.mark.parametrize("engine", ["async", "thread"])
+def test_banners_are_read_on_the_scan_connection(services, engine):
+    ssh_port, http_port = services
+    port_data = run_port_scan("127.0.0.1", [ssh_port, http_port], engine=engine, banners=True)
+    assert port_data["open_ports"] == sorted([ssh_port, http_port])
+
+    ssh = port_data["banners"][ssh_port]
+    assert (ssh["service"], ssh["version"], ssh["probe"]) == ("SSH", "OpenSSH_9.6", "none")
+    http = port_data["banners"][http_port]
+    assert (http["service"], http["version"], http["probe"]) == ("HTTP", "stub-httpd/2.4", "http")
+
+def test_banners_are_off_by_default(services):
+    assert "banners" not in run_port_scan("127.0.0.1", list(services))
+
+def test_identify_unknown_banner_keeps_text():
+    record = identify(b"hello\x00there\r\n")
+    assert record == {"banner": "hello.there", "probe": "none"}
@@ -0,0 +1,35 @@
+import pytest
+
+from src.batch import BatchEngine, plan_targets, read_targets
+from src.models import RunConfig, TargetType
+
+def test_read_targets_skips_comments_and_blanks():
+    assert list(read_targets(["# list", "", "a.example b.example", "  10.0.0.1  "])) == ["a.example", "b.example", "10.0.0.1"]
+
+def test_plan_dedups_and_merges():
+    plan, notes = plan_targets([
+        "Example.com", "example.com.", "10.0.0.0/25", "10.0.0.128/25", "10.0.0.7", "10.0.0.7", "192.0.2.1"
+    ], cidr_limit=256)
+    assert plan == [("10.0.0.0/24", TargetType.CIDR), ("example.com", TargetType.DOMAIN), ("192.0.2.1", TargetType.IP)]
+    assert notes == {"input": 7, "duplicates": 2, "cidrs_merged": 1, "covered_by_cidr": 1, "planned": 3}
+
+def test_ip_in_a_capped_cidr_is_kept():
+    plan, notes = plan_targets(["10.0.0.0/16", "10.0.5.5"], cidr_limit=64)
+    assert ("10.0.5.5", TargetType.IP) in plan
+    assert notes["covered_by_cidr"] == 0
+
+def test_batch_scans_each_unique_target_once(tmp_path):
+    config = RunConfig(target_input="batch", target_type=TargetType.DOMAIN, profile_name="Fast",
+                       enabled_modules=["ports"], ports=[1], metrics=False, host_discovery=False, runtime_limit=None)
+    finished = []
+    summary = BatchEngine().run_batch(config, ["127.0.0.1", "127.0.0.1", "127.0.0.2"], out_dir=str(tmp_path),
+                                      on_result=lambda result, run_dir: finished.append(result.config.target_input))
+    assert sorted(finished) == ["127.0.0.1", "127.0.0.2"]
+    assert summary["plan"]["duplicates"] == 1
+    assert len(summary["targets"]) == 2
+
+def test_diff_mode_is_rejected(tmp_path):
+    config = RunConfig(target_input="batch", target_type=TargetType.DOMAIN, profile_name="Fast",
+                       enabled_modules=["ports"], diff_mode=True)
+    with pytest.raises(ValueError):
+        BatchEngine().run_batch(config, ["127.0.0.1"], out_dir=str(tmp_path))
@@ -0,0 +1,33 @@
+import pytest
+
+from benchmarks import fakes
+from src.modules.ports_module import run_port_scan
+from src.storage.checkpoint import Checkpoint, ChunkTracker
+
+@pytest.fixture
+def listeners():
+    listeners = fakes.Listeners("127.0.0.1", [0, 0, 0])
+    yield listeners
+    listeners.close()
+
+@pytest.mark.parametrize("engine,adaptive", [("async", False), ("async", True), ("thread", False)])
+def test_chunks_are_marked_during_one_scan(tmp_path, listeners, engine, adaptive):
+    ports = sorted(set(range(20000, 20300)) | set(listeners.ports))
+    checkpoint = Checkpoint(str(tmp_path), fresh=True)
+    tracker = ChunkTracker(checkpoint, "127.0.0.1", ports, 100)
+    port_data = run_port_scan("127.0.0.1", tracker.pending, engine=engine, adaptive=adaptive, on_done=tracker.port_done)
+
+    chunks = -(-len(ports) // 100)
+    assert checkpoint.done_chunks("127.0.0.1") == set(range(chunks))
+    assert sorted(checkpoint.partial_open_ports("127.0.0.1")) == sorted(listeners.ports)
+    assert port_data["open_ports"] == sorted(listeners.ports)
+
+def test_resume_scans_only_unfinished_chunks(tmp_path, listeners):
+    ports = list(range(30000, 30250)) + listeners.ports
+    checkpoint = Checkpoint(str(tmp_path), fresh=True)
+    checkpoint.mark_chunk("127.0.0.1", 0, [])
+    checkpoint.mark_chunk("127.0.0.1", 1, [30150])
+
+    tracker = ChunkTracker(checkpoint, "127.0.0.1", ports, 100)
+    assert tracker.pending == ports[200:]
+    assert tracker.resumed_open == [30150]
@@ -0,0 +1,44 @@
+import ipaddress
+
+import pytest
+
+from src.utils import _IndexPermutation, cidr_host_count, iter_cidr_hosts
+
+CIDRS = ["10.0.0.0/24", "10.0.0.0/27", "10.0.0.0/31", "10.0.0.5/32", "2001:db8::/120", "2001:db8::/127", "2001:db8::1/128"]
+
+def _hosts(cidr):
+    return [str(ip) for ip in ipaddress.ip_network(cidr, strict=False).hosts()]
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 254, 1000])
+def test_index_permutation_is_a_bijection(n):
+    permute = _IndexPermutation(n, seed=7)
+    assert sorted(permute(i) for i in range(n)) == list(range(n))
+
+@pytest.mark.parametrize("cidr", CIDRS)
+@pytest.mark.parametrize("seed", [None, 1])
+def test_iteration_matches_net_hosts(cidr, seed):
+    hosts = list(iter_cidr_hosts(cidr, seed=seed))
+    assert sorted(hosts, key=ipaddress.ip_address) == _hosts(cidr)
+    assert cidr_host_count(cidr) == len(hosts)
+    if seed is None:
+        assert hosts == _hosts(cidr)
+
+@pytest.mark.parametrize("cidr", CIDRS)
+@pytest.mark.parametrize("seed", [None, 3])
+def test_shards_are_disjoint_and_cover_every_host(cidr, seed):
+    shards = [list(iter_cidr_hosts(cidr, shard_index=i, shard_count=3, seed=seed)) for i in range(3)]
+    assert [len(s) for s in shards] == [cidr_host_count(cidr, i, 3) for i in range(3)]
+    every = [ip for shard in shards for ip in shard]
+    assert len(every) == len(set(every))
+    assert sorted(every, key=ipaddress.ip_address) == _hosts(cidr)
+
+def test_seed_gives_a_reproducible_shuffle():
+    first = list(iter_cidr_hosts("10.1.0.0/22", seed=42))
+    assert first == list(iter_cidr_hosts("10.1.0.0/22", seed=42))
+    assert first != list(iter_cidr_hosts("10.1.0.0/22", seed=43))
+    assert first != _hosts("10.1.0.0/22")
+
+def test_limit_and_invalid_shard():
+    assert len(list(iter_cidr_hosts("10.0.0.0/16", limit=10, seed=1))) == 10
+    with pytest.raises(ValueError):
+        list(iter_cidr_hosts("10.0.0.0/24", shard_index=2, shard_count=2))
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.cli import HEAVY_LIBRARIES, build_config, build_parser
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _loaded_after(code):
+    probe = f"import sys\n{code}\nprint(','.join(m for m in {HEAVY_LIBRARIES!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+def test_help_loads_no_heavy_library():
+    code = "import contextlib, io\nfrom src.cli import main\nwith contextlib.redirect_stdout(io.StringIO()):\n"
+    code += "    try:\n        main(['--help'])\n    except SystemExit:\n        pass"
+    assert _loaded_after(code) == ""
+
+def test_ports_only_engine_import_loads_no_heavy_library():
+    assert _loaded_after("import src.cli, src.engine") == ""
+
+@pytest.mark.parametrize("argv", [
+    ["--batch", "targets.txt", "--diff"],
+    ["127.0.0.1", "--serve", "8765", "--diff"],
+    ["127.0.0.1", "--adaptive", "--engine", "thread"],
+    ["127.0.0.1", "--modules", "ports,nope"],
+])
+def test_conflicting_options_are_rejected(argv):
+    with pytest.raises(ValueError):
+        build_config(build_parser().parse_args(argv))
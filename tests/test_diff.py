@@ -0,0 +1,102 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks import fakes
+from src.config import DIFF_PASSIVE_MAX_AGE
+from src.diff import ChangeTracker, PreviousRun, find_previous_run
+from src.engine import ReconEngine
+from src.models import RunConfig, ScanResult, ScanSummary, TargetType
+from src.modules.dns_module import configure_resolver
+from src.storage.writer import ResultWriter
+
+def _result(target, results, risk_tags=(), start=None, changes=None):
+    start = start or datetime.now()
+    summary = ScanSummary(target=target, type="cidr", start_time=start.isoformat(), end_time=start.isoformat(),
+                          duration_total=0.0, risk_tags=list(risk_tags), changes=changes)
+    config = RunConfig(target_input=target, target_type=TargetType.CIDR, profile_name="Fast", enabled_modules=["ports"])
+    return ScanResult(config=config, summary=summary, results=results)
+
+def test_passive_data_expires_from_when_it_was_first_fetched():
+    fetched = datetime.now() - timedelta(seconds=DIFF_PASSIVE_MAX_AGE + 60)
+    results = {"example.test": {"dns": {"A": ["127.0.0.1"]}, "whois": {"error": "timeout"}, "ports": {"open_ports": [22]}}}
+    # Carried over by a recent run, but first fetched too long ago
+    stale = PreviousRun("old", _result("example.test", results, changes={"passive_as_of": fetched.isoformat()}))
+    assert not stale.fresh
+    assert stale.passive_data("example.test") == {}
+
+    fresh = PreviousRun("new", _result("example.test", results))
+    assert fresh.fresh
+    assert fresh.passive_data("example.test") == {"dns": {"A": ["127.0.0.1"]}} # errors are never reused
+    assert fresh.open_ports("example.test") == [22]
+
+def test_changes_list_ports_hosts_subdomains_and_risk_tags():
+    previous = PreviousRun("prev", _result("10.0.0.0/30", {
+        "10.0.0.1": {"ports": {"open_ports": [22, 80]}, "subdomains": ["a.example.test"]},
+        "10.0.0.2": {"ports": {"open_ports": [443]}},
+    }, risk_tags=["ssh_exposed"]))
+    tracker = ChangeTracker(previous)
+    tracker.add_host("10.0.0.1", {"ports": {"open_ports": [80, 3389]}, "subdomains": ["a.example.test", "b.example.test"]})
+    tracker.add_host("10.0.0.3", {"ports": {"open_ports": [8080]}})
+    current = _result("10.0.0.0/30", {}, risk_tags=["rdp_exposed"]).summary
+    changes = tracker.build(current)
+    assert changes["ports"] == {"10.0.0.1": {"new": [3389], "closed": [22]}}
+    assert changes["new_hosts"] == ["10.0.0.3"]
+    assert changes["missing_hosts"] == ["10.0.0.2"]
+    assert changes["new_subdomains"] == ["b.example.test"]
+    assert (changes["new_risk_tags"], changes["cleared_risk_tags"]) == (["rdp_exposed"], ["ssh_exposed"])
+    assert changes["passive_reused"] and changes["passive_as_of"] == previous.passive_as_of
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def stub_dns():
+    server = fakes.DNSServer({"a.example.test": "127.0.0.1"}, "example.test")
+    configure_resolver([server.host], port=server.port)
+    yield server
+    configure_resolver()
+    server.close()
+
+def test_second_run_reuses_passive_data_and_reports_port_changes(stub_dns, tmp_path):
+    first, second = fakes.Listeners("127.0.0.1", [0]), None
+    later = _free_port()
+    ports = sorted([first.ports[0], later])
+    config = RunConfig(target_input="a.example.test", target_type=TargetType.DOMAIN, profile_name="Fast",
+                       enabled_modules=["dns", "ports"], ports=ports, diff_mode=True, runtime_limit=None)
+    try:
+        baseline = ReconEngine().run(config, writer=ResultWriter(str(tmp_path)))
+        assert baseline.summary.changes["previous_run"] is None
+        first.close()
+        second = fakes.Listeners("127.0.0.1", [later])
+        configure_resolver([stub_dns.host], port=stub_dns.port) # empty the DNS cache
+        queries = stub_dns.queries
+        result = ReconEngine().run(config, writer=ResultWriter(str(tmp_path)))
+    finally:
+        first.close()
+        if second:
+            second.close()
+    changes = result.summary.changes
+    assert changes["previous_run"] is not None and changes["passive_reused"]
+    assert changes["ports"] == {"a.example.test": {"new": [later], "closed": [first.ports[0]]}}
+    assert stub_dns.queries == queries # dns came from the previous run
+    assert result.results["a.example.test"]["dns"]["A"] == ["127.0.0.1"]
+
+def test_find_previous_run_skips_other_targets_and_the_current_run(tmp_path):
+    def run(target):
+        config = RunConfig(target_input=target, target_type=TargetType.IP, profile_name="Fast",
+                           enabled_modules=["ports"], ports=[1], runtime_limit=None)
+        writer = ResultWriter(str(tmp_path))
+        ReconEngine().run(config, writer=writer)
+        return writer.get_run_dir()
+
+    mine = run("127.0.0.1")
+    run("127.0.0.2")
+    newest = run("127.0.0.1")
+    assert find_previous_run("127.0.0.1", str(tmp_path)).run_dir == newest
+    assert find_previous_run("127.0.0.1", str(tmp_path), exclude=newest).run_dir == mine
+    assert find_previous_run("127.0.0.3", str(tmp_path)) is None
+    assert find_previous_run("127.0.0.1", str(tmp_path / "missing")) is None
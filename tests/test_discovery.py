@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from benchmarks import fakes
+from src.modules import discovery_module
+from src.modules.discovery_module import iter_live_hosts, run_host_discovery
+
+@pytest.fixture
+def listener():
+    listeners = fakes.Listeners("127.0.0.1", [0])
+    yield listeners.ports[0]
+    listeners.close()
+
+def test_open_and_refused_ports_both_prove_a_host_up(listener):
+    verdicts = run_host_discovery(["127.0.0.1"], ports=[listener], timeout=0.5)
+    assert verdicts == {"127.0.0.1": "syn-ack"}
+    assert run_host_discovery(["127.0.0.1"], ports=[1], timeout=0.5) == {"127.0.0.1": "rst"}
+
+def test_discovery_inside_a_running_loop(listener):
+    async def discover():
+        return run_host_discovery(["127.0.0.1"], ports=[listener], timeout=0.5)
+    assert asyncio.run(discover()) == {"127.0.0.1": "syn-ack"}
+
+def test_iter_live_hosts_counts_verdicts(listener, monkeypatch):
+    resolve = discovery_module.resolve_target
+    monkeypatch.setattr(discovery_module, "resolve_target", lambda host: None if host == "dead.test" else resolve(host))
+    stats = {}
+    live = list(iter_live_hosts(["127.0.0.1", "dead.test", "127.0.0.2"], stats, ports=[listener, 1], timeout=0.3, batch_size=2))
+    assert live == ["127.0.0.1", "127.0.0.2"]
+    assert (stats["probed"], stats["alive"], stats["dead"]) == (3, 2, 1)
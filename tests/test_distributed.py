@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from benchmarks import fakes
+from src.distributed import Coordinator, _Client, run_worker
+from src.models import RunConfig, TargetType
+from src.modules import discovery_module
+
+@pytest.fixture
+def listeners():
+    listeners = fakes.Listeners("127.0.0.1", [0, 0])
+    yield listeners
+    listeners.close()
+
+def _config(target, target_type, ports, **kwargs):
+    return RunConfig(target_input=target, target_type=target_type, profile_name="Fast", enabled_modules=["ports"],
+                     ports=ports, metrics=False, runtime_limit=None, **kwargs)
+
+def _run(coordinator, workers=2, before_workers=None):
+    outcome = {}
+    server = threading.Thread(target=lambda: outcome.setdefault("result", coordinator.serve(linger=0.3)))
+    server.start()
+    if before_workers:
+        before_workers()
+    threads = [threading.Thread(target=run_worker, args=(coordinator.url,), kwargs={"worker_id": f"w{i}", "poll": 0.05})
+               for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    server.join(timeout=60)
+    for thread in threads:
+        thread.join(timeout=10)
+    return outcome["result"]
+
+def test_two_workers_merge_port_slices(listeners):
+    ports = sorted(listeners.ports + [1, 2, 3])
+    coordinator = Coordinator(_config("127.0.0.1", TargetType.IP, ports), port=0, ports_per_unit=2)
+    result = _run(coordinator)
+    assert result.results["127.0.0.1"]["ports"]["open_ports"] == sorted(listeners.ports)
+    assert result.results["127.0.0.1"]["ports"]["scanned_count"] == len(ports)
+    assert coordinator.stats["completed"] == coordinator.stats["units"] == 3
+    assert set(coordinator.stats["workers"]) <= {"w0", "w1"}
+
+def test_expired_lease_is_redispatched(listeners):
+    coordinator = Coordinator(_config("127.0.0.1", TargetType.IP, listeners.ports), port=0, lease=0.5)
+
+    def dead_worker():
+        # Leases the only unit and never reports back
+        status, _ = _Client(coordinator.url).post("/lease", {"worker": "dead"})
+        assert status == 200
+
+    result = _run(coordinator, workers=1, before_workers=dead_worker)
+    assert coordinator.stats["redispatched"] == 1
+    assert coordinator.stats["workers"] == ["dead", "w0"]
+    assert result.results["127.0.0.1"]["ports"]["open_ports"] == sorted(listeners.ports)
+
+def test_discovery_runs_once_per_host_batch(monkeypatch, listeners):
+    calls = []
+    iter_live_hosts = discovery_module.iter_live_hosts
+
+    def counting(hosts, stats, **kwargs):
+        calls.append(1)
+        return iter_live_hosts(hosts, stats, **kwargs)
+
+    monkeypatch.setattr(discovery_module, "iter_live_hosts", counting)
+    ports = sorted(listeners.ports + [1, 2, 3, 4])
+    coordinator = Coordinator(_config("127.0.0.0/29", TargetType.CIDR, ports), port=0, hosts_per_unit=3, ports_per_unit=2)
+    result = _run(coordinator)
+
+    assert len(calls) == 2 # two host batches, three port slices each
+    assert result.summary.discovery["probed"] == 6
+    for host, res in result.results.items():
+        assert res["ports"]["scanned_count"] == len(ports)
+    assert result.results["127.0.0.1"]["ports"]["open_ports"] == sorted(listeners.ports)
+
+def test_diff_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Coordinator(_config("127.0.0.1", TargetType.IP, [22], diff_mode=True), port=0)
@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks import fakes
+from src.modules.dns_module import configure_resolver, group_by_address, resolve_many
+
+@pytest.fixture
+def stub_dns():
+    server = fakes.DNSServer({"v4.example.test": "127.0.0.1", "v6.example.test": "::1"}, "example.test")
+    configure_resolver([server.host], port=server.port)
+    yield server
+    configure_resolver()
+    server.close()
+
+def test_resolve_many_finds_ipv4_and_ipv6_and_skips_wildcards(stub_dns):
+    resolved = resolve_many(["v4.example.test", "v6.example.test", "*.example.test", "missing.example.test"])
+    assert resolved == {"v4.example.test": ["127.0.0.1"], "v6.example.test": ["::1"]}
+    assert group_by_address(resolved) == {"127.0.0.1": ["v4.example.test"], "::1": ["v6.example.test"]}
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from benchmarks import fakes
+from src.config import DNS_NEGATIVE_TTL
+from src.modules.dns_module import DNSCache, configure_resolver, get_cache, resolve
+
+def _stub(ttl):
+    server = fakes.DNSServer({"a.example.test": "127.0.0.1"}, "example.test", ttl=ttl)
+    configure_resolver([server.host], port=server.port)
+    return server
+
+@pytest.fixture
+def stub_dns():
+    servers = []
+
+    def start(ttl=300):
+        servers.append(_stub(ttl))
+        return servers[-1]
+    yield start
+    configure_resolver()
+    for server in servers:
+        server.close()
+
+def _expires_in(key):
+    return get_cache()._entries[key][0] - time.monotonic()
+
+def test_answers_are_reused_from_the_cache(stub_dns):
+    server = stub_dns()
+    assert resolve("a.example.test") == ["127.0.0.1"]
+    assert resolve("A.example.test.") == ["127.0.0.1"]
+    assert server.queries == 1
+    assert get_cache().hits == 1
+
+def test_positive_answers_expire_with_their_ttl(stub_dns):
+    server = stub_dns(ttl=1)
+    resolve("a.example.test")
+    assert 0 < _expires_in(("a.example.test", "A")) <= 1
+    time.sleep(1.1)
+    assert resolve("a.example.test") == ["127.0.0.1"]
+    assert server.queries == 2
+
+def test_negative_ttl_comes_from_the_soa(stub_dns):
+    server = stub_dns(ttl=60)
+    assert resolve("missing.example.test") == []
+    assert resolve("missing.example.test") == []
+    assert server.queries == 1
+    assert 50 < _expires_in(("missing.example.test", "A")) <= 60 < DNS_NEGATIVE_TTL
+
+def test_cached_answers_cannot_be_mutated_by_callers(stub_dns):
+    stub_dns()
+    resolve("a.example.test").append("10.0.0.1")
+    cached = resolve("a.example.test")
+    cached.clear()
+    assert resolve("a.example.test") == ["127.0.0.1"]
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = DNSCache(max_size=2)
+    cache.put(("a", "A"), ["1"], 60)
+    cache.put(("b", "A"), ["2"], 60)
+    assert cache.get(("a", "A")) == ["1"] # a is now the most recent
+    cache.put(("c", "A"), ["3"], 60)
+    assert cache.get(("b", "A")) is None
+    assert cache.get(("a", "A")) == ["1"]
+    assert len(cache) == 2
+
+def test_zero_ttl_is_not_cached():
+    cache = DNSCache()
+    cache.put(("a", "A"), ["1"], 0)
+    assert cache.get(("a", "A")) is None
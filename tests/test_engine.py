@@ -0,0 +1,40 @@
+import threading
+import time
+from datetime import datetime
+
+from src.engine import ReconEngine
+from src.models import RunConfig, TargetType
+
+def test_schedule_keeps_the_host_queue_bounded():
+    lock = threading.Lock()
+    done = []
+    backlog = []
+
+    def items():
+        for i in range(40):
+            with lock:
+                backlog.append(i - len(done))
+            yield i
+
+    def work(item):
+        time.sleep(0.002)
+        with lock:
+            done.append(item)
+        return item * 2
+
+    results = dict(ReconEngine._schedule(items(), work, 3, datetime.now(), limit=None))
+    assert results == {i: i * 2 for i in range(40)}
+    assert max(backlog) <= 2 * 3
+
+def test_schedule_stops_starting_items_at_the_limit():
+    state = {"stopped": False}
+    results = list(ReconEngine._schedule(iter(range(100)), lambda i: time.sleep(0.05), 2, datetime.now(), state, limit=0.12))
+    assert state["stopped"]
+    assert len(results) == state["started"] < 100
+
+def test_hosts_left_at_the_runtime_limit_are_reported_as_skipped():
+    config = RunConfig(target_input="127.0.0.0/29", target_type=TargetType.CIDR, profile_name="Fast",
+                       enabled_modules=["ports"], ports=[1], host_discovery=False, runtime_limit=0)
+    result = ReconEngine().run(config)
+    assert result.results == {}
+    assert result.summary.runtime_stop == {"limit": 0, "started": 0, "skipped": 6}
@@ -0,0 +1,17 @@
+from src.metrics import ScanMetrics
+
+def test_per_host_entries_are_capped(monkeypatch):
+    monkeypatch.setattr("src.metrics.METRICS_MAX_HOSTS", 2)
+    metrics = ScanMetrics()
+    for i in range(5):
+        metrics.module(f"10.0.0.{i}", "ports", 0.1)
+        metrics.connect(f"10.0.0.{i}", "open", 0.01)
+    data = metrics.to_dict()
+    assert sorted(data["hosts"]) == ["10.0.0.0", "10.0.0.1"]
+    assert data["host_records_dropped"] == 6
+    assert data["modules"]["ports"]["count"] == 5
+    assert data["connects"]["ports"]["open"] == 5
+
+    merged = ScanMetrics()
+    merged.merge(data)
+    assert merged.to_dict()["host_records_dropped"] == 6
@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks import fakes
+from src.engine import ReconEngine
+from src.models import RunConfig, TargetType
+from src.parallel import ParallelEngine
+from src.storage.writer import ResultWriter
+
+@pytest.fixture
+def listeners():
+    listeners = fakes.Listeners("127.0.0.1", [0, 0, 0])
+    yield listeners
+    listeners.close()
+
+def _config(target, target_type, ports, **kwargs):
+    return RunConfig(target_input=target, target_type=target_type, profile_name="Fast", enabled_modules=["ports"],
+                     ports=ports, workers=2, runtime_limit=None, **kwargs)
+
+def test_port_list_is_split_across_workers(listeners, tmp_path):
+    # Closed ports stay below the ephemeral range, where a loopback connect can reach itself
+    ports = sorted(set(range(20000, 21500)) | set(listeners.ports))
+    result = ParallelEngine().run(_config("127.0.0.1", TargetType.IP, ports), writer=ResultWriter(str(tmp_path)))
+    port_data = result.results["127.0.0.1"]["ports"]
+    assert port_data["open_ports"] == sorted(listeners.ports)
+    assert port_data["scanned_count"] == len(ports)
+    assert result.metrics["connects"]["ports"]["open"] == len(listeners.ports)
+
+def test_cidr_hosts_match_the_single_process_engine(listeners):
+    config = _config("127.0.0.0/29", TargetType.CIDR, sorted(listeners.ports + [1]), host_discovery=False)
+    parallel = ParallelEngine().run(config)
+    single = ReconEngine().run(config.copy(update={"workers": 1}))
+    assert sorted(parallel.results) == sorted(single.results)
+    for host, res in single.results.items():
+        assert parallel.results[host]["ports"]["open_ports"] == res["ports"]["open_ports"]
+    assert parallel.summary.open_ports_total == single.summary.open_ports_total
@@ -0,0 +1,47 @@
+import pytest
+
+from src.portmap import PORT_SPACE, PortBitmap, PortMatrix
+
+def test_bitmap_membership_and_order():
+    bitmap = PortBitmap([443, 0, 80, 65535, 80])
+    assert list(bitmap) == [0, 80, 443, 65535]
+    assert len(bitmap) == 4
+    assert 443 in bitmap and 22 not in bitmap and -1 not in bitmap and PORT_SPACE not in bitmap
+    bitmap.discard(0)
+    bitmap.discard(22)
+    assert bitmap.to_list() == [80, 443, 65535]
+    assert not PortBitmap() and bitmap
+
+def test_bitmap_set_algebra():
+    a, b = PortBitmap([22, 80, 443, 64000]), PortBitmap([80, 8080, 64000])
+    assert (a | b).to_list() == [22, 80, 443, 8080, 64000]
+    assert (a & b).to_list() == [80, 64000]
+    assert (a - b).to_list() == [22, 443]
+    assert a.intersects(b) and not a.intersects(PortBitmap([1]))
+    a |= b
+    assert a == PortBitmap([22, 80, 443, 8080, 64000])
+    assert b.to_list() == [80, 8080, 64000] # operands are not modified
+
+def test_bitmap_int_round_trip_and_full_space():
+    full = PortBitmap(range(PORT_SPACE))
+    assert len(full) == PORT_SPACE
+    assert PortBitmap.from_int(full.to_int()) == full
+    assert PortBitmap.from_int(0) == PortBitmap()
+
+def test_bitmap_is_not_hashable():
+    with pytest.raises(TypeError):
+        hash(PortBitmap())
+
+def test_matrix_rows_columns_and_union():
+    matrix = PortMatrix()
+    matrix.add_host("10.0.0.1", [22, 80])
+    matrix.add_host("10.0.0.2", [80, 443])
+    matrix.add_host("10.0.0.3", [])
+    matrix.add_host("10.0.0.1", [8080])
+    assert len(matrix) == 2 # hosts without open ports take no row
+    assert matrix.row("10.0.0.1").to_list() == [22, 80, 8080]
+    assert matrix.row("10.0.0.3") == PortBitmap()
+    assert sorted(matrix.hosts_with(80)) == ["10.0.0.1", "10.0.0.2"]
+    assert matrix.hosts_with(3389) == []
+    assert matrix.column_counts() == {22: 1, 80: 2, 443: 1, 8080: 1}
+    assert matrix.union().to_list() == [22, 80, 443, 8080]
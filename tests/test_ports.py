@@ -0,0 +1,58 @@
+import asyncio
+import errno
+import socket
+
+import pytest
+
+from benchmarks import fakes
+from src.config import MAX_INFLIGHT
+from src.models import RunConfig, TargetType
+from src.modules import ports_module
+from src.modules.ports_module import probe_connect, run_port_scan
+
+@pytest.fixture
+def listeners():
+    listeners = fakes.Listeners("127.0.0.1", [0, 0])
+    yield listeners
+    listeners.close()
+
+@pytest.mark.parametrize("engine", ["async", "thread"])
+def test_engines_find_open_ports(listeners, engine):
+    ports = sorted(listeners.ports + [1])
+    assert run_port_scan("127.0.0.1", ports, engine=engine)["open_ports"] == sorted(listeners.ports)
+
+def test_async_engine_inside_a_running_loop_uses_threads(listeners):
+    async def scan():
+        return run_port_scan("127.0.0.1", listeners.ports, engine="async")
+    assert asyncio.run(scan())["open_ports"] == sorted(listeners.ports)
+
+def test_errors_inside_the_scan_are_not_swallowed(monkeypatch, listeners):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(ports_module, "scan_ports_async", broken)
+    with pytest.raises(RuntimeError):
+        run_port_scan("127.0.0.1", listeners.ports, engine="async")
+
+def test_socket_exhaustion_is_an_error_outcome(monkeypatch):
+    def no_fds(*args, **kwargs):
+        raise OSError(errno.EMFILE, "Too many open files")
+
+    async def probe():
+        monkeypatch.setattr(ports_module.socket, "socket", no_fds) # after the loop has its own sockets
+        return await probe_connect(asyncio.get_running_loop(), socket.AF_INET, "127.0.0.1", 9, 0.5)
+    assert asyncio.run(probe())[0] == "error"
+
+def test_max_inflight_is_clamped():
+    config = RunConfig(target_input="127.0.0.1", target_type=TargetType.IP, profile_name="Fast",
+                       enabled_modules=["ports"], max_inflight=10 ** 6)
+    assert config.max_inflight == MAX_INFLIGHT
+
+def test_adaptive_on_the_thread_engine_warns(listeners, caplog):
+    ports_module._warned.discard("adaptive")
+    run_port_scan("127.0.0.1", listeners.ports, engine="thread", adaptive=True)
+    assert "Adaptive timeouts need the async engine" in caplog.text
+
+def test_unknown_port_engine_is_rejected():
+    with pytest.raises(ValueError):
+        RunConfig(target_input="127.0.0.1", target_type=TargetType.IP, profile_name="Fast",
+                  enabled_modules=["ports"], port_engine="asyncio")
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from benchmarks import fakes
+from src.engine import ReconEngine, RunContext
+from src.models import RunConfig, TargetType
+from src.progress import ScanProgress, watch_scan
+
+def _config(target="127.0.0.0/30", ports=(1,)):
+    return RunConfig(target_input=target, target_type=TargetType.CIDR, profile_name="Fast", enabled_modules=["ports"],
+                     ports=list(ports), host_discovery=False, runtime_limit=None)
+
+def test_emitted_events_are_folded_into_progress():
+    progress = ScanProgress("127.0.0.0/30")
+    ctx = RunContext(_config(), [1])
+    ctx.on_event = progress.add
+    ctx.emit("scan_started", "127.0.0.0/30", planned=2)
+    ctx.emit("host_started", "127.0.0.1")
+    ctx.emit("host_started", "127.0.0.2")
+    ctx.emit("port_open", "127.0.0.1", port=22, ip="127.0.0.1")
+    ctx.record_module("127.0.0.1", "ports", {"open_ports": [22]})
+    ctx.emit("host_finished", "127.0.0.1", result={"ports": {"open_ports": [22]}})
+    assert (progress.planned, progress.hosts_started, progress.hosts_finished) == (2, 2, 1)
+    assert progress.open_ports == {"127.0.0.1": [22]}
+    assert progress.partial() == {"in_progress": True, "results": {"127.0.0.1": {"ports": {"open_ports": [22]}}, "127.0.0.2": {}}}
+    assert "1 done, 1 in progress of 2 planned" in progress.text()
+    assert "`127.0.0.1` done" in progress.text()
+
+def test_updates_are_throttled_while_events_stream():
+    def run(on_event):
+        ctx = RunContext(_config(), [1])
+        ctx.on_event = on_event
+        for i in range(100):
+            ctx.emit("port_open", "127.0.0.1", port=i, ip="127.0.0.1")
+            time.sleep(0.003)
+        return "done"
+
+    progress = ScanProgress("127.0.0.1")
+    started = time.monotonic()
+    updates = [(time.monotonic(), len(p.open_ports["127.0.0.1"])) for p in watch_scan(run, progress, interval=0.1)]
+    elapsed = time.monotonic() - started
+    assert 1 <= len(updates) <= elapsed / 0.1 + 2
+    assert all(b[0] - a[0] >= 0.09 for a, b in zip(updates, updates[1:]))
+    assert progress.result == "done"
+    assert progress.open_ports["127.0.0.1"] == list(range(100)) # every event folded in, not only the shown ones
+
+def test_scan_errors_reach_the_caller():
+    def run(on_event):
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        list(watch_scan(run, ScanProgress("x"), interval=0.05))
+
+def test_engine_run_final_state():
+    listeners = fakes.Listeners("127.0.0.1", [0])
+    config = _config(ports=listeners.ports)
+    progress = ScanProgress(config.target_input)
+    try:
+        list(watch_scan(lambda on_event: ReconEngine().run(config, on_event=on_event), progress, interval=0.05))
+    finally:
+        listeners.close()
+    assert progress.planned == progress.hosts_started == progress.hosts_finished == 2
+    assert progress.open_ports == {"127.0.0.1": listeners.ports}
+    assert progress.result.summary.open_ports_list == listeners.ports
+    assert progress.results["127.0.0.1"]["ports"]["open_ports"] == listeners.ports
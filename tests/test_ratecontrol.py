@@ -0,0 +1,92 @@
+import random
+
+from src.config import RATE_CEILING, RATE_DECREASE, RATE_INCREASE_STEP, RATE_INITIAL, RATE_MIN
+from src.distributed import Coordinator
+from src.models import RunConfig, TargetType
+from src.ratecontrol import RateController, RateLimiter
+
+def _config(**kwargs):
+    return RunConfig(target_input="127.0.0.1", target_type=TargetType.IP, profile_name="Fast",
+                     enabled_modules=["ports"], **kwargs)
+
+def test_process_share_splits_only_the_global_cap():
+    rate = RateLimiter.from_config(_config(max_rate=800, host_rate=100), share=8)
+    assert rate.global_bucket.rate == 100
+    assert rate.for_host("10.0.0.1").controller.rate == 100
+    assert rate.for_host("10.0.0.2", share=4).controller.rate == 25
+
+def test_set_caps_rescales_a_running_limiter():
+    rate = RateLimiter(max_rate=1000, host_rate=200)
+    host = rate.for_host("10.0.0.1")
+    rate.set_caps(500, 50)
+    assert rate.global_bucket.rate == 500
+    assert host.controller.rate == 50
+    assert rate.for_host("10.0.0.2").controller.rate == 50
+
+def test_coordinator_splits_caps_between_workers():
+    coordinator = Coordinator(_config(max_rate=900, host_rate=90, ports=list(range(1, 9))),
+                              port=0, ports_per_unit=4)
+    try:
+        assert coordinator._rate_caps() == {"max_rate": 900, "host_rate": 90}
+        coordinator.stats["workers"] = ["a", "b", "c"]
+        # Two port slices: at most two workers scan one host at once
+        assert coordinator._rate_caps() == {"max_rate": 300, "host_rate": 45}
+    finally:
+        coordinator._server.server_close()
+
+def _window(controller, answered, total=64):
+    # Spread answers evenly over the window
+    for i in range(total):
+        controller.record(loss=i * answered // total == (i + 1) * answered // total)
+
+def _started(rate=100.0, ceiling=RATE_CEILING):
+    controller = RateController(rate, ceiling)
+    _window(controller, 32) # first window sets the baseline (half the probes answered)
+    assert controller.baseline == 0.5 and controller.rate == rate
+    return controller
+
+def test_slow_start_doubles_until_the_ceiling():
+    controller = _started(ceiling=1000)
+    rates = []
+    for _ in range(5):
+        _window(controller, 32)
+        rates.append(controller.rate)
+    assert rates == [200, 400, 800, 1000, 1000]
+    assert controller.backoffs == 0
+
+def test_loss_spike_backs_off_then_recovers_additively():
+    controller = _started()
+    _window(controller, 32)
+    _window(controller, 32)
+    assert controller.rate == 400
+    _window(controller, 8) # answers drop to a quarter of the baseline
+    assert (controller.rate, controller.backoffs, controller.slow_start) == (400 * RATE_DECREASE, 1, False)
+    assert controller.baseline == 0.5 # lossy windows do not move the baseline
+    _window(controller, 32)
+    _window(controller, 32)
+    assert controller.rate == 400 * RATE_DECREASE + 2 * RATE_INCREASE_STEP
+
+def test_backoff_stops_at_the_floor():
+    controller = _started(rate=4 * RATE_MIN)
+    _window(controller, 4)
+    _window(controller, 4)
+    assert (controller.rate, controller.backoffs) == (RATE_MIN, 2)
+    # Loss that persists at the floor becomes the host's baseline, and the rate climbs again
+    _window(controller, 4)
+    assert controller.backoffs == 2
+    assert controller.baseline == 4 / 64
+    assert controller.rate == RATE_MIN + RATE_INCREASE_STEP
+    _window(controller, 32, total=512)
+    assert controller.rate == RATE_MIN + 2 * RATE_INCREASE_STEP
+
+def test_stationary_sparse_host_does_not_trigger_backoffs():
+    # A host answering 5% of probes at random, with no congestion at all
+    backoffs = 0
+    for seed in range(10):
+        rng = random.Random(seed)
+        controller = RateController(RATE_INITIAL, RATE_CEILING)
+        for _ in range(200000):
+            controller.record(loss=rng.random() >= 0.05)
+        backoffs += controller.backoffs
+        assert 0.04 < controller.baseline < 0.06
+    assert backoffs <= 5
@@ -0,0 +1,84 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from benchmarks import fakes
+from src.engine import ReconEngine
+from src.models import RunConfig, ScanResult, ScanSummary, TargetType
+from src.storage.sqlite_store import SQLiteStore
+from src.storage.writer import ResultWriter
+
+def _result(target, results, start, risk_tags=(), **config):
+    summary = ScanSummary(target=target, type="domain", start_time=start.isoformat(), end_time=start.isoformat(),
+                          duration_total=1.0, risk_tags=list(risk_tags))
+    config = RunConfig(target_input=target, target_type=TargetType.DOMAIN, profile_name="Fast",
+                       enabled_modules=["ports", "subdomains"], **config)
+    return ScanResult(config=config, summary=summary, results=results)
+
+def _host(ip, ports, subdomains=None):
+    details = [{"port": p, "service": service} for p, service in ports.items()]
+    res = {"ports": {"ip": ip, "open_ports": sorted(ports), "details": details}}
+    if subdomains is not None:
+        res["subdomains"] = subdomains
+    return res
+
+def test_round_trip_queries(tmp_path):
+    store = SQLiteStore(str(tmp_path / "results.db"))
+    old, new = datetime(2026, 1, 1), datetime(2026, 2, 1)
+    first = store.save_run(_result("example.test", {"example.test": _host("10.0.0.1", {22: "SSH", 80: "HTTP"}, ["a.example.test"])},
+                                   old, risk_tags=["ssh_exposed"]), "runs/1")
+    second = store.save_run(_result("example.test", {"example.test": _host("10.0.0.1", {80: "HTTP", 2222: "SSH"}, ["b.example.test"])},
+                                    new), "runs/2")
+
+    assert [r["id"] for r in store.list_runs("example.test")] == [second, first]
+    assert [r["id"] for r in store.list_runs(since=new - timedelta(days=1))] == [second]
+
+    assert [(r["run_id"], r["host"], r["ip"]) for r in store.hosts_with_port(80)] == [(second, "example.test", "10.0.0.1"), (first, "example.test", "10.0.0.1")]
+    assert [r["run_id"] for r in store.hosts_with_port(22)] == [first]
+    assert [r["run_id"] for r in store.hosts_with_port(80, until=old)] == [first]
+
+    assert [(r["run_id"], r["port"]) for r in store.hosts_with_service("ssh")] == [(second, 2222), (first, 22)]
+    assert store.hosts_with_service("SMTP") == []
+
+    assert [(h["run_id"], h["open_ports"]) for h in store.port_history("10.0.0.1")] == [(second, [80, 2222]), (first, [22, 80])]
+    assert [h["run_id"] for h in store.port_history("example.test")] == [second, first]
+
+    assert [r["run_id"] for r in store.find_subdomain("a.example.test")] == [first]
+    assert {r["name"] for r in store.find_subdomain("%.example.test")} == {"a.example.test", "b.example.test"}
+    assert [r["run_id"] for r in store.runs_with_tag("ssh_exposed")] == [first]
+    assert store.get_summary(first)["risk_tags"] == ["ssh_exposed"]
+
+def test_saving_a_run_dir_again_replaces_it(tmp_path):
+    store = SQLiteStore(str(tmp_path / "results.db"))
+    now = datetime(2026, 3, 1)
+    store.save_run(_result("example.test", {"example.test": _host("10.0.0.1", {22: "SSH"})}, now), "runs/1")
+    store.save_run(_result("example.test", {"example.test": _host("10.0.0.1", {443: "HTTPS"})}, now), "runs/1")
+    assert len(store.list_runs()) == 1
+    assert store.hosts_with_port(22) == []
+
+def test_runs_without_retained_results_are_indexed_from_their_stream(tmp_path):
+    store = SQLiteStore(str(tmp_path / "results.db"))
+    listeners = fakes.Listeners("127.0.0.1", [0])
+    config = RunConfig(target_input="127.0.0.1", target_type=TargetType.IP, profile_name="Fast", enabled_modules=["ports"],
+                       ports=listeners.ports, retain_results=False, runtime_limit=None)
+    writer = ResultWriter(str(tmp_path / "runs"))
+    try:
+        result = ReconEngine().run(config, writer=writer)
+    finally:
+        listeners.close()
+    assert result.results == {}
+
+    run_id = store.save_run(result, writer.get_run_dir())
+    assert [(r["run_id"], r["host"]) for r in store.hosts_with_port(listeners.ports[0])] == [(run_id, "127.0.0.1")]
+
+def test_runs_without_results_or_stream_warn(tmp_path, caplog):
+    store = SQLiteStore(str(tmp_path / "results.db"))
+    run_id = store.save_run(_result("example.test", {}, datetime(2026, 5, 1), retain_results=False), str(tmp_path / "gone"))
+    assert store.list_runs()[0]["id"] == run_id
+    assert "indexing it without hosts" in caplog.text
+
+def test_old_databases_gain_the_service_column(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE ports (host_id INTEGER NOT NULL, port INTEGER NOT NULL)")
+    store = SQLiteStore(path)
+    assert store.hosts_with_service("SSH") == []
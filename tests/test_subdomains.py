@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from benchmarks import fakes
+from src.modules.subdomains import StreamLimitReached, iter_json_array, run_subdomain_recon
+
+DOMAIN = "example.test"
+
+def _split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+RECORDS = [
+    {"id": 1, "name_value": "a.example.test\n*.b.example.test"},
+    {"id": 2, "name_value": "quote \" and \\ backslash, ] bracket [ and été ☃"},
+    {"id": 3, "nested": {"list": [1, {"deep": [2, 3]}], "empty": {}}},
+    12345,
+    "plain",
+]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10 ** 6])
+def test_elements_survive_any_chunk_boundary(size):
+    data = json.dumps(RECORDS, ensure_ascii=False).encode()
+    assert list(iter_json_array(_split(data, size))) == RECORDS
+
+def test_whitespace_and_empty_array():
+    assert list(iter_json_array([b" \n[", b" ]\n"])) == []
+    assert list(iter_json_array([b"[1,", b"2", b"3]"])) == [1, 23]
+
+def test_truncated_array_yields_complete_elements_then_fails():
+    parsed = []
+    with pytest.raises(ValueError):
+        for value in iter_json_array(_split(b'[{"id": 1}, {"id": 2}, {"id": ', 5)):
+            parsed.append(value)
+    assert parsed == [{"id": 1}, {"id": 2}]
+
+def test_not_an_array_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"id": 1}']))
+
+def test_byte_cap_stops_the_stream():
+    parsed = []
+    with pytest.raises(StreamLimitReached):
+        for value in iter_json_array(_split(json.dumps(list(range(1000))).encode(), 100), max_bytes=500):
+            parsed.append(value)
+    assert 0 < len(parsed) < 1000
+
+@pytest.fixture
+def crtsh():
+    server = fakes.crtsh_server(DOMAIN, 200, wildcards=True)
+    yield server
+    server.close()
+
+def test_names_are_deduplicated_and_wildcards_stripped(crtsh):
+    names = run_subdomain_recon(DOMAIN, base_url=crtsh.url)
+    assert len(names) == 200 # 100 distinct hosts, each with a www name
+    assert "www7.example.test" in names
+    assert not any("*" in name for name in names)
+
+def test_entry_cap_keeps_partial_results(crtsh, caplog):
+    names = run_subdomain_recon(DOMAIN, base_url=crtsh.url, max_entries=3)
+    assert names == sorted(f"{p}{i}.{DOMAIN}" for p in ("host", "www") for i in range(3))
+    assert "entry cap reached" in caplog.text
+
+def test_byte_cap_keeps_partial_results(crtsh, caplog):
+    names = run_subdomain_recon(DOMAIN, base_url=crtsh.url, max_bytes=2000)
+    assert 0 < len(names) < 200
+    assert "exceeded 2000 bytes" in caplog.text
@@ -0,0 +1,130 @@
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from benchmarks import fakes
+from src.modules import web_module
+from src.modules.web_module import detect_scheme, extract_title, run_web_probe
+
+def _serve(handle):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+
+    def loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=loop, daemon=True).start()
+    return server
+
+@pytest.fixture
+def tls_context(tmp_path):
+    if not shutil.which("openssl"):
+        pytest.skip("openssl not available")
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-subj", "/CN=localhost",
+                    "-days", "1", "-keyout", str(key), "-out", str(cert)], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(cert), str(key))
+    return context
+
+def test_slow_tls_endpoint_is_https(tls_context):
+    def handle(conn):
+        time.sleep(0.8) # slower than the 0.5s connect timeout
+        try:
+            with tls_context.wrap_socket(conn, server_side=True):
+                time.sleep(0.5)
+        except OSError:
+            pass
+
+    server = _serve(handle)
+    try:
+        assert detect_scheme("127.0.0.1", server.getsockname()[1], timeout=0.5) == "https"
+    finally:
+        server.close()
+
+def test_plaintext_server_is_http():
+    server = fakes.web_server()
+    try:
+        assert detect_scheme("127.0.0.1", server.port, timeout=0.5) == "http"
+    finally:
+        server.close()
+
+def test_silent_port_scheme_is_unknown():
+    def handle(conn):
+        time.sleep(2)
+        conn.close()
+
+    server = _serve(handle)
+    port = server.getsockname()[1]
+    try:
+        assert detect_scheme("127.0.0.1", port, timeout=0.2, handshake_timeout=0.3) == "unknown"
+    finally:
+        server.close()
+
+def test_unknown_scheme_is_probed_with_https_then_http(monkeypatch):
+    seen = []
+
+    def handle(conn):
+        # Silent to a TLS ClientHello, answers a plaintext request
+        with conn:
+            data = conn.recv(1024)
+            seen.append("tls" if data[:1] == b"\x16" else "plain")
+            if data[:1] == b"\x16":
+                time.sleep(1)
+                return
+            conn.sendall(b"HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n\r\n<title>late http</title>")
+
+    server = _serve(handle)
+    port = server.getsockname()[1]
+    monkeypatch.setattr(web_module, "detect_scheme", partial(detect_scheme, handshake_timeout=0.3))
+    try:
+        probed = web_module._probe_port("127.0.0.1", port, timeout=0.3)
+    finally:
+        server.close()
+    assert [url for url, _ in probed] == [f"http://127.0.0.1:{port}"]
+    assert probed[0][1]["title"] == "late http"
+    assert seen == ["tls", "tls", "plain"] # handshake attempt, https probe, http probe
+
+def test_open_http_port_is_probed(monkeypatch):
+    server = fakes.web_server()
+    monkeypatch.setattr(web_module, "HTTP_LIKE_PORTS", {server.port})
+    try:
+        results = run_web_probe("127.0.0.1", timeout=1.0, open_ports=[server.port])
+        assert results[f"http://127.0.0.1:{server.port}"]["title"] == "bench"
+    finally:
+        server.close()
+
+def test_title_is_read_from_a_bounded_prefix():
+    server = fakes.web_server(body_bytes=200000)
+    try:
+        url = f"http://127.0.0.1:{server.port}"
+        data = web_module.probe_url(url, timeout=2.0, max_body=1024)
+        assert data["bytes_read"] == 1024
+        assert data["title"] == "bench"
+    finally:
+        server.close()
+
+def test_title_past_the_prefix_is_not_found():
+    body = b"<html><head>" + b" " * 2000 + b"<title>late</title>"
+    assert extract_title(body[:1024]) is None
+    assert extract_title(body) == "late"
+
+def test_extract_title():
+    assert extract_title(b"<html><body>no title here</body></html>") is None
+    assert extract_title(b"<TITLE lang='en'>\n  Caf&eacute;\t &amp; bar </title>") == "Café & bar"
+    assert extract_title("<title>Café</title>".encode("latin-1"), "ISO-8859-1") == "Café"
+    assert extract_title("<title>Café</title>".encode("utf-8")) == "Café"
+    assert extract_title(b"<title>x</title>", "no-such-charset") == "x"
+    assert len(extract_title(b"<title>" + b"a" * 500 + b"</title>")) == 200
@@ -0,0 +1,64 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks import fakes
+from src.models import TargetType
+from src.modules import whois_module
+from src.modules.whois_module import RDAPCache, configure_rdap_cache, configure_rdap_server, run_whois_recon
+
+@pytest.fixture
+def slow_rdap(monkeypatch):
+    server = fakes.rdap_server()
+    fetches = []
+    fetch = whois_module._fetch_rdap
+
+    def slow_fetch(ip):
+        fetches.append(ip)
+        time.sleep(0.3)
+        return fetch(ip)
+
+    monkeypatch.setattr(whois_module, "_fetch_rdap", slow_fetch)
+    configure_rdap_server(server.url)
+    configure_rdap_cache()
+    yield fetches
+    configure_rdap_server(None)
+    configure_rdap_cache()
+    server.close()
+
+def _lookup_all(ips):
+    with ThreadPoolExecutor(max_workers=len(ips)) as pool:
+        return list(pool.map(lambda ip: run_whois_recon(ip, TargetType.IP), ips))
+
+def test_one_fetch_per_network(slow_rdap):
+    results = _lookup_all([f"10.1.1.{i}" for i in range(1, 9)])
+    assert len(slow_rdap) == 1
+    assert all(r["network"]["cidr"] == "10.1.1.0/24" for r in results)
+
+def test_unrelated_networks_fetch_concurrently(slow_rdap):
+    start = time.monotonic()
+    _lookup_all([f"10.{i}.0.1" for i in range(6)])
+    assert len(slow_rdap) == 6
+    assert time.monotonic() - start < 6 * 0.3 / 2
+
+def test_answer_without_blocks_is_cached_for_its_address():
+    cache = RDAPCache()
+    assert not cache.put({"network": {}}, ip="192.0.2.7")
+    assert cache.get("192.0.2.7") == {"network": {}}
+    assert cache.get("192.0.2.8") is None
+
+def test_persistent_cache_saves_on_flush_and_skips_bad_records(tmp_path):
+    path = tmp_path / "rdap.json"
+    cache = RDAPCache(path=str(path))
+    cache.put({"network": {"cidr": "198.51.100.0/24"}})
+    assert not path.exists() # throttled, not written per insert
+    cache.flush()
+    records = json.loads(path.read_text())
+    records += [{"cidr": "not-a-network", "expires": time.time() + 60, "result": {}}, {"expires": 1}]
+    path.write_text(json.dumps(records))
+
+    reloaded = RDAPCache(path=str(path))
+    assert reloaded.get("198.51.100.20")["network"]["cidr"] == "198.51.100.0/24"
+    assert [p.name for p in tmp_path.iterdir()] == ["rdap.json"]
@@ -0,0 +1,31 @@
+import os
+
+from src.models import RunConfig, TargetType
+from src.storage.writer import ResultWriter, read_stream
+
+def _config(target="127.0.0.1"):
+    return RunConfig(target_input=target, target_type=TargetType.IP, profile_name="Fast", enabled_modules=["ports"])
+
+def test_runs_in_the_same_second_get_their_own_directory(tmp_path):
+    first = ResultWriter(str(tmp_path))
+    second = ResultWriter(str(tmp_path))
+    assert first.get_run_dir() != second.get_run_dir()
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(w.get_run_dir()) for w in (first, second))
+
+def test_fresh_stream_replaces_and_resume_appends(tmp_path):
+    writer = ResultWriter(str(tmp_path))
+    writer.open_stream(_config())
+    writer.write_module("127.0.0.1", "ports", {"open_ports": [22]})
+    writer.close_stream()
+
+    reopened = ResultWriter(run_dir=writer.get_run_dir())
+    reopened.open_stream(_config(), append=True)
+    reopened.write_module("127.0.0.2", "ports", {"open_ports": [80]})
+    reopened.close_stream()
+    _, results, _ = read_stream(writer.get_stream_path())
+    assert set(results) == {"127.0.0.1", "127.0.0.2"}
+
+    reopened.open_stream(_config())
+    reopened.close_stream()
+    _, results, _ = read_stream(writer.get_stream_path())
+    assert results == {}